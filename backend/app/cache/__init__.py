@@ -0,0 +1,58 @@
+"""
+Shared caching for the API.
+
+    catalog_cache = get_cache("catalog", ttl=60)
+    body = catalog_cache.get_or_set("active", build_catalog)
+    catalog_cache.invalidate()          # after catalog writes, in any worker
+
+CACHE_BACKEND picks the store every namespace shares:
+  memory  per worker process (default)
+  sqlite  one file shared by all workers on a host (CACHE_SQLITE_PATH)
+  redis   any Redis-protocol server (CACHE_REDIS_URL); `python -m
+          app.cache.fake_redis` is a local stand-in
+"""
+import os
+import threading
+from typing import Dict, Optional
+
+from .backends import MemoryBackend, RedisBackend, RedisError, SQLiteBackend
+from .cache import Cache
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", "./cache.db")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+
+
+def _make_backend():
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteBackend(CACHE_SQLITE_PATH)
+    if CACHE_BACKEND == "redis":
+        return RedisBackend(CACHE_REDIS_URL)
+    return MemoryBackend(CACHE_MAX_ENTRIES)
+
+
+backend = _make_backend()
+
+_caches: Dict[str, Cache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str, ttl: Optional[float] = None) -> Cache:
+    """The process-wide Cache for a namespace; `ttl` (default 60s) is set by its owner."""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = Cache(name, backend)
+        if ttl is not None:
+            _caches[name].ttl = ttl
+        return _caches[name]
+
+
+def cache_stats() -> Dict[str, dict]:
+    return {"backend": CACHE_BACKEND, "namespaces": {name: c.snapshot() for name, c in sorted(_caches.items())}}
+
+
+__all__ = [
+    "Cache", "MemoryBackend", "RedisBackend", "RedisError", "SQLiteBackend",
+    "backend", "cache_stats", "get_cache",
+]
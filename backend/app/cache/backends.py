@@ -0,0 +1,245 @@
+"""
+Storage backends for app.cache. All share one small synchronous interface:
+
+    get(key) -> value or None          set(key, value, ttl)
+    add(key, value, ttl) -> bool       delete(key)
+    incr(key) -> int                   counter(key) -> int
+
+`add` only writes if the key is absent (or expired) and is what the
+cross-worker single-flight lock is built on. `shared` says whether other
+worker processes see the same entries. Counters never expire; they
+hold namespace versions. The sqlite and redis backends store values
+encoded by app.cache.codec.
+"""
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+from urllib.parse import unquote, urlparse
+
+from . import codec
+
+
+class MemoryBackend:
+    """LRU with per-entry TTL, in this process only. Values are stored as-is."""
+
+    blocking = False
+    shared = False
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value, ttl: float):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key: str, value, ttl: float) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def _store(self, key: str, value, ttl: float):
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+
+class SQLiteBackend:
+    """Entries in a local SQLite file (WAL), shared by all workers on one host."""
+
+    blocking = True
+    shared = True
+    prune_every = 1000  # sets between sweeps of expired rows
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return codec.loads(row[0]) if row else None
+
+    def set(self, key: str, value, ttl: float):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, codec.dumps(value), now + ttl),
+        )
+        self._sets += 1
+        if self._sets % self.prune_every == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    def add(self, key: str, value, ttl: float) -> bool:
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE cache.expires_at <= ?",
+            (key, codec.dumps(value), now + ttl, now),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key: str):
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def incr(self, key: str) -> int:
+        return self._connect().execute(
+            "INSERT INTO counters (key, value) VALUES (?, 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1 RETURNING value",
+            (key,),
+        ).fetchone()[0]
+
+    def counter(self, key: str) -> int:
+        row = self._connect().execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisBackend:
+    """
+    Minimal RESP2 client (one connection per thread) for Redis, Valkey,
+    KeyDB or app.cache.fake_redis. URL: redis://[:password@]host:port/db
+    """
+
+    blocking = True
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "nutrieve:", timeout: float = 1.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+            try:
+                if self.password:
+                    self._command("AUTH", self.password)
+                if self.db:
+                    self._command("SELECT", self.db)
+            except RedisError:
+                self._local.conn = None
+                sock.close()
+                raise
+        return conn
+
+    def _command(self, *args):
+        sock, reader = self._connect()
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        try:
+            sock.sendall(b"".join(parts))
+            return self._read_reply(reader)
+        except (OSError, ValueError):
+            # Broken or desynchronised connection: reconnect on next use
+            self._local.conn = None
+            sock.close()
+            raise
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by cache server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [self._read_reply(reader) for _ in range(length)]
+        raise ValueError(f"Unexpected reply: {line!r}")
+
+    def get(self, key: str):
+        data = self._command("GET", self.prefix + key)
+        return codec.loads(data) if data is not None else None
+
+    def set(self, key: str, value, ttl: float):
+        self._command("SET", self.prefix + key, codec.dumps(value), "PX", max(1, int(ttl * 1000)))
+
+    def add(self, key: str, value, ttl: float) -> bool:
+        return self._command("SET", self.prefix + key, codec.dumps(value), "PX", max(1, int(ttl * 1000)), "NX") == "OK"
+
+    def delete(self, key: str):
+        self._command("DEL", self.prefix + key)
+
+    def incr(self, key: str) -> int:
+        return self._command("INCR", self.prefix + key)
+
+    def counter(self, key: str) -> int:
+        value = self._command("GET", self.prefix + key)
+        return int(value) if value is not None else 0
+
@@ -0,0 +1,199 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Optional
+
+# How long a worker may hold the cross-worker load lock before others give up waiting
+LOCK_TTL_SECONDS = 10.0
+LOCK_POLL_SECONDS = 0.05
+
+
+class Cache:
+    """
+    A namespace of cached values on a shared backend.
+
+    Keys are versioned per namespace: `invalidate()` bumps the version so
+    every worker moves to fresh keys at once, and old entries age out.
+    `get_or_set` is single-flight: concurrent misses in this process wait
+    on one loader, and other processes wait on a lock entry in the backend.
+    Backend failures count as misses and never fail the caller. Cached
+    values must be treated as immutable; None is never cached.
+    """
+
+    def __init__(self, name: str, backend, ttl: float = 60.0):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.stats: Counter = Counter()
+        self._version_key = f"{name}:version"
+        self._flights: Dict[str, list] = {}  # key -> [lock, waiters]
+        self._flights_lock = threading.Lock()
+        self._async_flights: Dict[str, asyncio.Future] = {}
+
+    # -- backend calls that degrade to misses ---------------------------
+
+    def _call(self, method: str, *args, default=None):
+        try:
+            return getattr(self.backend, method)(*args)
+        except Exception:
+            self.stats["errors"] += 1
+            return default
+
+    async def _acall(self, method: str, *args, default=None):
+        if not self.backend.blocking:
+            return self._call(method, *args, default=default)
+        return await asyncio.to_thread(self._call, method, *args, default=default)
+
+    def _key(self, key: str, version: int) -> str:
+        return f"{self.name}:v{version}:{key}"
+
+    # -- sync interface -------------------------------------------------
+
+    def get(self, key: str):
+        value = self._call("get", self._key(key, self._call("counter", self._version_key, default=0)))
+        self.stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, key: str, value, ttl: Optional[float] = None):
+        if value is not None:
+            version = self._call("counter", self._version_key, default=0)
+            self._call("set", self._key(key, version), value, ttl or self.ttl)
+
+    def delete(self, key: str):
+        self._call("delete", self._key(key, self._call("counter", self._version_key, default=0)))
+
+    def version(self) -> int:
+        """The namespace's current version; changes whenever any worker invalidates it."""
+        return self._call("counter", self._version_key, default=0)
+
+    def invalidate(self):
+        """Drop every key in the namespace, in every worker sharing the backend."""
+        self._call("incr", self._version_key)
+        self.stats["invalidations"] += 1
+
+    @contextmanager
+    def _flight(self, full_key: str):
+        with self._flights_lock:
+            flight = self._flights.setdefault(full_key, [threading.Lock(), 0])
+            flight[1] += 1
+        try:
+            with flight[0]:
+                yield
+        finally:
+            with self._flights_lock:
+                flight[1] -= 1
+                if not flight[1]:
+                    del self._flights[full_key]
+
+    def get_or_set(self, key: str, loader: Callable[[], object], ttl: Optional[float] = None):
+        full_key = self._key(key, self._call("counter", self._version_key, default=0))
+        value = self._call("get", full_key)
+        if value is not None:
+            self.stats["hits"] += 1
+            return value
+        self.stats["misses"] += 1
+
+        with self._flight(full_key):
+            value = self._call("get", full_key)
+            if value is not None:
+                self.stats["coalesced"] += 1
+                return value
+
+            lock_key = full_key + ":lock"
+            owner = self._call("add", lock_key, 1, LOCK_TTL_SECONDS, default=True)
+            if not owner:
+                deadline = time.monotonic() + LOCK_TTL_SECONDS
+                while time.monotonic() < deadline:
+                    time.sleep(LOCK_POLL_SECONDS)
+                    value = self._call("get", full_key)
+                    if value is not None:
+                        self.stats["coalesced"] += 1
+                        return value
+            try:
+                value = loader()
+                self.stats["loads"] += 1
+                if value is not None:
+                    self._call("set", full_key, value, ttl or self.ttl)
+                return value
+            finally:
+                if owner:
+                    self._call("delete", lock_key)
+
+    # -- async interface ------------------------------------------------
+
+    async def aget(self, key: str):
+        version = await self._acall("counter", self._version_key, default=0)
+        value = await self._acall("get", self._key(key, version))
+        self.stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    async def aset(self, key: str, value, ttl: Optional[float] = None):
+        if value is not None:
+            version = await self._acall("counter", self._version_key, default=0)
+            await self._acall("set", self._key(key, version), value, ttl or self.ttl)
+
+    async def adelete(self, key: str):
+        version = await self._acall("counter", self._version_key, default=0)
+        await self._acall("delete", self._key(key, version))
+
+    async def ainvalidate(self):
+        await self._acall("incr", self._version_key)
+        self.stats["invalidations"] += 1
+
+    async def aget_or_set(self, key: str, loader: Callable[[], Awaitable[object]], ttl: Optional[float] = None):
+        full_key = self._key(key, await self._acall("counter", self._version_key, default=0))
+        value = await self._acall("get", full_key)
+        if value is not None:
+            self.stats["hits"] += 1
+            return value
+        self.stats["misses"] += 1
+
+        pending = self._async_flights.get(full_key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_flights[full_key] = future
+        try:
+            value = await self._aload(full_key, loader, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._async_flights[full_key]
+
+    async def _aload(self, full_key: str, loader, ttl: Optional[float]):
+        lock_key = full_key + ":lock"
+        owner = await self._acall("add", lock_key, 1, LOCK_TTL_SECONDS, default=True)
+        if not owner:
+            deadline = time.monotonic() + LOCK_TTL_SECONDS
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+                value = await self._acall("get", full_key)
+                if value is not None:
+                    return value
+        try:
+            value = await loader()
+            self.stats["loads"] += 1
+            if value is not None:
+                await self._acall("set", full_key, value, ttl or self.ttl)
+            return value
+        finally:
+            if owner:
+                await self._acall("delete", lock_key)
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **{k: self.stats[k] for k in ("hits", "misses", "coalesced", "loads", "invalidations", "errors")},
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else None,
+        }
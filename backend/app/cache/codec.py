@@ -0,0 +1,64 @@
+"""
+Cache values as JSON bytes, for the backends that store outside the process.
+
+JSON types round-trip as they are; datetimes come back as ISO strings and
+tuples as lists, as they would in a response. Any other type must be
+registered with an encoder to JSON and a decoder back, and is stored
+tagged with its registered name. Reading an entry can only ever rebuild
+those types, unlike unpickling, which runs whatever the entry names.
+"""
+from typing import Any, Callable, Dict, Tuple
+
+import orjson
+
+_TAG = "__cached__"
+_TAG_BYTES = _TAG.encode()
+
+# type -> (tag, encode); tag -> decode
+_encoders: Dict[type, Tuple[str, Callable[[Any], Any]]] = {}
+_decoders: Dict[str, Callable[[Any], Any]] = {}
+
+
+class CodecError(TypeError):
+    pass
+
+
+def register(cls: type, tag: str, encode: Callable[[Any], Any], decode: Callable[[Any], Any]):
+    """Let `cls` be cached: `encode(obj)` returns JSON data, `decode(data)` rebuilds the object."""
+    _encoders[cls] = (tag, encode)
+    _decoders[tag] = decode
+
+
+def _default(obj):
+    codec = _encoders.get(type(obj))
+    if codec is None:
+        raise CodecError(f"{type(obj).__name__} is not registered with app.cache.codec")
+    tag, encode = codec
+    return {_TAG: tag, "data": encode(obj)}
+
+
+def dumps(value) -> bytes:
+    try:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    except orjson.JSONEncodeError as e:
+        raise CodecError(str(e)) from e
+
+
+def _revive(value):
+    if isinstance(value, dict):
+        tag = value.get(_TAG)
+        if tag is not None:
+            decode = _decoders.get(tag)
+            if decode is None:
+                raise CodecError(f"Unknown cached type {tag!r}")
+            return decode(_revive(value["data"]))
+        return {k: _revive(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_revive(v) for v in value]
+    return value
+
+
+def loads(data: bytes):
+    value = orjson.loads(data)
+    # Only walk entries that hold a registered type
+    return _revive(value) if _TAG_BYTES in data else value
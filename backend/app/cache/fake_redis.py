@@ -0,0 +1,122 @@
+"""
+A tiny in-memory Redis stand-in speaking RESP2, for running the redis cache
+backend locally and in tests without a Redis server.
+
+    python -m app.cache.fake_redis --port 6390
+    CACHE_BACKEND=redis CACHE_REDIS_URL=redis://localhost:6390/0 uvicorn app.main:app --workers 4
+
+Supports PING, GET, SET (EX/PX/NX/XX), DEL, INCR, EXISTS, SELECT, AUTH,
+FLUSHDB and DBSIZE; one keyspace, single-threaded like the real thing.
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+_store: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+
+
+def _get(key: bytes) -> Optional[bytes]:
+    entry = _store.get(key)
+    if entry is None:
+        return None
+    if entry[1] is not None and entry[1] <= time.monotonic():
+        del _store[key]
+        return None
+    return entry[0]
+
+
+def _encode(reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return b"-ERR %s\r\n" % str(reply).encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode()
+    return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+
+def _execute(args):
+    command = args[0].upper()
+    if command == b"PING":
+        return "PONG"
+    if command in (b"SELECT", b"AUTH"):
+        return "OK"
+    if command == b"GET":
+        return _get(args[1])
+    if command == b"SET":
+        key, value, expires_at, options = args[1], args[2], None, [a.upper() for a in args[3:]]
+        for i, option in enumerate(options):
+            if option == b"EX":
+                expires_at = time.monotonic() + int(args[4 + i])
+            elif option == b"PX":
+                expires_at = time.monotonic() + int(args[4 + i]) / 1000
+        exists = _get(key) is not None
+        if (b"NX" in options and exists) or (b"XX" in options and not exists):
+            return None
+        _store[key] = (value, expires_at)
+        return "OK"
+    if command == b"DEL":
+        return sum(_store.pop(key, None) is not None for key in args[1:])
+    if command == b"EXISTS":
+        return sum(_get(key) is not None for key in args[1:])
+    if command == b"INCR":
+        value = int(_get(args[1]) or 0) + 1
+        _store[args[1]] = (str(value).encode(), _store.get(args[1], (None, None))[1])
+        return value
+    if command == b"FLUSHDB":
+        _store.clear()
+        return "OK"
+    if command == b"DBSIZE":
+        return len(_store)
+    return ValueError(f"unknown command '{command.decode()}'")
+
+
+async def _read_command(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.split()  # inline command, e.g. from telnet
+    args = []
+    for _ in range(int(line[1:-2])):
+        length = int((await reader.readline())[1:-2])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            args = await _read_command(reader)
+            if args is None:
+                break
+            if not args:
+                continue
+            try:
+                reply = _execute(args)
+            except (IndexError, ValueError) as e:
+                reply = ValueError(str(e) or "syntax error")
+            writer.write(_encode(reply))
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 6390):
+    server = await asyncio.start_server(_handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-memory Redis stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    print(f"fake redis listening on {args.host}:{args.port}")
+    asyncio.run(serve(args.host, args.port))
@@ -0,0 +1,204 @@
+"""
+Admission control.
+
+Requests are classified by path into route classes (catalog, cart,
+checkout, auth, other). Each class has its own concurrency limit, and all
+of them share a worker-wide limit sized to the threadpool, so work waits
+here, where it can be refused, rather than invisibly in the threadpool
+queue. A request that cannot start waits in a bounded queue for at most
+its class's deadline; when the queue is full or the deadline passes it
+gets an immediate 503 with Retry-After instead of being served after the
+client has given up. Freed slots go to the highest-priority waiter first,
+so checkout is admitted ahead of browsing.
+
+ADMISSION_LIMITS overrides per-class settings as
+"class=limit/queue/max_wait_seconds,...".
+"""
+import asyncio
+import bisect
+import itertools
+import os
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() != "false"
+# Anyio's default threadpool has 40 threads; admitting more only queues there
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "40"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "2"))
+
+
+class RouteClass:
+    def __init__(self, name: str, limit: int, queue_size: int, max_wait: float, priority: int):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.priority = priority  # lower is admitted first
+        self.active = 0
+        self.queued = 0
+        self.stats: Counter = Counter()
+
+
+# Bcrypt is CPU-bound, so auth gets about one slot per core
+DEFAULT_CLASSES = {
+    "checkout": (16, 64, 10.0, 0),
+    "auth": (os.cpu_count() or 4, 32, 5.0, 1),
+    "cart": (16, 64, 3.0, 1),
+    "other": (16, 64, 3.0, 1),
+    "catalog": (24, 128, 1.0, 2),
+}
+
+
+def _route_classes() -> Dict[str, RouteClass]:
+    settings = {name: list(values) for name, values in DEFAULT_CLASSES.items()}
+    for item in os.getenv("ADMISSION_LIMITS", "").split(","):
+        if "=" in item:
+            name, _, values = item.partition("=")
+            limit, queue_size, max_wait = values.split("/")
+            settings[name.strip()][:3] = [int(limit), int(queue_size), float(max_wait)]
+    return {name: RouteClass(name, *values) for name, values in settings.items()}
+
+
+class Overloaded(Exception):
+    pass
+
+
+class AdmissionController:
+    """Per-class and worker-wide concurrency limits with a priority wait queue. Event-loop only."""
+
+    def __init__(self, classes: Dict[str, RouteClass], max_concurrency: int):
+        self.classes = classes
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        # Sorted by (priority, arrival); entries are (priority, seq, class, future)
+        self._waiters: List[Tuple[int, int, RouteClass, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    def _can_start(self, route_class: RouteClass) -> bool:
+        return route_class.active < route_class.limit and self.active < self.max_concurrency
+
+    def _start(self, route_class: RouteClass):
+        route_class.active += 1
+        self.active += 1
+        route_class.stats["admitted"] += 1
+
+    async def acquire(self, route_class: RouteClass):
+        """Wait for a slot; raises Overloaded if the queue is full or the deadline passes."""
+        # Do not jump ahead of waiters with the same or higher priority that could start
+        ahead = any(p <= route_class.priority and c.active < c.limit for p, _, c, _ in self._waiters)
+        if not ahead and self._can_start(route_class):
+            self._start(route_class)
+            return
+        if route_class.queued >= route_class.queue_size:
+            route_class.stats["shed_queue_full"] += 1
+            raise Overloaded()
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (route_class.priority, next(self._seq), route_class, future)
+        bisect.insort(self._waiters, entry, key=lambda w: w[:2])
+        route_class.queued += 1
+        self._dispatch()
+        try:
+            await asyncio.wait_for(future, route_class.max_wait)
+            route_class.stats["admitted_after_wait"] += 1
+        except asyncio.TimeoutError:
+            route_class.stats["shed_timeout"] += 1
+            raise Overloaded() from None
+        except BaseException:
+            # Cancelled (client gone) after being granted a slot: hand it on
+            if future.done() and not future.cancelled():
+                self.release(route_class)
+            raise
+        finally:
+            route_class.queued -= 1
+            if future.cancelled() and entry in self._waiters:
+                self._waiters.remove(entry)
+                self._dispatch()  # it may have been what others queued behind
+
+    def release(self, route_class: RouteClass):
+        route_class.active -= 1
+        self.active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        # Highest priority first; a waiter whose own class is full does not block others
+        index = 0
+        while index < len(self._waiters) and self.active < self.max_concurrency:
+            _, _, route_class, future = self._waiters[index]
+            if route_class.active < route_class.limit and not future.done():
+                del self._waiters[index]
+                self._start(route_class)
+                future.set_result(None)
+            else:
+                index += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "classes": {
+                name: {
+                    "active": c.active, "queued": c.queued, "limit": c.limit,
+                    "queue_size": c.queue_size, "max_wait": c.max_wait, **c.stats,
+                }
+                for name, c in self.classes.items()
+            },
+        }
+
+
+admission = AdmissionController(_route_classes(), ADMISSION_MAX_CONCURRENCY)
+
+_BUSY_BODY = orjson.dumps({"detail": "Server is busy, please retry shortly"})
+
+
+class AdmissionMiddleware:
+    """
+    Admits each HTTP request through `admission` under the class of the
+    longest matching path prefix in `routes` ("other" if none). Paths in
+    `exempt` (health checks, long-lived streams, static files) and CORS
+    preflights are never limited.
+    """
+
+    def __init__(self, app, routes: Iterable[Tuple[str, str]], exempt: Iterable[str] = (),
+                 exempt_suffixes: Iterable[str] = ()):
+        self.app = app
+        self.routes = sorted(routes, key=lambda r: len(r[0]), reverse=True)
+        self.exempt = tuple(exempt)
+        self.exempt_suffixes = tuple(exempt_suffixes)
+
+    def classify(self, path: str) -> Optional[str]:
+        if path in ("/", "/health") or path.startswith(self.exempt) or path.endswith(self.exempt_suffixes):
+            return None
+        for prefix, name in self.routes:
+            if path.startswith(prefix):
+                return name
+        return "other"
+
+    async def __call__(self, scope, receive, send):
+        if not ADMISSION_ENABLED or scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+        name = self.classify(scope["path"])
+        if name is None:
+            return await self.app(scope, receive, send)
+
+        route_class = admission.classes[name]
+        try:
+            await admission.acquire(route_class)
+        except Overloaded:
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_BUSY_BODY)).encode()),
+                    (b"retry-after", str(ADMISSION_RETRY_AFTER_SECONDS).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": _BUSY_BODY})
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(route_class)
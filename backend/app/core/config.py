@@ -10,6 +10,35 @@ class Settings(BaseModel):
     for origin in os.getenv("ALLOWED_ORIGINS", "").split(",")
     if origin.strip()
 ]
+    # Read-only replicas for GET traffic; empty means everything uses the primary
+    read_replica_urls: list[str] = [
+    url.strip()
+    for url in os.getenv("READ_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+    # Signs access tokens
+    secret_key: str = os.getenv("SECRET_KEY", "dev-secret-key-do-not-use-in-prod")
+    jwt_algorithm: str = "HS256"
+    # How long a user's reads stay on the primary after they write
+    replica_sticky_seconds: float = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+    # SQLite mode (DATABASE_URL=sqlite:///file): WAL and tuned pragmas, one writer
+    # connection per worker that writes queue for, reads on a pool of their own
+    sqlite_tuning: bool = os.getenv("SQLITE_TUNING", "true").lower() != "false"
+    sqlite_busy_timeout_ms: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    sqlite_mmap_size: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    sqlite_cache_size_kb: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))
+    # Reader connections kept open; more are opened (never waited for) under load
+    sqlite_reader_pool_size: int = int(os.getenv("SQLITE_READER_POOL_SIZE", "8"))
+    sqlite_write_wait_seconds: float = float(os.getenv("SQLITE_WRITE_WAIT_SECONDS", "30"))
+    # How long a request's SQL may run in total; clients can ask for less with X-Request-Timeout
+    request_timeout_seconds: float = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "15"))
+    # Per-route overrides, "path_prefix=seconds,..."; the longest matching prefix wins
+    request_timeouts: dict[str, float] = {
+    prefix.strip(): float(seconds)
+    for prefix, seconds in (
+        item.split("=") for item in os.getenv("REQUEST_TIMEOUTS", "/api/admin=120").split(",") if item.strip()
+    )
+}
 
 
 
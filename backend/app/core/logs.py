@@ -0,0 +1,263 @@
+"""
+Structured logging.
+
+`configure_logging()` routes every logger through one bounded queue to a
+background listener thread, which writes JSON lines (or plain text with
+LOG_FORMAT=text) to stdout. Request threads only copy the record onto
+the queue: they never block on stdout, and when the queue is full the
+record is dropped and counted rather than waited on.
+
+Before a record is queued it is:
+- sampled: LOG_SAMPLE_RATES ("app.access=0.1,...", longest logger prefix
+  wins) keeps a fraction of a hot logger's records below WARNING;
+- stamped with the current request id (see RequestLogMiddleware);
+- redacted: secret-looking `extra` fields and `key=value` / bearer / JWT
+  fragments in the message are masked, unless LOG_REDACT=false.
+
+`logging_stats()` reports queued, dropped and sampled-out counts.
+"""
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import orjson
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_REDACT = os.getenv("LOG_REDACT", "true").lower() != "false"
+LOG_SAMPLE_RATES: Dict[str, float] = {
+    name.strip(): float(rate)
+    for name, rate in (
+        item.split("=") for item in os.getenv("LOG_SAMPLE_RATES", "app.access=0.1").split(",") if item.strip()
+    )
+}
+# Requests slower than this are logged at WARNING, so sampling never hides them
+LOG_SLOW_REQUEST_MS = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000"))
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+REDACTED = "[redacted]"
+SECRET_FIELDS = {
+    "password", "new_password", "otp", "reset_code", "token", "access_token", "refresh_token",
+    "secret", "api_key", "authorization", "cookie", "signature",
+}
+_SECRET_PATTERNS = [
+    # password=..., otp: 123456, "api_key": "..."
+    (re.compile(r"(?i)\b(password|passwd|otp|reset_code|token|secret|api[_-]?key)(\"?\s*[:=]\s*\"?)([^\s,;&\"]+)"),
+     r"\1\2" + REDACTED),
+    (re.compile(r"(?i)\bbearer\s+[\w.~+/=-]+"), "Bearer " + REDACTED),
+    (re.compile(r"\beyJ[\w-]+\.[\w-]+\.[\w-]*"), REDACTED),  # JWTs
+    (re.compile(r"(://[^:/@\s]+:)[^@\s]+@"), r"\1" + REDACTED + "@"),  # URL credentials
+]
+
+# Attributes every LogRecord has; anything else came from `extra`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+stats: Counter = Counter()
+
+
+# Cheap substring pre-check; most messages contain none and skip the regexes
+_SECRET_HINTS = ("pass", "otp", "reset_code", "token", "secret", "key", "bearer", "eyj", "://")
+
+
+def redact(text: str) -> str:
+    lowered = text.lower()
+    if not any(hint in lowered for hint in _SECRET_HINTS):
+        return text
+    for pattern, replacement in _SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """Samples, stamps and redacts on the caller's thread, then enqueues without blocking."""
+
+    def __init__(self, log_queue: queue.SimpleQueue, max_size: int, sample_rates: Dict[str, float]):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self.sample_rates = sample_rates
+        self._rates: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._rates.get(name)
+        if rate is None:
+            matches = [p for p in self.sample_rates if name == p or name.startswith(p + ".")]
+            rate = self._rates[name] = self.sample_rates[max(matches, key=len)] if matches else 1.0
+        return rate
+
+    def handle(self, record):
+        # The queue is thread-safe; skip the handler lock Handler.handle takes
+        if self.filter(record):
+            self.emit(record)
+        return True
+
+    def emit(self, record):
+        if record.levelno < logging.WARNING:
+            rate = self._rate(record.name)
+            if rate < 1.0 and random.random() >= rate:
+                stats["sampled_out"] += 1
+                return
+        # SimpleQueue never blocks and is much cheaper than Queue; bound it here
+        if self.queue.qsize() >= self.max_size:
+            stats["dropped"] += 1
+            return
+        try:
+            self.enqueue(self.prepare(record))
+            stats["queued"] += 1
+        except Exception:
+            self.handleError(record)
+
+    def prepare(self, record):
+        # Copy so other handlers (e.g. test capture) see the record untouched;
+        # a plain __dict__ copy is several times cheaper than copy.copy
+        prepared = logging.LogRecord.__new__(logging.LogRecord)
+        prepared.__dict__.update(record.__dict__)
+        record = prepared
+        record.request_id = request_id_var.get()
+        message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        if LOG_REDACT:
+            message = redact(message)
+            for key in SECRET_FIELDS & record.__dict__.keys():
+                record.__dict__[key] = REDACTED
+        record.message = record.msg = message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.message,
+        }
+        if record.request_id:
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s")  # only so format() fills in asctime
+
+    def formatMessage(self, record):
+        line = f"{record.asctime} {record.levelname:<7} {record.name} [{record.request_id or '-'}] {record.message}"
+        extras = " ".join(f"{k}={v}" for k, v in record.__dict__.items() if k not in _RECORD_FIELDS)
+        return f"{line} {extras}" if extras else line
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging():
+    """Install the queue handler on the root logger. Safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)  # flush what is still queued
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueLogHandler(log_queue, LOG_QUEUE_SIZE, LOG_SAMPLE_RATES))
+    root.setLevel(LOG_LEVEL)
+
+    # Uvicorn's own handlers would write synchronously; send its records
+    # through ours. Its access log is replaced by app.access.
+    for name in ("uvicorn", "uvicorn.error"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+    logging.getLogger("uvicorn.access").disabled = True
+
+
+def logging_stats() -> dict:
+    return {
+        **{k: stats[k] for k in ("queued", "dropped", "sampled_out")},
+        "queue_depth": _listener.queue.qsize() if _listener else 0,
+    }
+
+
+access_log = logging.getLogger("app.access")
+_REQUEST_ID = re.compile(r"^[\w.:-]{1,64}$")
+
+
+class RequestLogMiddleware:
+    """
+    Gives each request an id (the client's X-Request-ID if well-formed),
+    exposes it to log records and the response, and writes one access
+    log line per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                request_id = candidate if _REQUEST_ID.match(candidate) else None
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        except Exception:
+            access_log.exception("Unhandled error in %s %s", scope["method"], scope["path"])
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            if status >= 500:
+                level = logging.ERROR
+            elif duration_ms >= LOG_SLOW_REQUEST_MS:
+                level = logging.WARNING
+            else:
+                level = logging.INFO
+            if access_log.isEnabledFor(level):
+                access_log.log(level, "%s %s %d", scope["method"], scope["path"], status, extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round(duration_ms, 2),
+                })
+            request_id_var.reset(token)
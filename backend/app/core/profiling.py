@@ -0,0 +1,215 @@
+"""
+On-demand profiling for admins, with nothing running until asked.
+
+Per request: send `X-Profile: text` (or `?profile=text`) with an admin
+token and the response is replaced by a cProfile report of that request;
+`prof` returns the raw pstats dump instead (snakeviz, flameprof,
+gprof2dot). cProfile only sees the thread it is enabled on, so the event
+loop is profiled around the request and `instrument_routes` wraps sync
+endpoints to profile their threadpool thread too. The loop-side profile
+also counts other requests' work done while this one awaited.
+
+Whole worker: `sample_stacks` polls every thread's stack for a few
+seconds and returns collapsed stacks ("a;b;c count"), the input format
+of flamegraph.pl, inferno and speedscope.
+"""
+import cProfile
+import contextvars
+import functools
+import inspect
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, List, Optional
+from urllib.parse import parse_qs
+
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "60"))
+PROFILE_MAX_SECONDS = 60
+
+# Leaf frames in these files (or functions) mean the thread is parked, not working
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+_IDLE_FUNCTIONS = {"dequeue"}  # logging's QueueListener waiting for records
+
+
+class RequestProfile:
+    def __init__(self):
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def add(self, profile: cProfile.Profile):
+        with self._lock:
+            self.profiles.append(profile)
+
+    def stats(self) -> pstats.Stats:
+        profiles = [p for p in self.profiles if p.getstats()]
+        stats = pstats.Stats(profiles[0], stream=io.StringIO())
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+
+current_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+
+
+def _profiled(call: Callable) -> Callable:
+    @functools.wraps(call)
+    def run(*args, **kwargs):
+        capture = current_profile.get()
+        if capture is None:
+            return call(*args, **kwargs)
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            profile.disable()
+            capture.add(profile)
+
+    return run
+
+
+def instrument_routes(app):
+    """Let profiled requests see inside sync endpoints, which run on threadpool threads."""
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        call = route.dependant.call
+        if getattr(call, "_profiled", False) or inspect.iscoroutinefunction(call):
+            continue
+        wrapped = _profiled(call)
+        wrapped._profiled = True
+        # FastAPI reads dependant.call per request, so this takes effect as is
+        route.dependant.call = wrapped
+
+
+def _requested_format(scope) -> Optional[str]:
+    """"text" or "prof" if the request asks to be profiled, else None."""
+    requested = None
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            requested = value.decode("latin-1").strip().lower()
+            break
+    else:
+        if b"profile=" in scope.get("query_string", b""):
+            requested = (parse_qs(scope["query_string"].decode("latin-1")).get("profile") or [None])[0]
+    if requested is None:
+        return None
+    return "prof" if requested == "prof" else "text"
+
+
+def _bearer_token(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization" and value[:7].lower() == b"bearer ":
+            return value[7:].decode("latin-1")
+    return None
+
+
+class ProfileMiddleware:
+    """Replaces an admin's flagged response with a cProfile report of the request."""
+
+    def __init__(self, app, is_admin: Callable[[str], bool]):
+        self.app = app
+        self.is_admin = is_admin
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        fmt = _requested_format(scope)
+        token = _bearer_token(scope) if fmt else None
+        if not token or not await run_in_threadpool(self.is_admin, token):
+            return await self.app(scope, receive, send)
+
+        capture = RequestProfile()
+        status = 500
+
+        async def discard(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        context_token = current_profile.set(capture)
+        loop_profile = cProfile.Profile()
+        started = time.perf_counter()
+        loop_profile.enable()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            loop_profile.disable()
+            current_profile.reset(context_token)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        capture.add(loop_profile)
+
+        stats = capture.stats()
+        if fmt == "prof":
+            body, media_type = marshal.dumps(stats.stats), b"application/octet-stream"
+        else:
+            stats.stream = io.StringIO()
+            stats.strip_dirs().sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+            body, media_type = stats.stream.getvalue().encode(), b"text/plain; charset=utf-8"
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", media_type),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-profile-status", str(status).encode()),
+                (b"x-profile-duration-ms", f"{elapsed_ms:.1f}".encode()),
+                (b"cache-control", b"no-store"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+_sampling = threading.Lock()
+
+
+class SamplerBusy(Exception):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005, include_idle: bool = False) -> str:
+    """
+    Sample every thread's stack every `interval` for `seconds` and return
+    collapsed stacks, root first, prefixed with the thread name. Blocks
+    the calling thread; one sampling run per process at a time.
+    """
+    if not _sampling.acquire(blocking=False):
+        raise SamplerBusy()
+    try:
+        me = threading.get_ident()
+        counts: Counter = Counter()
+        deadline = time.monotonic() + min(seconds, PROFILE_MAX_SECONDS)
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if not include_idle and (frame.f_code.co_filename.endswith(_IDLE_FILES)
+                                         or frame.f_code.co_name in _IDLE_FUNCTIONS):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                counts[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+    finally:
+        _sampling.release()
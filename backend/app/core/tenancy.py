@@ -0,0 +1,293 @@
+"""
+Tenants: several storefront brands served by one deployment.
+
+`TenantMiddleware` resolves the tenant from the Host header (via the
+tenant_domains table) and sets `current_tenant` for the request. Models
+with the `TenantScoped` mixin get a tenant_id column that defaults to
+the current tenant, and every ORM SELECT / UPDATE / DELETE issued while
+a tenant is set is filtered to it (see `_scope_to_tenant`). Code running
+outside a request (background jobs, CLIs) has no tenant and sees every
+tenant's rows; `.execution_options(all_tenants=True)` does the same
+for one statement inside a request, and `all_tenants()` for a block.
+
+Tenant configs (name and settings overrides) are loaded on first use
+and kept in a small per-worker LRU, as are per-tenant in-process
+structures such as search indexes (`TenantLocal`). Hosts that match no
+tenant are served as the default tenant, or refused with
+TENANT_STRICT_HOSTS=true.
+
+Tables from before tenants get their tenant_id from
+`python -m app.seed.migrate` (app.utils.migrations).
+"""
+import contextvars
+from contextlib import contextmanager
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+import orjson
+from sqlalchemy import Column, ForeignKey, Integer, event, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, declared_attr, with_loader_criteria
+from starlette.concurrency import run_in_threadpool
+
+DEFAULT_TENANT_ID = 1
+DEFAULT_TENANT_SLUG = os.getenv("TENANT_DEFAULT_SLUG", "default")
+TENANT_STRICT_HOSTS = os.getenv("TENANT_STRICT_HOSTS", "false").lower() == "true"
+TENANT_CACHE_SIZE = int(os.getenv("TENANT_CACHE_SIZE", "512"))
+TENANT_CACHE_TTL_SECONDS = float(os.getenv("TENANT_CACHE_TTL_SECONDS", "60"))
+
+
+class TenantConfig:
+    """A tenant as requests see it: identity plus its settings overrides."""
+
+    def __init__(self, id: int, slug: str, name: str, settings: Optional[dict] = None):
+        self.id = id
+        self.slug = slug
+        self.name = name
+        self.settings = settings or {}
+
+    def setting(self, name: str, default: Any = None) -> Any:
+        return self.settings.get(name, default)
+
+
+current_tenant: contextvars.ContextVar[Optional[TenantConfig]] = contextvars.ContextVar(
+    "current_tenant", default=None
+)
+
+
+def current_tenant_id() -> int:
+    """The request's tenant id; the default tenant outside a request."""
+    tenant = current_tenant.get()
+    return tenant.id if tenant is not None else DEFAULT_TENANT_ID
+
+
+def tenant_setting(name: str, default: Any = None) -> Any:
+    """A setting of the current tenant, else `default` (the global value)."""
+    tenant = current_tenant.get()
+    return tenant.setting(name, default) if tenant is not None else default
+
+
+def tenant_key(key: str) -> str:
+    """Prefix a cache key with the current tenant, for caches shared by all tenants."""
+    return f"t{current_tenant_id()}:{key}"
+
+
+class TenantScoped:
+    """Mixin for models whose rows belong to one tenant."""
+
+    @declared_attr
+    def tenant_id(cls):
+        # A Python default, so Core inserts (including INSERT ... SELECT) get it too
+        return Column(Integer, ForeignKey("tenants.id"), nullable=False, index=True, default=current_tenant_id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _scope_to_tenant(state):
+    tenant = current_tenant.get()
+    if tenant is None or state.execution_options.get("all_tenants"):
+        return
+    if state.is_select and (state.is_column_load or state.is_relationship_load):
+        return  # loads reached through an already scoped parent
+    if state.is_select or state.is_update or state.is_delete:
+        # Not applied to bulk UPDATE by primary key (a list of parameter
+        # dicts): its ids must come from a query that was scoped
+        tenant_id = tenant.id
+        state.statement = state.statement.options(
+            with_loader_criteria(TenantScoped, lambda cls: cls.tenant_id == tenant_id, include_aliases=True)
+        )
+
+
+T = TypeVar("T")
+
+
+class TenantLocal(Generic[T]):
+    """
+    One object per tenant, built by `factory(tenant_id)` on first use and
+    evicted least-recently-used beyond `max_tenants`, so hundreds of small
+    tenants cost only as much memory as the busy ones.
+    """
+
+    def __init__(self, factory: Callable[[int], T], max_tenants: int = TENANT_CACHE_SIZE):
+        self.factory = factory
+        self.max_tenants = max_tenants
+        self._items: "OrderedDict[int, T]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: Optional[int] = None) -> T:
+        tenant_id = current_tenant_id() if tenant_id is None else tenant_id
+        with self._lock:
+            item = self._items.get(tenant_id)
+            if item is not None:
+                self._items.move_to_end(tenant_id)
+                return item
+            item = self._items[tenant_id] = self.factory(tenant_id)
+            while len(self._items) > self.max_tenants:
+                self._items.popitem(last=False)
+            return item
+
+    def loaded(self) -> Dict[int, T]:
+        with self._lock:
+            return dict(self._items)
+
+
+def _load_tenant(host: Optional[str] = None, slug: Optional[str] = None) -> Optional[TenantConfig]:
+    """Active tenant by host or slug (neither: the default tenant), from the database."""
+    from ..database import SessionLocal
+    from ..models import Tenant, TenantDomain
+
+    with SessionLocal() as db:
+        query = db.query(Tenant).filter(Tenant.is_active == True)
+        if host is not None:
+            query = query.join(TenantDomain, TenantDomain.tenant_id == Tenant.id).filter(TenantDomain.host == host)
+        elif slug is not None:
+            query = query.filter(Tenant.slug == slug)
+        else:
+            query = query.filter(Tenant.id == DEFAULT_TENANT_ID)
+        tenant = query.first()
+        if tenant is None:
+            return None
+        return TenantConfig(tenant.id, tenant.slug, tenant.name, tenant.settings)
+
+
+@contextmanager
+def tenant_context(slug: str):
+    """Act as the tenant `slug` outside a request, e.g. in a CLI. Raises LookupError if unknown."""
+    tenant = _load_tenant(slug=slug)
+    if tenant is None:
+        raise LookupError(f"No active tenant {slug!r}")
+    token = current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        current_tenant.reset(token)
+
+
+@contextmanager
+def all_tenants():
+    """Act for no tenant inside a request: ORM statements in the block see every tenant's rows."""
+    token = current_tenant.set(None)
+    try:
+        yield
+    finally:
+        current_tenant.reset(token)
+
+
+class TenantRegistry:
+    """Host -> TenantConfig, loaded lazily and kept in an LRU with a TTL."""
+
+    def __init__(self, max_hosts: int = TENANT_CACHE_SIZE, ttl: float = TENANT_CACHE_TTL_SECONDS):
+        self.max_hosts = max_hosts
+        self.ttl = ttl
+        # Misses are cached too, so unknown Host headers cannot hammer the database
+        self._entries: "OrderedDict[Optional[str], Tuple[Optional[TenantConfig], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, host: Optional[str]) -> Tuple[bool, Optional[TenantConfig]]:
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None or entry[1] <= time.monotonic():
+                return False, None
+            self._entries.move_to_end(host)
+            return True, entry[0]
+
+    def resolve(self, host: Optional[str]) -> Optional[TenantConfig]:
+        found, tenant = self.cached(host)
+        if found:
+            return tenant
+        tenant = _load_tenant(host)
+        with self._lock:
+            self._entries[host] = (tenant, time.monotonic() + self.ttl)
+            self._entries.move_to_end(host)
+            while len(self._entries) > self.max_hosts:
+                self._entries.popitem(last=False)
+        return tenant
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"hosts_cached": len(self._entries), "max_hosts": self.max_hosts}
+
+
+tenant_registry = TenantRegistry()
+
+
+def _host(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"host":
+            host = value.decode("latin-1").strip().lower()
+            if host.startswith("["):  # IPv6 literal
+                return host.partition("]")[0] + "]"
+            return host.partition(":")[0].rstrip(".") or None
+    return None
+
+
+_UNKNOWN_HOST_BODY = orjson.dumps({"detail": "Unknown storefront"})
+
+
+class TenantMiddleware:
+    """
+    Sets `current_tenant` from the Host header for the rest of the request.
+    Paths under `exempt` (health checks, which load balancers send to bare
+    IPs) are served even when strict hosts refuse the host.
+    """
+
+    def __init__(self, app, exempt: Tuple[str, ...] = ()):
+        self.app = app
+        self.exempt = tuple(exempt)
+
+    async def _resolve(self, host: Optional[str]) -> Optional[TenantConfig]:
+        found, tenant = tenant_registry.cached(host)
+        if not found:
+            tenant = await run_in_threadpool(tenant_registry.resolve, host)
+        return tenant
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+        host = _host(scope)
+        tenant = await self._resolve(host) if host else None
+        if tenant is None and not TENANT_STRICT_HOSTS:
+            tenant = await self._resolve(None)
+        if tenant is None and not scope["path"].startswith(self.exempt):
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 1008})
+                return
+            await send({
+                "type": "http.response.start",
+                "status": 404,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_UNKNOWN_HOST_BODY)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": _UNKNOWN_HOST_BODY})
+            return
+        token = current_tenant.set(tenant)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
+
+
+def ensure_default_tenant(db: Session):
+    """Create the default tenant (id 1), which existing single-store data belongs to."""
+    from ..models import Tenant
+
+    if db.get(Tenant, DEFAULT_TENANT_ID) is None:
+        db.add(Tenant(id=DEFAULT_TENANT_ID, slug=DEFAULT_TENANT_SLUG, name="Default storefront"))
+        try:
+            db.flush()
+        except IntegrityError:
+            db.rollback()  # another worker starting alongside created it
+            return
+        if db.get_bind().dialect.name == "postgresql":
+            # The explicit id did not advance the sequence
+            db.execute(text("SELECT setval(pg_get_serial_sequence('tenants', 'id'), (SELECT max(id) FROM tenants))"))
+        db.commit()
+
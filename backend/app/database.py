@@ -1,16 +1,176 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import itertools
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
 from .core.config import settings
 
-# Create engine with proper PostgreSQL configuration
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=False  # Set to True for SQL debugging
+_url = make_url(settings.database_url)
+# SQLite mode needs a file: separate connections to ":memory:" are separate databases
+SQLITE_TUNED = (
+    settings.sqlite_tuning
+    and _url.get_backend_name() == "sqlite"
+    and _url.database not in (None, "", ":memory:")
+)
+
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode = WAL",  # readers and the writer no longer block each other
+    "PRAGMA synchronous = NORMAL",  # WAL stays consistent; only the last commits can be lost on power loss
+    f"PRAGMA busy_timeout = {settings.sqlite_busy_timeout_ms}",  # other worker processes' writers
+    f"PRAGMA mmap_size = {settings.sqlite_mmap_size}",
+    f"PRAGMA cache_size = -{settings.sqlite_cache_size_kb}",
+    "PRAGMA temp_store = MEMORY",
+]
+
+
+def _tune_sqlite(sqlite_engine, writer: bool):
+    @event.listens_for(sqlite_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        # Stop the driver issuing its own deferred BEGIN; _on_begin does it
+        dbapi_connection.isolation_level = None
+        for pragma in SQLITE_PRAGMAS:
+            dbapi_connection.execute(pragma)
+        if not writer:
+            dbapi_connection.execute("PRAGMA query_only = ON")
+
+    @event.listens_for(sqlite_engine, "begin")
+    def _on_begin(connection):
+        # The writer takes the write lock up front: a deferred transaction that
+        # read first can fail with "database is locked" when it tries to write
+        connection.exec_driver_sql("BEGIN IMMEDIATE" if writer else "BEGIN")
+
+
+if SQLITE_TUNED:
+    # The one connection that writes; its pool is the queue writers wait in
+    engine = create_engine(
+        settings.database_url, pool_size=1, max_overflow=0,
+        pool_timeout=settings.sqlite_write_wait_seconds, echo=False,
+    )
+    # Reads run in parallel on their own connections (WAL snapshots). Never make
+    # them wait: a request waiting for the writer may hold a reader, and the
+    # writer's holder may need one (a second session) before it can commit.
+    read_engine = create_engine(
+        settings.database_url, pool_size=settings.sqlite_reader_pool_size, max_overflow=-1, echo=False,
+    )
+    _tune_sqlite(engine, writer=True)
+    _tune_sqlite(read_engine, writer=False)
+else:
+    # Create engine with proper PostgreSQL configuration
+    engine = create_engine(
+        settings.database_url,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        echo=False  # Set to True for SQL debugging
+    )
+    read_engine = engine
+
+
+def _is_write(clause) -> bool:
+    if isinstance(clause, TextClause):
+        # Raw SQL: only a plain SELECT is known to be a read
+        return not clause.text.lstrip()[:6].lower() == "select"
+    return isinstance(clause, UpdateBase) or getattr(clause, "_for_update_arg", None) is not None
+
+
+class SQLiteSession(Session):
+    """
+    Routes statements between the SQLite writer and reader engines.
+
+    A session made with info={"writer": True} (get_db does so for requests
+    that are not reads) uses the writer from its first statement, so a
+    read-modify-write runs under the write lock and cannot lose a
+    concurrent update. Other sessions read from a reader until the
+    transaction first writes (flush, INSERT / UPDATE / DELETE, SELECT ...
+    FOR UPDATE); from then until it ends, everything goes to the writer
+    so the transaction reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.info.get("writer"):
+            return engine
+        if self.info.get("writing") or self._flushing or _is_write(clause):
+            self.info["writing"] = True
+            return engine
+        return read_engine
+
+
+@event.listens_for(SQLiteSession, "after_transaction_end")
+def _end_writing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("writing", None)
+
+
+SessionLocal = sessionmaker(
+    class_=SQLiteSession if SQLITE_TUNED else Session, autocommit=False, autoflush=False, bind=engine
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Read replicas (READ_REPLICA_URLS). Sessions bound to them refuse to flush.
+replica_engines = [
+    create_engine(url, pool_pre_ping=True, pool_recycle=300, echo=False)
+    for url in settings.read_replica_urls
+]
+ReplicaSessionLocals = [
+    sessionmaker(autocommit=False, autoflush=False, bind=replica, info={"read_only": True})
+    for replica in replica_engines
+]
+_replica_cycle = itertools.cycle(ReplicaSessionLocals)
+
+
+def replica_session() -> Session:
+    """Session on the next replica (round robin), or on the primary if none are configured."""
+    if not ReplicaSessionLocals:
+        return SessionLocal()
+    return next(_replica_cycle)()
+
+
+# SQLite calls the progress handler every this many VM instructions
+SQLITE_PROGRESS_STEPS = 1000
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def set_deadline(session: Session, deadline: float):
+    """Abort the session's SQL once time.monotonic() passes `deadline`."""
+    session.info["deadline"] = deadline
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_deadline(session, transaction, connection):
+    # Per transaction, so a session that commits and carries on gets only what is left
+    deadline = session.info.get("deadline")
+    if deadline is None:
+        return
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded()
+    if connection.dialect.name == "postgresql":
+        # SET LOCAL ends with the transaction, before the connection goes back to the pool
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(1, int(remaining * 1000))}")
+    elif connection.dialect.name == "sqlite":
+        # A non-zero return makes the running statement fail with "interrupted"
+        connection.connection.driver_connection.set_progress_handler(
+            lambda: time.monotonic() > deadline, SQLITE_PROGRESS_STEPS
+        )
+
+
+def _clear_progress_handler(dbapi_connection, connection_record):
+    dbapi_connection.set_progress_handler(None, 0)
+
+
+for _engine in {engine, read_engine, *replica_engines}:
+    if _engine.dialect.name == "sqlite":
+        event.listen(_engine, "checkin", _clear_progress_handler)
+
+
+@event.listens_for(Session, "before_flush")
+def _reject_replica_writes(session, flush_context, instances):
+    if session.info.get("read_only") and (session.new or session.dirty or session.deleted):
+        raise RuntimeError("Attempted to write through a read-replica session")
 
 class Base(DeclarativeBase):
     pass
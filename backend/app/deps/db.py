@@ -1,9 +1,129 @@
-from ..database import SessionLocal
-from typing import Generator
+import logging
+import time
+from typing import Generator, Optional
 
-def get_db() -> Generator:
+from fastapi import HTTPException, Request
+from jose import JWTError, jwt
+from sqlalchemy.exc import OperationalError
+
+from ..cache import get_cache
+from ..core.config import settings
+from ..core.tenancy import DEFAULT_TENANT_ID
+from ..database import DeadlineExceeded, ReplicaSessionLocals, SessionLocal, replica_session, set_deadline
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+_UNSET = object()
+_ROUTE_TIMEOUTS = sorted(settings.request_timeouts.items(), key=lambda item: len(item[0]), reverse=True)
+
+# Read-your-writes: users who just wrote read from the primary for
+# REPLICA_STICKY_SECONDS, until replicas have caught up. Kept in the cache
+# backend, so with a shared one (sqlite, redis) every worker honours a
+# write made through any other.
+sticky_writes = get_cache("sticky-writes", ttl=settings.replica_sticky_seconds)
+
+
+def sticky_key(tenant_id: int, subject: str) -> str:
+    return f"{tenant_id}:{subject}"
+
+
+def mark_written(key: Optional[str]):
+    """Send the user's reads to the primary for the sticky window, starting now."""
+    if key and ReplicaSessionLocals:
+        sticky_writes.set(key, True)
+
+
+def _user_key(request: Request) -> Optional[str]:
+    """Sticky key of the authenticated user, or None for anonymous (or forged) requests."""
+    auth = request.headers.get("authorization", "")
+    if not auth.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(auth[7:], settings.secret_key, algorithms=[settings.jwt_algorithm])
+    except JWTError:
+        return None
+    subject = payload.get("sub")
+    return sticky_key(payload.get("tid", DEFAULT_TENANT_ID), subject) if subject else None
+
+
+def request_deadline(request: Request) -> Optional[float]:
+    """
+    time.monotonic() by which the request's SQL must be done: the route's
+    budget from REQUEST_TIMEOUTS (else REQUEST_TIMEOUT_SECONDS), shortened
+    by an X-Request-Timeout header in seconds. Fixed on first use, so every
+    session of the request shares it. None if the budget is 0.
+    """
+    deadline = getattr(request.state, "deadline", _UNSET)
+    if deadline is not _UNSET:
+        return deadline
+    path = request.url.path
+    budget = next((seconds for prefix, seconds in _ROUTE_TIMEOUTS if path.startswith(prefix)),
+                  settings.request_timeout_seconds)
+    try:
+        asked = float(request.headers.get("x-request-timeout", "0"))
+    except ValueError:
+        asked = 0
+    if asked > 0 and (asked < budget or budget <= 0):
+        budget = asked
+    request.state.deadline = time.monotonic() + budget if budget > 0 else None
+    return request.state.deadline
+
+
+def _deadline_error(error: Exception, deadline: Optional[float]) -> bool:
+    """Whether a failure came from running out of time rather than a real error."""
+    if deadline is None or time.monotonic() < deadline:
+        return False
+    if isinstance(error, HTTPException):
+        # Routes wrap unexpected errors in a 500
+        return error.status_code >= 500
+    return isinstance(error, (DeadlineExceeded, OperationalError))
+
+
+def _with_deadline(db, request: Request) -> Generator:
+    deadline = request_deadline(request)
+    if deadline is not None:
+        set_deadline(db, deadline)
+    try:
+        yield db
+    except Exception as e:
+        if not _deadline_error(e, deadline):
+            raise
+        logger.warning("Request deadline exceeded", extra={"path": request.url.path})
+        raise HTTPException(status_code=504, detail="Request took too long, please retry") from None
+
+
+def get_db(request: Request) -> Generator:
+    """
+    Session for the request: GETs go to a read replica unless the user
+    wrote recently; everything else goes to the primary, and on SQLite to
+    the writer from the first statement (see SQLiteSession). Its SQL is
+    aborted once the request deadline passes, which fails the request
+    with a 504 and frees the pooled connection.
+    """
+    writing = request.method not in READ_METHODS
+    key = _user_key(request) if ReplicaSessionLocals else None
+    if writing:
+        db = SessionLocal(info={"writer": True})
+    elif key and sticky_writes.get(key):
+        db = SessionLocal()
+    else:
+        db = replica_session()
+    if writing:
+        mark_written(key)
+    try:
+        yield from _with_deadline(db, request)
+    finally:
+        db.close()
+        if writing:
+            # Window runs from the end of the write, not its start
+            mark_written(key)
+
+
+def get_primary_db() -> Generator:
+    """Session on the primary, for reads that must see other clients' latest writes."""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
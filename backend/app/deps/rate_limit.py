@@ -0,0 +1,179 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+# memory: per worker process; sqlite: shared by all workers on one host
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "./ratelimit.db")
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true") == "true"
+# Buckets idle this long are full again for every limit we set, so they can be dropped
+RATE_LIMIT_IDLE_SECONDS = 3600
+# Only trust X-Forwarded-For when running behind our own proxy
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false") == "true"
+
+
+class MemoryBackend:
+    """Token buckets in a dict; state is (tokens, last refill time)."""
+
+    blocking = False
+    max_keys = 100_000
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, refill_per_sec: float) -> float:
+        """Take one token; returns 0 if allowed, else seconds until one is free."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_sec)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / refill_per_sec
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now: float, idle_seconds: float = RATE_LIMIT_IDLE_SECONDS):
+        stale = [k for k, (_, updated) in self._buckets.items() if now - updated > idle_seconds]
+        for key in stale:
+            del self._buckets[key]
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBackend:
+    """
+    Token buckets in a local SQLite file, shared across worker processes.
+    `take` may wait on another process's write lock, so call it off the
+    event loop. Idle buckets are deleted every `prune_interval` seconds.
+    """
+
+    blocking = True
+    prune_interval = 300
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._next_prune = 0.0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_buckets_updated ON buckets (updated)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, capacity: int, refill_per_sec: float) -> float:
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - updated) * refill_per_sec)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / refill_per_sec
+            if tokens >= 1:
+                tokens -= 1
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if now >= self._next_prune:
+            self._next_prune = now + self.prune_interval
+            self.prune(now)
+        return wait
+
+    def prune(self, now: float = None, idle_seconds: float = RATE_LIMIT_IDLE_SECONDS) -> int:
+        now = time.time() if now is None else now
+        return self._connect().execute("DELETE FROM buckets WHERE updated < ?", (now - idle_seconds,)).rowcount
+
+    def reset(self):
+        self._connect().execute("DELETE FROM buckets")
+
+
+def _make_backend():
+    if RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteBackend(RATE_LIMIT_SQLITE_PATH)
+    return MemoryBackend()
+
+
+backend = _make_backend()
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimit:
+    """
+    Dependency enforcing a token bucket of `capacity` requests refilled over
+    `per_seconds`, keyed by route plus client IP and/or the request's email.
+
+        @router.post("/login", dependencies=[Depends(RateLimit("login", 10, 60))])
+
+    Runs before the handler and its DB session, so rejected requests never
+    touch the database or the password hasher.
+    """
+
+    def __init__(self, name: str, capacity: int, per_seconds: float, key_by: Iterable[str] = ("ip",)):
+        self.name = name
+        self.capacity = capacity
+        self.refill_per_sec = capacity / per_seconds
+        self.key_by = tuple(key_by)
+
+    async def _email(self, request: Request) -> Optional[str]:
+        try:
+            data = await request.json()  # cached by Starlette for the handler
+        except Exception:
+            return None
+        email = data.get("email") if isinstance(data, dict) else None
+        return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+    async def __call__(self, request: Request):
+        if not RATE_LIMIT_ENABLED:
+            return
+
+        for kind in self.key_by:
+            value = client_ip(request) if kind == "ip" else await self._email(request)
+            if value is None:
+                continue
+            key = f"{self.name}:{kind}:{value}"
+            if backend.blocking:
+                wait = await run_in_threadpool(backend.take, key, self.capacity, self.refill_per_sec)
+            else:
+                wait = backend.take(key, self.capacity, self.refill_per_sec)
+            if wait > 0:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests. Please try again later.",
+                    headers={"Retry-After": str(int(wait) + 1)},
+                )
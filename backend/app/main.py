@@ -1,22 +1,77 @@
+import asyncio
+import logging
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.admission import AdmissionMiddleware
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
-from app.routes import auth, cart, products, orders
-from app.database import Base, engine
-from app.routes import admin_seed
-print("DATABASE_URL:", settings.database_url)
+from app.core.logs import RequestLogMiddleware, configure_logging
+from app.core.profiling import ProfileMiddleware, instrument_routes
+from app.core.static import ImmutableStaticFiles
+from app.core.tenancy import TenantMiddleware, ensure_default_tenant
+from app.routes import auth, cart, products, orders, payments, shipping
+from app.database import Base, engine, SessionLocal
+from app.models import Product
+from app.routes import admin_seed, debug
+from app.routes.auth import is_admin_token
+from app.utils.images import IMAGE_OUTPUT_DIR, IMAGE_URL_PREFIX
+from app.utils.inventory import run_reservation_sweeper
+from app.utils.migrations import pending_migrations
+from app.utils.order_events import run_order_event_relay
+from app.utils.payments import PAYMENT_GATEWAY_URL, run_payment_reconciler
+from app.utils.pricing import price_index, sync_product_variants
+from app.utils.serializers import ORJSONResponse
+from app.utils.shipping import SHIPPING_ENABLED, shipping_index
+
+configure_logging()
+logger = logging.getLogger("app")
+logger.info("Starting", extra={"database": engine.url.render_as_string(hide_password=True)})
 
 # Create tables
 try:
     Base.metadata.create_all(bind=engine)
-    print("✅ Database tables created successfully!")
-except Exception as e:
-    print(f"❌ Database connection failed: {e}")
+    pending = pending_migrations(engine)
+    if pending:
+        logger.error("Database schema is out of date, run python -m app.seed.migrate", extra={"pending": pending})
+    else:
+        logger.info("Database tables ready")
+        with SessionLocal() as db:
+            ensure_default_tenant(db)
+            sync_product_variants(db, db.query(Product).all())
+            db.commit()
+            price_index.invalidate()
+except Exception:
+    logger.exception("Database connection failed")
 
-app = FastAPI(title="Nutrieve API", version="1.0.0")
+app = FastAPI(title="Nutrieve API", version="1.0.0", default_response_class=ORJSONResponse)
 
-# CORS middleware
+app.add_middleware(CompressionMiddleware)
+# X-Profile on an admin request swaps its response for a cProfile report
+app.add_middleware(ProfileMiddleware, is_admin=is_admin_token)
+# Admission control by route class; checkout is admitted ahead of browsing
+app.add_middleware(
+    AdmissionMiddleware,
+    routes=[
+        (orders.router.prefix + "/create", "checkout"),
+        (payments.router.prefix, "checkout"),
+        (auth.router.prefix + "/signup", "auth"),
+        (auth.router.prefix + "/login", "auth"),
+        (auth.router.prefix + "/reset-password", "auth"),
+        (cart.router.prefix, "cart"),
+        (products.router.prefix, "catalog"),
+        (shipping.router.prefix, "catalog"),
+    ],
+    # Long-polls and SSE streams would hold slots for their whole life
+    exempt=(IMAGE_URL_PREFIX, debug.router.prefix),
+    exempt_suffixes=("/events",),
+)
+# Storefront from the Host header, for everything below (and their sessions)
+app.add_middleware(TenantMiddleware, exempt=("/health",))
+# Outside admission and tenancy, so their 503s and 404s carry CORS headers
+# and the browser shows them to the storefront instead of a network error
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.allowed_origins,
@@ -25,13 +80,42 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"]
 )
+# Outermost, so the request id and timing cover every other middleware
+app.add_middleware(RequestLogMiddleware)
 
 # Include routers (IMPORTANT)
 app.include_router(auth.router)
 app.include_router(cart.router)
 app.include_router(products.router)
 app.include_router(orders.router)
+app.include_router(payments.router)
+app.include_router(shipping.router)
 app.include_router(admin_seed.router)
+app.include_router(debug.router)
+instrument_routes(app)
+
+# Generated product images (app.seed.build_images); names are content hashes
+os.makedirs(IMAGE_OUTPUT_DIR, exist_ok=True)
+app.mount(IMAGE_URL_PREFIX, ImmutableStaticFiles(directory=IMAGE_OUTPUT_DIR), name="images")
+
+
+@app.on_event("startup")
+def load_shipping_index():
+    # Builds the index from the CSV if it changed, so the first quote is not slow
+    if SHIPPING_ENABLED:
+        shipping_index.ensure_loaded()
+    else:
+        logger.warning("SHIPPING_ENABLED=false: every pincode is accepted and shipping is free")
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+    asyncio.create_task(run_reservation_sweeper())
+    if PAYMENT_GATEWAY_URL:
+        asyncio.create_task(run_payment_reconciler())
+    else:
+        logger.warning("PAYMENT_GATEWAY_URL is not set; payments are disabled")
+    asyncio.create_task(run_order_event_relay())
 
 
 @app.get("/")
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, Boolean, Enum, Date, Numeric, JSON
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, Boolean, Enum, Date, Numeric, JSON, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
+from .core.tenancy import TenantScoped
 import enum
 
 class LeadType(str, enum.Enum):
@@ -28,19 +29,46 @@ class Industry(str, enum.Enum):
     ayurvedic = "ayurvedic"
     others = "others"
 
-class User(Base):
+class Tenant(Base):
+    """A storefront brand; tenant-scoped rows carry its id (see app.core.tenancy)."""
+    __tablename__ = "tenants"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    slug = Column(String, unique=True, nullable=False)
+    name = Column(String, nullable=False)
+    settings = Column(JSON)  # overrides of global settings, e.g. free_shipping_above_paise
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    domains = relationship("TenantDomain", back_populates="tenant")
+
+class TenantDomain(Base):
+    __tablename__ = "tenant_domains"
+    
+    host = Column(String, primary_key=True)  # lowercase, without port
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False, index=True)
+    
+    # Relationships
+    tenant = relationship("Tenant", back_populates="domains")
+
+class User(TenantScoped, Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # The same address may sign up with each storefront
+        UniqueConstraint("tenant_id", "email", name="uq_users_tenant_email"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    email = Column(String, unique=True, index=True, nullable=False)
+    email = Column(String, index=True, nullable=False)
     password = Column(String(255), nullable=False)
     phone = Column(String)
     role = Column(String, default="customer")
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     reset_code = Column(String, nullable=True)
-    reset_expiry = Column(DateTime, nullable=True)
+    reset_expiry = Column(DateTime, nullable=True, index=True)
     otp_attempts = Column(Integer, default=0)
     last_otp_sent_at = Column(DateTime, nullable=True)
     # Relationships
@@ -48,25 +76,45 @@ class User(Base):
     cart_items = relationship("CartItem", back_populates="user")
     addresses = relationship("Address", back_populates="user")
 
-class Product(Base):
+class Product(TenantScoped, Base):
     __tablename__ = "products"
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(Text)
-    base_price = Column(Float, nullable=False)  # Price for 200gm
+    base_price = Column(Float, nullable=False)  # Price per kg
     image = Column(String)
     category = Column(String)
-    stock_quantity = Column(Integer, default=0)
+    stock_grams = Column(Integer, default=0)  # On hand; packs of every size draw on it
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     cart_items = relationship("CartItem", back_populates="product")
     order_items = relationship("OrderItem", back_populates="product")
+    variants = relationship("ProductVariant", back_populates="product")
+
+class ProductVariant(Base):
+    __tablename__ = "product_variants"
+    __table_args__ = (
+        UniqueConstraint("product_id", "size", name="uq_product_variants_product_size"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
+    size = Column(String, nullable=False)  # 200gm, 500gm, 1kg, 2kg, 10kg
+    price_paise = Column(Integer, nullable=False)  # Unit price in paise
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    product = relationship("Product", back_populates="variants")
 
 class CartItem(Base):
     __tablename__ = "cart_items"
+    __table_args__ = (
+        # Per-user cart reads, and finding carts whose newest item is old (retention)
+        Index("ix_cart_items_user_id_created_at", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -81,9 +129,14 @@ class CartItem(Base):
 
 class Address(Base):
     __tablename__ = "addresses"
+    __table_args__ = (
+        # At most one default address per user
+        Index("uq_addresses_user_default", "user_id", unique=True,
+              sqlite_where=text("is_default"), postgresql_where=text("is_default")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     full_name = Column(String, nullable=False)
     phone = Column(String, nullable=False)
     flat_no = Column(String, nullable=False)
@@ -99,13 +152,14 @@ class Address(Base):
     user = relationship("User", back_populates="addresses")
     orders = relationship("Order", back_populates="address")
 
-class Order(Base):
+class Order(TenantScoped, Base):
     __tablename__ = "orders"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     address_id = Column(Integer, ForeignKey("addresses.id"), nullable=False)
-    total_amount = Column(Float, nullable=False)
+    total_amount = Column(Float, nullable=False)  # items + GST + shipping
+    shipping_paise = Column(Integer, nullable=False, default=0)
     status = Column(String, default="pending")  # pending, confirmed, shipped, delivered, cancelled
     payment_status = Column(String, default="pending")  # pending, completed, failed
     payment_id = Column(String)  # PhonePe transaction ID
@@ -116,6 +170,8 @@ class Order(Base):
     user = relationship("User", back_populates="orders")
     address = relationship("Address", back_populates="orders")
     order_items = relationship("OrderItem", back_populates="order")
+    reservations = relationship("StockReservation", back_populates="order")
+    events = relationship("OrderEvent", back_populates="order", order_by="OrderEvent.id")
 
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -131,6 +187,60 @@ class OrderItem(Base):
     order = relationship("Order", back_populates="order_items")
     product = relationship("Product", back_populates="order_items")
 
+class StockReservation(Base):
+    __tablename__ = "stock_reservations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)  # grams
+    status = Column(String, default="held", index=True)  # held, committed, released
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    order = relationship("Order", back_populates="reservations")
+
+class OrderEvent(Base):
+    """Append-only log of order status changes; ids double as change-feed cursors."""
+    __tablename__ = "order_events"
+    __table_args__ = (
+        Index("ix_order_events_user_id_id", "user_id", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    from_status = Column(String)  # NULL for the creation event
+    to_status = Column(String, nullable=False)
+    payment_status = Column(String)  # order's payment status after the change
+    source = Column(String, nullable=False)  # checkout, payment, reservation_expiry, admin
+    note = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    order = relationship("Order", back_populates="events")
+    
+    # Fetch created_at on insert so events can be published without a reload
+    __mapper_args__ = {"eager_defaults": True}
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "scope", "key", name="uq_idempotency_keys_user_scope_key"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    scope = Column(String, nullable=False)  # e.g. orders.create, cart.add
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer)  # NULL while the first request is running
+    response_body = Column(Text)
+    locked_at = Column(DateTime)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 # CRM Models (existing)
 class Lead(Base):
     __tablename__ = "leads"
@@ -168,8 +278,21 @@ class LeadActivity(Base):
     actor_id = Column(Integer)
     kind = Column(String, nullable=False)
     body = Column(Text)
-    at = Column(DateTime(timezone=True), server_default=func.now())
+    at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     meta = Column(JSON)
     
     # Relationships
-    lead = relationship("Lead", back_populates="activities")
\ No newline at end of file
+    lead = relationship("Lead", back_populates="activities")
+
+class LeadActivityArchive(Base):
+    """Lead activities moved out of the hot table by app.utils.retention."""
+    __tablename__ = "lead_activities_archive"
+    
+    id = Column(Integer, primary_key=True)  # the id it had in lead_activities
+    lead_id = Column(Integer, nullable=False, index=True)
+    actor_id = Column(Integer)
+    kind = Column(String, nullable=False)
+    body = Column(Text)
+    at = Column(DateTime(timezone=True))
+    meta = Column(JSON)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
@@ -1,8 +1,25 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import case
 from sqlalchemy.orm import Session
 
+from ..cache import cache_stats
+from ..core.admission import admission
+from ..core.logs import logging_stats
+from ..core.tenancy import tenant_registry
 from ..deps.db import get_db
-from ..models import Product
+from ..models import Order, StockReservation, User
+from ..schema import BulkTransitionRequest
+from ..utils.catalog_sync import ManifestError, parse_manifest, sync_catalog
+from ..utils.exports import MEDIA_TYPES, default_format, export_window, stream_export
+from ..utils.inventory import release_reservations
+from ..utils.order_status import InvalidTransition, bulk_transition
+from ..utils.retention import POLICIES, retention_stats, run_retention
+from ..utils.search_index import search_indexes
+from .auth import get_current_admin
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -40,19 +57,138 @@ PRODUCTS = [
 
 @router.post("/seed-products")
 def seed_products(db: Session = Depends(get_db)):
-    created = 0
-    for name, price, img in PRODUCTS:
-        exists = db.query(Product).filter(Product.name == name).first()
-        if exists:
-            continue
-
-        db.add(Product(
-            name=name,
-            base_price=price,
-            image=img,
-            description=f"Premium quality {name.lower()}."
-        ))
-        created += 1
-
-    db.commit()
-    return {"message": "Products seeded", "created": created}
+    rows = [
+        {
+            "name": name,
+            "base_price": price,
+            "image": img,
+            "description": f"Premium quality {name.lower()}.",
+            "stock_grams": 100_000,
+        }
+        for name, price, img in PRODUCTS
+    ]
+    report = sync_catalog(db, rows, deactivate_missing=False, update_existing=False)
+    return {"message": "Products seeded", "created": len(report["inserted"])}
+
+
+@router.post("/catalog/sync")
+def sync_catalog_manifest(
+    manifest: UploadFile = File(...),
+    dry_run: bool = False,
+    deactivate_missing: bool = True,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin),
+):
+    """Apply a CSV or JSON product manifest; products missing from it are deactivated."""
+    fmt = "json" if (manifest.filename or "").lower().endswith(".json") else "csv"
+    try:
+        rows = parse_manifest(manifest.file.read(), fmt)
+    except (ManifestError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return sync_catalog(db, rows, deactivate_missing=deactivate_missing, dry_run=dry_run)
+
+
+@router.get("/cache/stats")
+def get_cache_stats(admin: User = Depends(get_current_admin)):
+    """Hit/miss counters per cache namespace, for this worker."""
+    return cache_stats()
+
+
+@router.get("/admission/stats")
+def get_admission_stats(admin: User = Depends(get_current_admin)):
+    """Active, queued, admitted and shed requests per route class, for this worker."""
+    return admission.snapshot()
+
+
+@router.get("/tenants/stats")
+def get_tenant_stats(admin: User = Depends(get_current_admin)):
+    """Storefront hosts and search indexes held by this worker."""
+    return {**tenant_registry.snapshot(), "search_indexes": len(search_indexes.loaded())}
+
+
+@router.get("/logging/stats")
+def get_logging_stats(admin: User = Depends(get_current_admin)):
+    """Records queued, dropped (queue full) and sampled out, for this worker."""
+    return logging_stats()
+
+
+@router.get("/exports/orders")
+def export_orders(
+    fmt: Optional[str] = Query(None, alias="format"),
+    since: Optional[datetime] = None,
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Stream order items with their order, product and address as Parquet
+    (if available) or CSV. Pass the X-Export-Watermark of the previous
+    export as `since` to get only orders changed after it.
+    """
+    fmt = fmt or default_format()
+    window = export_window(since)
+    try:
+        chunks = stream_export(window, fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    watermark = window.until.isoformat()
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[fmt], headers={
+        "Content-Disposition": f'attachment; filename="orders-{window.until:%Y%m%dT%H%M%S}.{fmt}"',
+        "X-Export-Watermark": watermark,
+        "Cache-Control": "no-store",
+    })
+
+
+@router.get("/retention/stats")
+def get_retention_stats(admin: User = Depends(get_current_admin)):
+    """Retention policies and the rows each touched in this worker's last run."""
+    return retention_stats()
+
+
+@router.post("/retention/run")
+def run_retention_now(
+    policy: Optional[List[str]] = Query(None),
+    dry_run: bool = True,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin),
+):
+    """Apply retention policies now (all enabled by default). Dry runs only count rows."""
+    unknown = set(policy or ()) - POLICIES.keys()
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown retention policy: {', '.join(sorted(unknown))}")
+    # The policies write through their own sessions: free the writer this request's session holds
+    db.rollback()
+    return run_retention(policy, dry_run=dry_run)
+
+
+@router.post("/orders/transitions")
+def transition_orders(
+    payload: BulkTransitionRequest,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Move orders in bulk, e.g. everything on a courier manifest to shipped.
+    All groups apply in one transaction; invalid moves are skipped and reported.
+    """
+    results = []
+    try:
+        for group in payload.transitions:
+            values = {}
+            if group.status == "cancelled":
+                # A payment landing after cancellation must not reopen the order
+                values["payment_status"] = case(
+                    (Order.payment_status == "pending", "failed"), else_=Order.payment_status
+                )
+            moved, skipped = bulk_transition(
+                db, group.order_ids, group.status, source="admin", note=group.note, values=values
+            )
+            if group.status == "cancelled" and moved:
+                release_reservations(db, db.query(StockReservation).filter(
+                    StockReservation.order_id.in_(moved), StockReservation.status == "held"
+                ).all())
+            results.append({"status": group.status, "moved": len(moved), "skipped": skipped})
+        db.commit()
+    except InvalidTransition as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"results": results}
@@ -1,28 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from ..deps.db import get_db
+from typing import Optional
+from ..core.config import settings
+from ..core.tenancy import DEFAULT_TENANT_ID, current_tenant_id
+from ..database import SessionLocal
+from ..deps.db import get_db, get_primary_db, mark_written, sticky_key
+from ..deps.rate_limit import RateLimit
 from ..models import User
 from ..schema import UserCreate, UserLogin, User as UserSchema
 from fastapi import Body
 import random
 from app.utils.email_service import send_email
 
+import logging
 import os
+
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 # Security
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # JWT settings
-SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-do-not-use-in-prod")
-ALGORITHM = "HS256"
+SECRET_KEY = settings.secret_key
+ALGORITHM = settings.jwt_algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 
+# Throttles, checked before any DB access or bcrypt work
+signup_limits = [Depends(RateLimit("signup", 10, 3600, key_by=("ip",)))]
+login_limits = [
+    Depends(RateLimit("login", 30, 60, key_by=("ip",))),
+    Depends(RateLimit("login-email", 10, 300, key_by=("email",))),
+]
+otp_limits = [
+    Depends(RateLimit("otp", 3, 900, key_by=("email",))),
+    Depends(RateLimit("otp-ip", 10, 900, key_by=("ip",))),
+]
+reset_limits = [Depends(RateLimit("reset", 5, 900, key_by=("email", "ip")))]
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -35,21 +56,17 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # Accounts are per storefront, so a token is only good on the one that issued it
+    to_encode.update({"exp": expire, "tid": current_tenant_id()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
-    token = credentials.credentials
-
+def _user_for_token(token: str, db: Session) -> User:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
 
-        if not email:
+        if not email or payload.get("tid", DEFAULT_TENANT_ID) != current_tenant_id():
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token payload",
@@ -74,7 +91,45 @@ def get_current_user(
 
     return user
 
-@router.post("/signup")
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    return _user_for_token(credentials.credentials, db)
+
+def get_stream_user(
+    access_token: Optional[str] = Query(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_primary_db)
+):
+    """
+    Like get_current_user, but also takes ?access_token= since EventSource
+    cannot set headers. Uses the stream's own session, which has no request
+    deadline since streams outlive it.
+    """
+    token = credentials.credentials if credentials else access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _user_for_token(token, db)
+
+def get_current_admin(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+def is_admin_token(token: str) -> bool:
+    """Admin check for middleware, which runs outside dependency injection."""
+    with SessionLocal() as db:
+        try:
+            return _user_for_token(token, db).role == "admin"
+        except HTTPException:
+            return False
+
+@router.post("/signup", dependencies=signup_limits)
 def signup(user: UserCreate, db: Session = Depends(get_db)):
     try:
         db_user = db.query(User).filter(User.email == user.email).first()
@@ -110,6 +165,9 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
+        # The client has no token yet to be recognised by; its next reads
+        # (e.g. /me) must still find the new account
+        mark_written(sticky_key(current_tenant_id(), db_user.email))
 
         access_token = create_access_token({"sub": db_user.email})
 
@@ -134,7 +192,7 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
 
 
 
-@router.post("/login")
+@router.post("/login", dependencies=login_limits)
 def login(user: UserLogin, db: Session = Depends(get_db)):
     """Login user"""
     try:
@@ -177,34 +235,17 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
 
-@router.post("/forgot-password")
+@router.post("/forgot-password", dependencies=otp_limits)
 def forgot_password(data: dict = Body(...), db: Session = Depends(get_db)):
     email = data.get("email", "").strip()
 
     user = db.query(User).filter(User.email.ilike(email)).first()
-    # 🔐 OTP resend limits
-    if user.last_otp_sent_at:
-        if datetime.utcnow() - user.last_otp_sent_at < timedelta(minutes=15):
-            if user.otp_attempts >= 3:
-                raise HTTPException(
-                    status_code=429,
-                    detail="Too many OTP requests. Try again after 15 minutes."
-                )
-        else:
-            # Reset counter after cooldown
-            user.otp_attempts = 0
-
     if not user:
         raise HTTPException(status_code=404, detail="Email not registered")
 
     otp = str(random.randint(100000, 999999))
     expiry = datetime.utcnow() + timedelta(minutes=10)
 
-
-    
-    user.otp_attempts += 1
-    user.last_otp_sent_at = datetime.utcnow()
-
     user.reset_code = otp
     user.reset_expiry = expiry
     db.commit()
@@ -225,10 +266,10 @@ def forgot_password(data: dict = Body(...), db: Session = Depends(get_db)):
             )
         )
         else:
-    # Dev / approval-pending mode
-         print(f"📧 OTP for {email}: {otp}")
+            # Dev / approval-pending mode; run with LOG_REDACT=false to see the OTP
+            logger.info("Password reset OTP issued (email disabled)", extra={"email": email, "otp": otp})
     except Exception as e:
-        print("❌ EMAIL ERROR:", str(e))
+        logger.exception("Password reset email failed", extra={"email": email})
         raise HTTPException(
             status_code=500,
             detail=f"Email service failed: {str(e)}"
@@ -242,7 +283,7 @@ def forgot_password(data: dict = Body(...), db: Session = Depends(get_db)):
 
 
 
-@router.post("/reset-password")
+@router.post("/reset-password", dependencies=reset_limits)
 def reset_password(data: dict = Body(...), db: Session = Depends(get_db)):
     email = data.get("email", "").strip()
     otp = data.get("otp")
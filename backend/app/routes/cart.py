@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Header
+from sqlalchemy.orm import Session, contains_eager
+from typing import List, Optional
 from ..deps.db import get_db
 from ..models import CartItem, Product, User
-from ..schema import CartItem as CartItemSchema, CartItemCreate, CartItemUpdate
+from ..schema import CartItem as CartItemSchema, CartItemCreate, CartItemUpdate, CartSummary
 from ..routes.auth import get_current_user
+from ..utils.cart_snapshot import get_cart_snapshot, invalidate_cart_snapshot
+from ..utils.idempotency import begin_idempotent
+from ..utils.pricing import SIZE_GRAMS
+from ..utils.serializers import ORJSONResponse, cart_item_to_dict
 from fastapi import Response
 
 
@@ -15,48 +19,80 @@ def get_cart(current_user: User = Depends(get_current_user), db: Session = Depen
     cart_items = (
         db.query(CartItem)
         .join(Product, CartItem.product_id == Product.id)
+        .options(contains_eager(CartItem.product))
         .filter(CartItem.user_id == current_user.id)
         .all()
     )
-    return cart_items
+    return ORJSONResponse([cart_item_to_dict(item) for item in cart_items])
+
+@router.get("/summary", response_model=CartSummary)
+def get_cart_summary(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Cart lines, subtotal, GST split and grand total, priced server-side"""
+    return get_cart_snapshot(db, current_user.id).to_summary()
 
 @router.post("/add")
 def add_to_cart(
     item: CartItemCreate,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Add item to cart"""
-    # Check if product exists
-    product = db.query(Product).filter(Product.id == item.product_id).first()
+    if item.size not in SIZE_GRAMS:
+        raise HTTPException(status_code=400, detail=f"Invalid size: {item.size}")
+    
+    # Check the product exists and is still on sale
+    product = db.query(Product).filter(Product.id == item.product_id, Product.is_active == True).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    # Check if item already exists in cart
-    existing_item = db.query(CartItem).filter(
-        CartItem.user_id == current_user.id,
-        CartItem.product_id == item.product_id,
-        CartItem.size == item.size
-    ).first()
+    idem = begin_idempotent(db, current_user.id, "cart.add", idempotency_key, item)
+    if idem.replay is not None:
+        return idem.replay
     
-    if existing_item:
-        # Update quantity
-        existing_item.quantity += item.quantity
-        db.commit()
-        db.refresh(existing_item)
-        return {"message": "Cart updated successfully", "item": existing_item}
-    else:
-        # Create new cart item
-        cart_item = CartItem(
-            user_id=current_user.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            size=item.size
-        )
-        db.add(cart_item)
-        db.commit()
-        db.refresh(cart_item)
-        return {"message": "Item added to cart successfully", "item": cart_item}
+    try:
+        # Check if item already exists in cart
+        existing_item = db.query(CartItem).filter(
+            CartItem.user_id == current_user.id,
+            CartItem.product_id == item.product_id,
+            CartItem.size == item.size
+        ).first()
+        
+        if existing_item:
+            # Update quantity
+            existing_item.quantity += item.quantity
+            db.flush()
+            db.refresh(existing_item)
+            response = idem.complete({"message": "Cart updated successfully", "item": existing_item})
+            db.commit()
+            invalidate_cart_snapshot(current_user.id)
+            return response
+        else:
+            # Create new cart item
+            cart_item = CartItem(
+                user_id=current_user.id,
+                product_id=item.product_id,
+                quantity=item.quantity,
+                size=item.size
+            )
+            db.add(cart_item)
+            db.flush()
+            db.refresh(cart_item)
+            response = idem.complete({"message": "Item added to cart successfully", "item": cart_item})
+            db.commit()
+            invalidate_cart_snapshot(current_user.id)
+            return response
+    except Exception:
+        idem.abandon()
+        raise
+
+@router.delete("/clear")
+def clear_cart(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Clear all items from cart"""
+    db.query(CartItem).filter(CartItem.user_id == current_user.id).delete()
+    db.commit()
+    invalidate_cart_snapshot(current_user.id)
+    return {"message": "Cart cleared successfully"}
 
 @router.put("/{item_id}")
 def update_cart_item(
@@ -80,6 +116,7 @@ def update_cart_item(
         cart_item.quantity = update_data.quantity
     
     db.commit()
+    invalidate_cart_snapshot(current_user.id)
     return {"message": "Cart updated successfully"}
 
 @router.delete("/{item_id}")
@@ -99,17 +136,10 @@ def remove_from_cart(
     
     db.delete(cart_item)
     db.commit()
+    invalidate_cart_snapshot(current_user.id)
     return {"message": "Item removed from cart successfully"}
 
 @router.options("/{path:path}")
 def cart_preflight(path: str, response: Response):
     response.status_code = 200
     return
-
-
-@router.delete("/clear")
-def clear_cart(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Clear all items from cart"""
-    db.query(CartItem).filter(CartItem.user_id == current_user.id).delete()
-    db.commit()
-    return {"message": "Cart cleared successfully"}
\ No newline at end of file
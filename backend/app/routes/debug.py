@@ -0,0 +1,29 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from ..core.profiling import PROFILE_MAX_SECONDS, SamplerBusy, sample_stacks
+from ..models import User
+from .auth import get_current_admin
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(5, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    idle: bool = False,
+    admin: User = Depends(get_current_admin)
+):
+    """
+    Sample every thread of this worker for `seconds` and return collapsed
+    stacks for flamegraph.pl / inferno / speedscope. Parked threads are
+    left out unless `idle` is set.
+    """
+    try:
+        stacks = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000, idle)
+    except SamplerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already being taken in this worker")
+    return PlainTextResponse(stacks, headers={"Cache-Control": "no-store"})
@@ -1,16 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, literal, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
+import asyncio
 import os
 import smtplib
 from email.message import EmailMessage
-from ..deps.db import get_db
-from ..models import Address, User, Order, OrderItem, CartItem, Product
-from ..schema import AddressCreate, Address as AddressSchema, OrderCreate, Order as OrderSchema
-from .auth import get_current_user
+from ..deps.db import get_db, get_primary_db
+from ..models import Address, User, Order, OrderEvent, OrderItem, CartItem, Product
+from ..schema import AddressCreate, Address as AddressSchema, OrderCreate, Order as OrderSchema, OrderEventFeed
+from ..utils.addresses import AddressNotFound, add_address, get_address, invalidate_addresses, list_addresses, set_default_address
+from ..utils.cart_snapshot import build_cart_snapshot, invalidate_cart_snapshot
+from ..utils.idempotency import begin_idempotent
+from ..utils.inventory import OutOfStockError, reserve_stock
+from ..utils.order_events import order_feed, order_hub
+from ..utils.order_status import record_created
+from ..utils.pricing import SIZE_GRAMS, gst_breakdown, to_paise, to_rupees
+from ..utils.serializers import ORJSONResponse, dumps, order_event_to_dict, order_to_dict
+from ..utils.shipping import ShippingUnavailable, quote
+from .auth import get_current_user, get_stream_user
 
 router = APIRouter(prefix="/api/orders", tags=["orders"])
 
+# Change feed long-poll: longest allowed wait, and how often a waiting request
+# re-checks for events committed by other workers
+ORDER_FEED_MAX_WAIT_SECONDS = 30
+ORDER_FEED_POLL_SECONDS = float(os.getenv("ORDER_FEED_POLL_SECONDS", "2"))
+
+# Order tracking stream: comment line interval (keeps proxies from timing
+# out idle streams) and the reconnect delay suggested to EventSource
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_RETRY_MS = 5000
+TERMINAL_STATUSES = {"delivered", "cancelled"}
+
+# Load everything an order response needs in two extra queries, not N+1
+order_response_options = (
+    selectinload(Order.address),
+    selectinload(Order.order_items).selectinload(OrderItem.product),
+)
+
 @router.post("/addresses", response_model=AddressSchema)
 def create_address(
     address_data: AddressCreate,
@@ -19,23 +50,14 @@ def create_address(
 ):
     """Create a new address for the current user"""
     try:
-        # If this is set as default, unset other default addresses
-        if address_data.is_default:
-            db.query(Address).filter(
-                Address.user_id == current_user.id,
-                Address.is_default == True
-            ).update({"is_default": False})
-        
-        # Create new address
-        address = Address(
-            user_id=current_user.id,
-            **address_data.dict()
-        )
-        db.add(address)
+        address = add_address(db, current_user.id, address_data.model_dump())
         db.commit()
-        db.refresh(address)
+        invalidate_addresses(current_user.id)
         
         return address
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Default address changed concurrently, please retry")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create address: {str(e)}")
@@ -45,73 +67,125 @@ def get_addresses(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all addresses for the current user"""
-    addresses = db.query(Address).filter(Address.user_id == current_user.id).all()
-    return addresses
+    """Get all addresses for the current user, default first"""
+    return ORJSONResponse(list_addresses(db, current_user.id))
+
+@router.put("/addresses/{address_id}/default")
+def make_default_address(
+    address_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Make one of the current user's addresses the default"""
+    try:
+        set_default_address(db, current_user.id, address_id)
+        db.commit()
+    except AddressNotFound:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Address not found")
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Default address changed concurrently, please retry")
+    invalidate_addresses(current_user.id)
+    return {"id": address_id, "is_default": True}
 
 @router.post("/create", response_model=OrderSchema)
 def create_order(
     order_data: OrderCreate,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create order from cart items"""
+    idem = begin_idempotent(db, current_user.id, "orders.create", idempotency_key, order_data)
+    if idem.replay is not None:
+        return idem.replay
+    
     try:
-        # Get cart items
-        cart_items = db.query(CartItem).filter(CartItem.user_id == current_user.id).all()
+        # Priced from the primary inside this transaction (same totals as
+        # /api/cart/summary), not the cached snapshot another worker may have outdated
+        snapshot = build_cart_snapshot(db, current_user.id)
         
-        if not cart_items:
+        if snapshot.unavailable:
+            raise HTTPException(
+                status_code=409,
+                detail=f"No longer available: {', '.join(snapshot.unavailable)}. Please remove them from your cart",
+            )
+        if not snapshot.lines:
             raise HTTPException(status_code=400, detail="Cart is empty")
         
-        # Calculate total
-        total_amount = 0
-        for item in cart_items:
-            product = db.query(Product).filter(Product.id == item.product_id).first()
-            if product:
-                # Calculate price based on size
-                multipliers = {"200gm": 0.2, "500gm": 0.5, "1kg": 1.0}
-                price = product.base_price * multipliers.get(item.size, 1.0)
-                total_amount += price * item.quantity
+        # Ship-to pincode from the cached address book; the insert below
+        # still checks ownership against the table
+        address = get_address(db, current_user.id, order_data.address_id)
+        if address is None:
+            raise HTTPException(status_code=400, detail="Invalid delivery address")
+        try:
+            shipping = quote(address["pincode"], snapshot.subtotal_paise)
+        except ShippingUnavailable:
+            raise HTTPException(status_code=503, detail="Checkout is unavailable right now, please retry")
+        if shipping is None:
+            raise HTTPException(status_code=400, detail=f"We do not deliver to pincode {address['pincode']} yet")
         
-        # Add GST (18%)
-        total_amount = total_amount * 1.18
-        
-        # Create order
-        order = Order(
-            user_id=current_user.id,
-            address_id=order_data.address_id,
-            total_amount=total_amount,
-            status="pending",
-            payment_status="pending"
-        )
-        db.add(order)
-        db.flush()  # Get order ID
+        # Create order; selecting the address row checks it belongs to
+        # the user in the same statement
+        order = db.scalars(
+            insert(Order).from_select(
+                ["user_id", "address_id", "total_amount", "shipping_paise", "status", "payment_status"],
+                select(
+                    Address.user_id,
+                    Address.id,
+                    literal(to_rupees(snapshot.total_paise + shipping.shipping_paise)),
+                    literal(shipping.shipping_paise),
+                    literal("pending"),
+                    literal("pending")
+                ).where(Address.id == order_data.address_id, Address.user_id == current_user.id)
+            ).returning(Order)
+        ).first()
+        if order is None:
+            raise HTTPException(status_code=400, detail="Invalid delivery address")
+        record_created(db, order)
         
         # Create order items
-        for item in cart_items:
-            product = db.query(Product).filter(Product.id == item.product_id).first()
-            if product:
-                multipliers = {"200gm": 0.2, "500gm": 0.5, "1kg": 1.0}
-                price = product.base_price * multipliers.get(item.size, 1.0)
-                
-                order_item = OrderItem(
-                    order_id=order.id,
-                    product_id=item.product_id,
-                    quantity=item.quantity,
-                    size=item.size,
-                    price=price
-                )
-                db.add(order_item)
+        for line in snapshot.lines:
+            order_item = OrderItem(
+                order_id=order.id,
+                product_id=line.product_id,
+                quantity=line.quantity,
+                size=line.size,
+                price=to_rupees(line.unit_paise)
+            )
+            db.add(order_item)
+        
+        # Clear the lines that were ordered, at the quantities priced; a short
+        # count means the cart changed since it was read (e.g. a concurrent checkout)
+        cleared = db.query(CartItem).filter(
+            CartItem.user_id == current_user.id,
+            tuple_(CartItem.id, CartItem.quantity).in_([(line.item_id, line.quantity) for line in snapshot.lines])
+        ).delete(synchronize_session=False)
+        if cleared != len(snapshot.lines):
+            invalidate_cart_snapshot(current_user.id)
+            raise HTTPException(status_code=409, detail="Cart changed, please review and retry")
         
-        # Clear cart
-        db.query(CartItem).filter(CartItem.user_id == current_user.id).delete()
+        # Take stock last so hot product rows stay locked only until commit
+        reserve_stock(db, order, [(line.product_id, line.quantity * SIZE_GRAMS[line.size]) for line in snapshot.lines])
         
+        db.flush()
+        response = idem.complete(OrderSchema.model_validate(order))
         db.commit()
-        db.refresh(order)
+        invalidate_cart_snapshot(current_user.id)
         
-        return order
+        return response
+    except HTTPException:
+        idem.abandon()
+        raise
+    except OutOfStockError as e:
+        idem.abandon()
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        idem.abandon()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        db.rollback()
+        idem.abandon()
         raise HTTPException(status_code=500, detail=f"Failed to create order: {str(e)}")
 
 
@@ -147,10 +221,13 @@ def send_order_confirmation(
     track_url = f"{track_url_base}#track-orders"
     from_email = os.getenv("SMTP_FROM", "info@nutrieve.in")
     to_email = current_user.email
-    subtotal = sum((item.price or 0) * item.quantity for item in items)
-    cgst = subtotal * 0.025
-    sgst = subtotal * 0.025
-    total = order.total_amount or (subtotal + cgst + sgst)
+    subtotal_paise = sum(to_paise(item.price) * item.quantity for item in items)
+    cgst_paise, sgst_paise = gst_breakdown(subtotal_paise)
+    subtotal = to_rupees(subtotal_paise)
+    cgst = to_rupees(cgst_paise)
+    sgst = to_rupees(sgst_paise)
+    shipping_paise = order.shipping_paise or 0
+    total = order.total_amount or to_rupees(subtotal_paise + cgst_paise + sgst_paise + shipping_paise)
 
     rows = "".join(
         f"""
@@ -186,6 +263,7 @@ def send_order_confirmation(
         <p>Subtotal: ₹{subtotal:.0f}</p>
         <p>CGST (2.5%): ₹{cgst:.0f}</p>
         <p>SGST (2.5%): ₹{sgst:.0f}</p>
+        <p>Shipping: {f"₹{to_rupees(shipping_paise):.0f}" if shipping_paise else "Free"}</p>
         <p style="font-size:18px;font-weight:bold;">Grand Total: ₹{total:.0f}</p>
       </div>
       <div style="margin-top:20px;">
@@ -230,8 +308,146 @@ def get_orders(
     db: Session = Depends(get_db)
 ):
     """Get all orders for the current user"""
-    orders = db.query(Order).filter(Order.user_id == current_user.id).order_by(Order.created_at.desc()).all()
-    return orders
+    orders = (
+        db.query(Order)
+        .options(*order_response_options)
+        .filter(Order.user_id == current_user.id)
+        .order_by(Order.created_at.desc())
+        .all()
+    )
+    return ORJSONResponse([order_to_dict(order) for order in orders])
+
+def _events_after(db: Session, user_id: int, after: Optional[int], limit: int) -> List[dict]:
+    query = db.query(OrderEvent).filter(OrderEvent.user_id == user_id)
+    if after is None:
+        rows = query.order_by(OrderEvent.id.desc()).limit(limit).all()[::-1]
+    else:
+        rows = query.filter(OrderEvent.id > after).order_by(OrderEvent.id).limit(limit).all()
+    events = [order_event_to_dict(row) for row in rows]
+    db.rollback()  # end the read so no connection is held while waiting
+    return events
+
+@router.get("/events", response_model=OrderEventFeed)
+async def order_events_feed(
+    after: Optional[int] = None,
+    wait: float = Query(25, ge=0, le=ORDER_FEED_MAX_WAIT_SECONDS),
+    limit: int = Query(100, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_primary_db)
+):
+    """
+    Long-poll feed of status changes to the user's orders. Without `after`
+    returns the latest events at once; with it, waits up to `wait` seconds
+    for newer ones. Continue from the returned `cursor`. Reads the primary
+    with no request deadline: each poll is short, but the wait can outlast
+    REQUEST_TIMEOUT_SECONDS.
+    """
+    user_id = current_user.id
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        events = await run_in_threadpool(_events_after, db, user_id, after, limit)
+        remaining = deadline - loop.time()
+        if events or after is None or remaining <= 0:
+            break
+        await order_feed.wait(min(ORDER_FEED_POLL_SECONDS, remaining))
+
+    cursor = events[-1]["id"] if events else (after or 0)
+    return ORJSONResponse({"events": events, "cursor": cursor})
+
+def _sse(event: str, data: dict, event_id: int) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event.encode(), dumps(data))
+
+def _stream_start(db: Session, order_id: int, user_id: int, after: Optional[int]):
+    """Current state and any events after `after`; the only DB work a stream does."""
+    order = db.query(Order.id, Order.status, Order.payment_status).filter(
+        Order.id == order_id,
+        Order.user_id == user_id
+    ).first()
+    if not order:
+        return None, []
+    events = db.query(OrderEvent).filter(OrderEvent.order_id == order_id)
+    if after is None:
+        latest_id = db.query(OrderEvent.id).filter(OrderEvent.order_id == order_id).order_by(
+            OrderEvent.id.desc()
+        ).limit(1).scalar()
+        missed = []
+    else:
+        latest_id = None
+        missed = [order_event_to_dict(e) for e in events.filter(OrderEvent.id > after).order_by(OrderEvent.id)]
+    state = {"order_id": order.id, "status": order.status,
+             "payment_status": order.payment_status, "event_id": latest_id or 0}
+    db.rollback()  # release the connection for the life of the stream
+    return state, missed
+
+@router.get("/{order_id}/events")
+async def order_event_stream(
+    order_id: int,
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_stream_user),
+    db: Session = Depends(get_primary_db)
+):
+    """
+    Server-Sent Events stream of one order's status and payment changes.
+    Opens with a `snapshot` event, then sends a `status` event per change;
+    reconnects with Last-Event-ID resume from the log. The stream ends at
+    delivered/cancelled, and a resume after that gets 204 so EventSource
+    stops reconnecting. Use ?access_token= since EventSource cannot send
+    an Authorization header.
+    """
+    user_id = current_user.id
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    # Subscribe before reading, so no change can fall between the two
+    subscription = order_hub.subscribe(order_id)
+    try:
+        state, missed = await run_in_threadpool(_stream_start, db, order_id, user_id, after)
+    except BaseException:
+        order_hub.unsubscribe(subscription)
+        raise
+    if state is None:
+        order_hub.unsubscribe(subscription)
+        raise HTTPException(status_code=404, detail="Order not found")
+    if after is not None and not missed and state["status"] in TERMINAL_STATUSES:
+        order_hub.unsubscribe(subscription)
+        return Response(status_code=204)
+
+    async def stream():
+        try:
+            yield b"retry: %d\n\n" % SSE_RETRY_MS
+            if after is None:
+                last_id = state["event_id"]
+                yield _sse("snapshot", state, last_id)
+            else:
+                last_id = after
+                for event in missed:
+                    last_id = event["id"]
+                    yield _sse("status", event, last_id)
+            if state["status"] in TERMINAL_STATUSES:
+                return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if event is None:
+                    return  # fell behind; the client resumes from Last-Event-ID
+                if event["id"] <= last_id:
+                    continue
+                last_id = event["id"]
+                yield _sse("status", event, last_id)
+                if event["to_status"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            order_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.get("/{order_id}", response_model=OrderSchema)
 def get_order(
@@ -240,7 +456,7 @@ def get_order(
     db: Session = Depends(get_db)
 ):
     """Get specific order details"""
-    order = db.query(Order).filter(
+    order = db.query(Order).options(*order_response_options).filter(
         Order.id == order_id,
         Order.user_id == current_user.id
     ).first()
@@ -248,4 +464,4 @@ def get_order(
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    return order
\ No newline at end of file
+    return ORJSONResponse(order_to_dict(order))
\ No newline at end of file
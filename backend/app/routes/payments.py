@@ -0,0 +1,117 @@
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from ..deps.db import get_db, get_primary_db
+from ..models import Order, User
+from ..schema import PaymentRequest, PaymentResponse, PaymentStatus
+from ..utils.payments import (
+    GATEWAY_STATUS,
+    PaymentGatewayError,
+    PaymentGatewayNotConfigured,
+    apply_payment_status,
+    initiate_payment,
+    verify_webhook_signature,
+)
+from ..utils.pricing import to_paise
+from .auth import get_current_user
+
+router = APIRouter(prefix="/api/payments", tags=["payments"])
+
+
+def _payable_order(db: Session, order_id: int, user_id: int) -> Order:
+    order = db.query(Order).filter(Order.id == order_id, Order.user_id == user_id).first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order.payment_status != "pending" or order.status == "cancelled":
+        raise HTTPException(status_code=400, detail=f"Order is not payable (payment {order.payment_status})")
+    if order.payment_id:
+        raise HTTPException(status_code=409, detail="A payment is already in progress for this order")
+    return order
+
+
+def _save_transaction(db: Session, order_id: int, transaction_id: str) -> bool:
+    # Only the first attempt is kept: the webhook and reconciler find the
+    # payment by this id, so replacing it would orphan a payment in flight
+    saved = db.query(Order).filter(
+        Order.id == order_id,
+        Order.payment_id.is_(None),
+    ).update({"payment_id": transaction_id}, synchronize_session=False)
+    db.commit()
+    return bool(saved)
+
+
+@router.post("/initiate", response_model=PaymentResponse)
+async def start_payment(
+    payment: PaymentRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Start a gateway payment for one of the user's pending orders"""
+    order = await run_in_threadpool(_payable_order, db, payment.order_id, current_user.id)
+    amount_paise = to_paise(order.total_amount)
+    if to_paise(payment.amount) != amount_paise:
+        raise HTTPException(status_code=400, detail="Amount does not match order total")
+
+    try:
+        payment_url, transaction_id = await initiate_payment(order.id, amount_paise, payment.phone)
+    except PaymentGatewayNotConfigured as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except PaymentGatewayError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    if not await run_in_threadpool(_save_transaction, db, order.id, transaction_id):
+        raise HTTPException(status_code=409, detail="A payment is already in progress for this order")
+    return {"payment_url": payment_url, "transaction_id": transaction_id}
+
+
+def _settle(db: Session, transaction_id: str, payment_status: str) -> bool:
+    settled = apply_payment_status(db, transaction_id, payment_status)
+    db.commit()
+    return settled
+
+
+@router.post("/webhook")
+async def payment_webhook(
+    request: Request,
+    x_verify: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Gateway callback; body is signed with HMAC-SHA256 in X-VERIFY"""
+    body = await request.body()
+    if not verify_webhook_signature(body, x_verify):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    try:
+        event = json.loads(body)
+        transaction_id = event["data"]["merchantTransactionId"]
+        payment_status = GATEWAY_STATUS.get(event.get("code"), "pending")
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Malformed payload")
+
+    settled = await run_in_threadpool(_settle, db, transaction_id, payment_status)
+    return {"received": True, "settled": settled}
+
+
+@router.get("/{order_id}/status", response_model=PaymentStatus)
+def get_payment_status(
+    order_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_primary_db)
+):
+    """Current payment status of an order (from the primary: webhooks update it)"""
+    order = db.query(Order).filter(
+        Order.id == order_id,
+        Order.user_id == current_user.id
+    ).first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return {
+        "order_id": order.id,
+        "status": order.status,
+        "payment_status": order.payment_status,
+        "payment_id": order.payment_id,
+    }
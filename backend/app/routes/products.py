@@ -1,36 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+import os
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 
+from ..cache import get_cache
+from ..core.compression import PrecompressedBody
+from ..core.tenancy import tenant_key
 from ..deps.db import get_db
 from ..models import Product
+from ..utils.search_index import search_indexes
+from ..utils.serializers import ORJSONResponse, dumps, product_card_to_dict
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/products", tags=["products"])
 
+# Bounds staleness of stock counts, and of catalog edits with a per-process cache backend.
+# Keys are per tenant; entries of idle tenants age out of the backend's LRU.
+CATALOG_CACHE_TTL_SECONDS = int(os.getenv("CATALOG_CACHE_TTL_SECONDS", "60"))
+catalog_cache = get_cache("catalog", ttl=CATALOG_CACHE_TTL_SECONDS)
+
+
+def catalog_body(db: Session) -> PrecompressedBody:
+    """Active catalog as JSON, compressed once per rebuild rather than per request."""
+    def build():
+        products = db.query(Product).filter(Product.is_active == True).all()
+        return PrecompressedBody(dumps([product_card_to_dict(p) for p in products]))
+
+    return catalog_cache.get_or_set(tenant_key("active"), build)
+
+
 @router.get("")
-def list_products_no_slash(db: Session = Depends(get_db)):
-    return db.query(Product).filter(Product.is_active == True).all()
+def list_products_no_slash(request: Request, db: Session = Depends(get_db)):
+    return catalog_body(db).response(request.headers.get("accept-encoding", ""))
 
 
 @router.get("/")
-def list_products(db: Session = Depends(get_db)):
+def list_products(request: Request, db: Session = Depends(get_db)):
     """Get all active products."""
     try:
-        return db.query(Product).filter(Product.is_active == True).all()
-    except Exception as e:
-        print(f"Error in list_products: {e}")
+        return catalog_body(db).response(request.headers.get("accept-encoding", ""))
+    except Exception:
+        logger.exception("Failed to list products")
         raise
 
 
+@router.get("/search")
+def search_products(
+    q: str = "",
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """Prefix search over name, description and category, with category/price facets."""
+    index = search_indexes.get()
+    index.ensure_loaded(db)
+    return ORJSONResponse(index.search(q, category, min_price, max_price, limit, offset))
+
+
 @router.get("/{product_id}")
 def get_product(product_id: int, db: Session = Depends(get_db)):
     """Get single product by ID."""
     try:
-        product = db.query(Product).filter(Product.id == product_id).first()
-        if not product:
+        def load():
+            product = db.query(Product).filter(Product.id == product_id).first()
+            return product_card_to_dict(product) if product else None
+
+        data = catalog_cache.get_or_set(tenant_key(f"product:{product_id}"), load)
+        if data is None:
             raise HTTPException(status_code=404, detail="Product not found")
-        return product
-    except Exception as e:
-        print(f"Error in get_product: {e}")
+        return ORJSONResponse(data)
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Failed to load product", extra={"product_id": product_id})
         raise
 
 
@@ -0,0 +1,32 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from ..schema import ShippingQuote
+from ..utils.pricing import to_paise, to_rupees
+from ..utils.shipping import ShippingUnavailable, free_shipping_above_paise, quote
+
+router = APIRouter(prefix="/api/shipping", tags=["shipping"])
+
+
+@router.get("/quote", response_model=ShippingQuote)
+async def shipping_quote(
+    pincode: str = Query(..., pattern=r"^[1-9][0-9]{5}$"),
+    subtotal: Optional[float] = Query(None, ge=0)
+):
+    """Whether we deliver to a pincode, when, and the shipping charge for a cart subtotal."""
+    try:
+        found = quote(pincode, to_paise(subtotal))
+    except ShippingUnavailable:
+        raise HTTPException(status_code=503, detail="Delivery estimates are unavailable right now, please retry")
+    free_above = free_shipping_above_paise()
+    if found is None:
+        return {"pincode": pincode, "serviceable": False}
+    return {
+        "pincode": pincode,
+        "serviceable": True,
+        "zone": found.zone,
+        "eta_days": found.eta_days,
+        "shipping": to_rupees(found.shipping_paise),
+        "free_shipping_above": to_rupees(free_above) if free_above else None,
+    }
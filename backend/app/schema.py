@@ -45,11 +45,11 @@ class ProductBase(BaseModel):
     category: Optional[str] = None
 
 class ProductCreate(ProductBase):
-    stock_quantity: int = 0
+    stock_grams: int = 0
 
 class Product(ProductBase):
     id: int
-    stock_quantity: int
+    stock_grams: int
     is_active: bool
     created_at: datetime
     
@@ -77,6 +77,30 @@ class CartItem(CartItemBase):
 class CartItemUpdate(BaseModel):
     quantity: int
 
+class CartLine(BaseModel):
+    item_id: int
+    product_id: int
+    name: str
+    image: Optional[str] = None
+    size: str
+    quantity: int
+    unit_price: float
+    line_total: float
+
+class TaxBreakdown(BaseModel):
+    cgst_rate: float
+    cgst: float
+    sgst_rate: float
+    sgst: float
+
+class CartSummary(BaseModel):
+    items: List[CartLine]
+    item_count: int
+    subtotal: float
+    tax: TaxBreakdown
+    grand_total: float
+    unavailable: List[str] = []  # products in the cart no longer on sale
+
 # Address schemas
 class AddressBase(BaseModel):
     full_name: str
@@ -128,6 +152,7 @@ class OrderCreate(OrderBase):
 class Order(OrderBase):
     id: int
     user_id: int
+    shipping_paise: int = 0
     status: str
     payment_status: str
     payment_id: Optional[str] = None
@@ -139,6 +164,40 @@ class Order(OrderBase):
     class Config:
         from_attributes = True
 
+class OrderEvent(BaseModel):
+    id: int
+    order_id: int
+    from_status: Optional[str] = None
+    to_status: str
+    payment_status: Optional[str] = None
+    source: str
+    note: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class OrderEventFeed(BaseModel):
+    events: List[OrderEvent]
+    cursor: int  # pass back as `after` to continue the feed
+
+class StatusTransition(BaseModel):
+    status: str
+    order_ids: List[int] = Field(..., min_length=1, max_length=10000)
+    note: Optional[str] = None
+
+class BulkTransitionRequest(BaseModel):
+    transitions: List[StatusTransition] = Field(..., min_length=1)
+
+# Shipping schemas
+class ShippingQuote(BaseModel):
+    pincode: str
+    serviceable: bool
+    zone: Optional[str] = None
+    eta_days: Optional[int] = None
+    shipping: Optional[float] = None
+    free_shipping_above: Optional[float] = None
+
 # Payment schemas
 class PaymentRequest(BaseModel):
     order_id: int
@@ -149,6 +208,12 @@ class PaymentResponse(BaseModel):
     payment_url: str
     transaction_id: str
 
+class PaymentStatus(BaseModel):
+    order_id: int
+    status: str
+    payment_status: str
+    payment_id: Optional[str] = None
+
 # Lead schemas (existing)
 class LeadBase(BaseModel):
     type: str
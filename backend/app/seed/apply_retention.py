@@ -0,0 +1,26 @@
+"""
+Apply the data retention policies (app.utils.retention) once.
+
+    python -m app.seed.apply_retention [--dry-run] [--policy abandoned_carts ...]
+
+Prints the rows each policy deleted, cleared or archived (or, with
+--dry-run, would). This is how retention is scheduled: run it from
+cron (e.g. hourly) on one host, not from every app worker.
+"""
+import argparse
+import json
+
+from app.utils.retention import POLICIES, run_retention
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="count rows without changing them")
+    parser.add_argument("--policy", action="append", choices=sorted(POLICIES), help="only these policies")
+    args = parser.parse_args()
+
+    print(json.dumps(run_retention(args.policy, dry_run=args.dry_run), indent=2))
+
+
+if __name__ == "__main__":
+    main()
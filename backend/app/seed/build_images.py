@@ -0,0 +1,32 @@
+"""
+Generate AVIF/WebP product image variants and their manifest.
+
+    python -m app.seed.build_images [--source DIR] [--workers N] [--prune] [names ...]
+
+Only new or changed images are encoded; rerun after adding product photos.
+Naming images rebuilds just those and keeps the rest of the manifest;
+--prune needs a full build.
+"""
+import argparse
+
+from app.utils.images import IMAGE_OUTPUT_DIR, IMAGE_SOURCE_DIR, build_images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("names", nargs="*", help="source filenames (default: every image in --source)")
+    parser.add_argument("--source", default=IMAGE_SOURCE_DIR)
+    parser.add_argument("--output", default=IMAGE_OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="encoder processes (default: CPU count)")
+    parser.add_argument("--prune", action="store_true", help="delete variants no longer in the manifest")
+    args = parser.parse_args()
+    if args.prune and args.names:
+        parser.error("--prune needs a full build; drop the image names")
+
+    manifest = build_images(args.source, args.output, args.names or None, args.workers, args.prune)
+    files = sum(len(widths) for entry in manifest.values() for widths in entry["variants"].values())
+    print(f"✅ {len(manifest)} images, {files} variants in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Create or update a storefront tenant and the hosts it is served on.
+
+    python -m app.seed.create_tenant brand "Brand Foods" --host shop.brand.in --host www.brand.in
+    python -m app.seed.create_tenant brand "Brand Foods" --settings '{"free_shipping_above_paise": 49900}'
+
+--settings is merged into the tenant's existing settings. Workers pick
+up changes within TENANT_CACHE_TTL_SECONDS.
+"""
+import argparse
+import json
+
+from app.database import SessionLocal
+from app.models import Tenant, TenantDomain
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("slug")
+    parser.add_argument("name")
+    parser.add_argument("--host", action="append", default=[], help="host name to serve it on (repeatable)")
+    parser.add_argument("--settings", type=json.loads, default={}, help="JSON object of settings overrides")
+    parser.add_argument("--inactive", action="store_true", help="stop serving it")
+    args = parser.parse_args()
+    if not isinstance(args.settings, dict):
+        parser.error("--settings must be a JSON object")
+
+    with SessionLocal() as db:
+        tenant = db.query(Tenant).filter(Tenant.slug == args.slug).first()
+        if tenant is None:
+            tenant = Tenant(slug=args.slug)
+            db.add(tenant)
+        tenant.name = args.name
+        tenant.settings = {**(tenant.settings or {}), **args.settings}
+        tenant.is_active = not args.inactive
+        db.flush()
+        for host in args.host:
+            host = host.strip().lower()
+            domain = db.get(TenantDomain, host)
+            if domain is not None and domain.tenant_id != tenant.id:
+                parser.error(f"{host} already belongs to tenant {domain.tenant_id}")
+            db.merge(TenantDomain(host=host, tenant_id=tenant.id))
+        db.commit()
+        hosts = [d.host for d in db.query(TenantDomain).filter(TenantDomain.tenant_id == tenant.id)]
+        print(json.dumps({
+            "id": tenant.id,
+            "slug": tenant.slug,
+            "name": tenant.name,
+            "active": tenant.is_active,
+            "hosts": sorted(hosts),
+            "settings": tenant.settings,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Bring an existing database up to the current schema.
+
+    python -m app.seed.migrate [--check]
+
+Creates missing tables and the default tenant, then applies the steps
+in app.utils.migrations that the database still needs. --check only
+lists them. Run once per deploy, before starting the workers.
+"""
+import argparse
+import json
+
+from app.core.tenancy import ensure_default_tenant
+from app.database import Base, SessionLocal, engine
+from app.utils.migrations import migrate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="list pending steps without applying them")
+    args = parser.parse_args()
+
+    if not args.check:
+        Base.metadata.create_all(bind=engine)
+        with SessionLocal() as db:
+            ensure_default_tenant(db)
+    steps = migrate(engine, apply=not args.check)
+    print(json.dumps({"pending" if args.check else "applied": steps}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
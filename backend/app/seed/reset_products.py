@@ -1,10 +1,20 @@
 from app.database import SessionLocal
-from app.models import Product
+from app.models import Product, ProductVariant
 
-db = SessionLocal()
 
-# DELETE OLD PRODUCTS
-db.query(Product).delete()
-db.commit()
+def main():
+    # Not needed to refresh the catalog: app.utils.seed_products syncs in
+    # place. This wipes it outright, e.g. for a fresh dev database.
+    db = SessionLocal()
+    try:
+        db.query(ProductVariant).delete()
+        db.query(Product).delete()
+        db.commit()
+    finally:
+        db.close()
 
-print("❌ Old products deleted. Now run seed_products.py to insert new ones.")
+    print("❌ Old products deleted. Now run seed_products.py to insert new ones.")
+
+
+if __name__ == "__main__":
+    main()
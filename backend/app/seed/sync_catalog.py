@@ -0,0 +1,42 @@
+"""
+Apply a product manifest (CSV or JSON) to the catalog.
+
+    python -m app.seed.sync_catalog manifest.csv [--tenant SLUG] [--dry-run] [--keep-missing]
+
+Products missing from the manifest are deactivated unless --keep-missing.
+"""
+import argparse
+import json
+import os
+
+from app.core.tenancy import DEFAULT_TENANT_SLUG, tenant_context
+from app.database import SessionLocal
+from app.utils.catalog_sync import ManifestError, parse_manifest, sync_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("manifest")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT_SLUG, help="storefront whose catalog to sync")
+    parser.add_argument("--dry-run", action="store_true", help="report changes without applying them")
+    parser.add_argument("--keep-missing", action="store_true", help="do not deactivate unlisted products")
+    args = parser.parse_args()
+
+    fmt = "json" if args.manifest.lower().endswith(".json") else "csv"
+    with open(args.manifest, "rb") as f:
+        data = f.read()
+    try:
+        rows = parse_manifest(data, fmt)
+    except ManifestError as e:
+        raise SystemExit(f"{os.path.basename(args.manifest)}: {e}")
+
+    try:
+        with tenant_context(args.tenant), SessionLocal() as db:
+            report = sync_catalog(db, rows, deactivate_missing=not args.keep_missing, dry_run=args.dry_run)
+    except LookupError as e:
+        raise SystemExit(str(e))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Address book.
+
+One default address per user is enforced by a partial unique index on
+addresses(user_id) WHERE is_default. Changing the default clears the old
+one and sets the new one with two single-row UPDATEs in the caller's
+transaction; a concurrent swap loses on the index instead of leaving two
+defaults. With a shared cache backend each user's address list is
+cached and dropped after every committed write; a per-process backend
+would keep serving other workers the list from before the write, so
+there the table is read every time.
+"""
+import os
+from typing import List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from ..cache import get_cache
+from ..models import Address
+from .serializers import address_to_dict
+
+ADDRESS_CACHE_TTL_SECONDS = float(os.getenv("ADDRESS_CACHE_TTL_SECONDS", "600"))
+
+address_cache = get_cache("addresses", ttl=ADDRESS_CACHE_TTL_SECONDS)
+
+
+class AddressNotFound(LookupError):
+    pass
+
+
+def list_addresses(db: Session, user_id: int) -> List[dict]:
+    """The user's addresses, default first, as response dicts (cached)."""
+    def load():
+        rows = (
+            db.query(Address)
+            .filter(Address.user_id == user_id)
+            .order_by(Address.is_default.desc(), Address.id)
+            .all()
+        )
+        return [address_to_dict(row) for row in rows]
+
+    if not address_cache.backend.shared:
+        return load()
+    return address_cache.get_or_set(f"user:{user_id}", load)
+
+
+def get_address(db: Session, user_id: int, address_id: int) -> Optional[dict]:
+    """
+    One of the user's addresses as a response dict, or None. Served from the
+    cached list, falling back to the table when it is not there, since the
+    list may predate an address added through another worker.
+    """
+    found = next((a for a in list_addresses(db, user_id) if a["id"] == address_id), None)
+    if found is None:
+        row = db.query(Address).filter(Address.id == address_id, Address.user_id == user_id).first()
+        if row is not None:
+            invalidate_addresses(user_id)
+            found = address_to_dict(row)
+    return found
+
+
+def invalidate_addresses(user_id: int):
+    address_cache.delete(f"user:{user_id}")
+
+
+def _clear_default(db: Session, user_id: int):
+    # Touches only the current default row, not every address of the user
+    db.execute(
+        update(Address)
+        .where(Address.user_id == user_id, Address.is_default == True)
+        .values(is_default=False)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def add_address(db: Session, user_id: int, data: dict) -> Address:
+    """Insert an address, taking over as default if asked. Does not commit."""
+    if data.get("is_default"):
+        _clear_default(db, user_id)
+    address = Address(user_id=user_id, **data)
+    db.add(address)
+    db.flush()
+    return address
+
+
+def set_default_address(db: Session, user_id: int, address_id: int):
+    """Make one of the user's addresses the default. Does not commit."""
+    _clear_default(db, user_id)
+    updated = db.execute(
+        update(Address)
+        .where(Address.id == address_id, Address.user_id == user_id)
+        .values(is_default=True)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        raise AddressNotFound(address_id)
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models import CartItem, Product
+from .pricing import CGST_PER_MILLE, SGST_PER_MILLE, gst_breakdown, price_index, to_rupees
+
+# Upper bound on how stale a snapshot may get when the cart is changed
+# through another worker process.
+CART_SNAPSHOT_TTL_SECONDS = int(os.getenv("CART_SNAPSHOT_TTL_SECONDS", "300"))
+CART_SNAPSHOT_MAX_USERS = int(os.getenv("CART_SNAPSHOT_MAX_USERS", "10000"))
+
+
+class CartLine:
+    __slots__ = ("item_id", "product_id", "name", "image", "size", "quantity", "unit_paise")
+
+    def __init__(self, item_id, product_id, name, image, size, quantity, unit_paise):
+        self.item_id = item_id
+        self.product_id = product_id
+        self.name = name
+        self.image = image
+        self.size = size
+        self.quantity = quantity
+        self.unit_paise = unit_paise
+
+    @property
+    def line_paise(self) -> int:
+        return self.unit_paise * self.quantity
+
+
+class CartSnapshot:
+    """
+    Priced view of a user's cart, with totals in paise. Items of products
+    taken off sale are left out of the lines and named in `unavailable`.
+    `price_version` is the price index version it was priced at.
+    """
+
+    def __init__(self, lines: List[CartLine], unavailable: List[str] = (), price_version: Optional[int] = None):
+        self.lines = lines
+        self.unavailable = list(unavailable)
+        self.price_version = price_version
+        self.subtotal_paise = sum(line.line_paise for line in lines)
+        self.cgst_paise, self.sgst_paise = gst_breakdown(self.subtotal_paise)
+        self.total_paise = self.subtotal_paise + self.cgst_paise + self.sgst_paise
+        self.built_at = time.monotonic()
+
+    def to_summary(self) -> dict:
+        return {
+            "items": [
+                {
+                    "item_id": line.item_id,
+                    "product_id": line.product_id,
+                    "name": line.name,
+                    "image": line.image,
+                    "size": line.size,
+                    "quantity": line.quantity,
+                    "unit_price": to_rupees(line.unit_paise),
+                    "line_total": to_rupees(line.line_paise),
+                }
+                for line in self.lines
+            ],
+            "item_count": sum(line.quantity for line in self.lines),
+            "subtotal": to_rupees(self.subtotal_paise),
+            "tax": {
+                "cgst_rate": CGST_PER_MILLE / 10,
+                "cgst": to_rupees(self.cgst_paise),
+                "sgst_rate": SGST_PER_MILLE / 10,
+                "sgst": to_rupees(self.sgst_paise),
+            },
+            "grand_total": to_rupees(self.total_paise),
+            "unavailable": self.unavailable,
+        }
+
+
+_snapshots: "OrderedDict[int, CartSnapshot]" = OrderedDict()
+# Set from a process-wide counter on every invalidation so a snapshot built
+# concurrently with a cart write is never stored over the fresher state.
+# Bounded like _snapshots; users evicted from it read as _evicted_generation,
+# which is at least anything they had, so an in-flight build still loses.
+_generations: "OrderedDict[int, int]" = OrderedDict()
+_generation_counter = 0
+_evicted_generation = 0
+_lock = threading.Lock()
+
+
+def build_cart_snapshot(db: Session, user_id: int) -> CartSnapshot:
+    price_version = price_index.version(db)
+    rows: List[Tuple] = (
+        db.query(
+            CartItem.id, CartItem.product_id, CartItem.size, CartItem.quantity,
+            Product.name, Product.image, Product.is_active,
+        )
+        .join(Product, CartItem.product_id == Product.id)
+        .filter(CartItem.user_id == user_id)
+        .order_by(CartItem.id)
+        .all()
+    )
+    lines, unavailable = [], []
+    for item_id, product_id, size, quantity, name, image, is_active in rows:
+        if not is_active:
+            unavailable.append(name)
+            continue
+        unit_paise = price_index.price(db, product_id, size)
+        if unit_paise is None:
+            continue
+        lines.append(CartLine(item_id, product_id, name, image, size, quantity, unit_paise))
+    return CartSnapshot(lines, unavailable, price_version)
+
+
+def get_cart_snapshot(db: Session, user_id: int) -> CartSnapshot:
+    """
+    Cached snapshot of the user's cart, rebuilt after any cart write in
+    this worker or price change. For display only: checkout prices a fresh
+    `build_cart_snapshot`, since the cart may have changed elsewhere.
+    """
+    price_version = price_index.version(db)
+    with _lock:
+        snapshot: Optional[CartSnapshot] = _snapshots.get(user_id)
+        generation = _generations.get(user_id, _evicted_generation)
+        if (
+            snapshot
+            and snapshot.price_version == price_version
+            and time.monotonic() - snapshot.built_at < CART_SNAPSHOT_TTL_SECONDS
+        ):
+            _snapshots.move_to_end(user_id)
+            return snapshot
+
+    snapshot = build_cart_snapshot(db, user_id)
+    if db.info.get("read_only"):
+        return snapshot  # may lag the primary; checkout must not reuse it
+    with _lock:
+        if _generations.get(user_id, _evicted_generation) == generation:
+            _snapshots[user_id] = snapshot
+            _snapshots.move_to_end(user_id)
+            while len(_snapshots) > CART_SNAPSHOT_MAX_USERS:
+                _snapshots.popitem(last=False)
+    return snapshot
+
+
+def invalidate_cart_snapshot(user_id: int):
+    global _generation_counter, _evicted_generation
+    with _lock:
+        _snapshots.pop(user_id, None)
+        _generation_counter += 1
+        _generations[user_id] = _generation_counter
+        _generations.move_to_end(user_id)
+        while len(_generations) > CART_SNAPSHOT_MAX_USERS:
+            _, evicted = _generations.popitem(last=False)
+            _evicted_generation = max(_evicted_generation, evicted)
@@ -0,0 +1,174 @@
+"""
+Catalog sync: apply a product manifest to the products table.
+
+The manifest is keyed by product name. One query loads the current
+catalog, the diff is computed in memory, and inserts, updates and
+deactivations are applied as bulk statements in a single transaction, so
+the storefront never sees a partial or empty catalog.
+"""
+import csv
+import io
+import json
+from typing import Dict, Iterable, List
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from ..cache import get_cache
+from ..models import Product
+from .pricing import price_index, sync_product_variants
+from .search_index import search_indexes
+
+FIELDS = ("name", "base_price", "image", "category", "description", "stock_grams", "is_active")
+_TRUE = {"1", "true", "yes", "y"}
+
+
+class ManifestError(ValueError):
+    pass
+
+
+def _clean_row(raw: dict, line: int) -> dict:
+    row = {k.strip(): v for k, v in raw.items() if k and k.strip() in FIELDS}
+    name = (row.get("name") or "").strip()
+    if not name:
+        raise ManifestError(f"Row {line}: name is required")
+    row["name"] = name
+
+    try:
+        row["base_price"] = float(row["base_price"])
+    except (KeyError, TypeError, ValueError):
+        raise ManifestError(f"Row {line}: base_price must be a number")
+    if row["base_price"] <= 0:
+        raise ManifestError(f"Row {line}: base_price must be positive")
+
+    for key in ("image", "category", "description"):
+        if key in row:
+            row[key] = (row[key] or "").strip() or None
+
+    if row.get("stock_grams") not in (None, ""):
+        try:
+            row["stock_grams"] = int(row["stock_grams"])
+        except (TypeError, ValueError):
+            raise ManifestError(f"Row {line}: stock_grams must be an integer")
+    else:
+        row.pop("stock_grams", None)
+
+    if row.get("is_active") not in (None, ""):
+        value = row["is_active"]
+        row["is_active"] = value if isinstance(value, bool) else str(value).strip().lower() in _TRUE
+    else:
+        row["is_active"] = True
+    return row
+
+
+def parse_manifest(data: bytes, fmt: str) -> List[dict]:
+    """Parse a CSV (with header row) or JSON (list of objects) manifest."""
+    if fmt == "json":
+        try:
+            raw_rows = json.loads(data)
+        except ValueError as e:
+            raise ManifestError(f"Invalid JSON: {e}")
+        if not isinstance(raw_rows, list):
+            raise ManifestError("JSON manifest must be a list of products")
+    elif fmt == "csv":
+        raw_rows = list(csv.DictReader(io.StringIO(data.decode("utf-8-sig"))))
+    else:
+        raise ManifestError(f"Unsupported manifest format: {fmt}")
+
+    rows, seen = [], set()
+    for line, raw in enumerate(raw_rows, start=1):
+        if not isinstance(raw, dict):
+            raise ManifestError(f"Row {line}: expected an object")
+        row = _clean_row(raw, line)
+        key = row["name"].lower()
+        if key in seen:
+            raise ManifestError(f"Row {line}: duplicate product {row['name']!r}")
+        seen.add(key)
+        rows.append(row)
+    return rows
+
+
+def sync_catalog(
+    db: Session,
+    rows: Iterable[dict],
+    deactivate_missing: bool = True,
+    update_existing: bool = True,
+    dry_run: bool = False,
+    insert_only: Iterable[str] = (),
+) -> Dict[str, object]:
+    """
+    Diff manifest rows against the current tenant's catalog and apply the
+    changes. Fields in `insert_only` are set on new products but never
+    overwrite existing ones. Commits unless `dry_run`; returns a change report.
+    """
+    rows = list(rows)
+    insert_only = set(insert_only)
+    current = {
+        p.name.lower(): p
+        for p in db.query(
+            Product.id, Product.name, Product.base_price, Product.image, Product.category,
+            Product.description, Product.stock_grams, Product.is_active,
+        )
+    }
+
+    inserts: List[dict] = []
+    updates: List[dict] = []
+    repriced: List[int] = []
+    updated_names: List[str] = []
+    for row in rows:
+        existing = current.pop(row["name"].lower(), None)
+        if existing is None:
+            inserts.append({"stock_grams": 0, **row})
+            continue
+        if not update_existing:
+            continue
+        changes = {
+            key: value for key, value in row.items()
+            if key != "name" and key not in insert_only and getattr(existing, key) != value
+        }
+        if changes:
+            updates.append({"id": existing.id, **changes})
+            updated_names.append(existing.name)
+            if "base_price" in changes:
+                repriced.append(existing.id)
+
+    deactivate = [p for p in current.values() if p.is_active] if deactivate_missing else []
+
+    report = {
+        "inserted": [row["name"] for row in inserts],
+        "updated": updated_names,
+        "deactivated": [p.name for p in deactivate],
+        "unchanged": len(rows) - len(inserts) - len(updates),
+        "dry_run": dry_run,
+    }
+    if dry_run:
+        return report
+
+    inserted_ids: List[int] = []
+    if inserts:
+        inserted_ids = list(db.execute(insert(Product).returning(Product.id), inserts).scalars())
+    if updates:
+        db.execute(update(Product), updates)
+    if deactivate:
+        db.execute(
+            update(Product)
+            .where(Product.id.in_([p.id for p in deactivate]))
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        )
+
+    changed: List[Product] = []
+    if inserted_ids or updates:
+        changed = db.query(Product).filter(
+            Product.id.in_(inserted_ids + [u["id"] for u in updates])
+        ).all()
+        priced = set(inserted_ids + repriced)
+        sync_product_variants(db, [p for p in changed if p.id in priced])
+
+    db.commit()
+    price_index.invalidate()
+    get_cache("catalog").invalidate()
+    index = search_indexes.get()
+    index.upsert(changed)
+    index.remove(p.id for p in deactivate)
+    return report
@@ -1,6 +1,9 @@
+import logging
 import os
 import requests
 
+logger = logging.getLogger(__name__)
+
 POSTMARK_API_KEY = os.getenv("POSTMARK_API_KEY")
 POSTMARK_FROM_EMAIL = os.getenv("POSTMARK_FROM_EMAIL")
 
@@ -11,7 +14,7 @@ def send_email(to_email: str, subject: str, body: str):
     """
 
     if not POSTMARK_API_KEY or not POSTMARK_FROM_EMAIL:
-        print("⚠️ Email skipped: Postmark env vars missing")
+        logger.warning("Email skipped: Postmark env vars missing")
         return
 
     url = "https://api.postmarkapp.com/email"
@@ -35,8 +38,8 @@ def send_email(to_email: str, subject: str, body: str):
 
         if response.status_code != 200:
             # IMPORTANT: do NOT raise Exception
-            print("⚠️ Postmark blocked email:", response.text)
+            logger.warning("Postmark blocked email", extra={"status": response.status_code, "response": response.text})
 
     except Exception as e:
-        print("⚠️ Email send failed:", e)
+        logger.exception("Email send failed")
 
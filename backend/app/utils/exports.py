@@ -0,0 +1,205 @@
+"""
+Order and revenue exports for finance.
+
+One row per order item, joined with its order, product and delivery
+address. Rows are read through a streaming cursor (server-side on
+Postgres) in batches of EXPORT_BATCH_ROWS and each batch is written out
+before the next is fetched, so memory stays flat however many orders
+there are. Output is Parquet, one row group per batch, when pyarrow is
+installed, else CSV.
+
+Exports are incremental on the order's last change (updated_at, else
+created_at): an export covers `since < changed_at <= until` and returns
+`until` as the watermark to pass as `since` next time. `until` trails
+the clock by EXPORT_SETTLE_SECONDS so orders still being committed are
+picked up by the next export rather than skipped.
+
+Within a request only the storefront's own orders are exported (see
+app.core.tenancy); the CLI exports every tenant unless given --tenant.
+"""
+import csv
+import io
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import Address, Order, OrderItem, Product
+from .pricing import to_paise
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV only
+    pa = pq = None
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "10000"))
+EXPORT_SETTLE_SECONDS = int(os.getenv("EXPORT_SETTLE_SECONDS", "60"))
+
+# (name, arrow type name); timestamps are UTC
+COLUMNS = [
+    ("tenant_id", "int64"),
+    ("order_id", "int64"),
+    ("order_created_at", "timestamp"),
+    ("order_changed_at", "timestamp"),
+    ("user_id", "int64"),
+    ("status", "string"),
+    ("payment_status", "string"),
+    ("payment_id", "string"),
+    ("order_total_paise", "int64"),
+    ("item_id", "int64"),
+    ("product_id", "int64"),
+    ("product_name", "string"),
+    ("size", "string"),
+    ("quantity", "int64"),
+    ("unit_price_paise", "int64"),
+    ("line_total_paise", "int64"),
+    ("pincode", "string"),
+    ("city", "string"),
+    ("state", "string"),
+]
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+
+MEDIA_TYPES = {"parquet": "application/vnd.apache.parquet", "csv": "text/csv"}
+
+
+class ExportWindow(NamedTuple):
+    since: Optional[datetime]
+    until: datetime
+
+
+def available_formats() -> List[str]:
+    return ["parquet", "csv"] if pa is not None else ["csv"]
+
+
+def default_format() -> str:
+    return available_formats()[0]
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Naive UTC, whatever the driver returned (SQLite is naive, Postgres aware)."""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def export_window(since: Optional[datetime] = None, now: datetime = None) -> ExportWindow:
+    until = (now or datetime.utcnow()) - timedelta(seconds=EXPORT_SETTLE_SECONDS)
+    return ExportWindow(_utc(since), until)
+
+
+def _query(window: ExportWindow):
+    changed_at = func.coalesce(Order.updated_at, Order.created_at)
+    query = (
+        select(
+            Order.tenant_id, Order.id, Order.created_at, changed_at, Order.user_id, Order.status, Order.payment_status,
+            Order.payment_id, Order.total_amount,
+            OrderItem.id, OrderItem.product_id, Product.name, OrderItem.size, OrderItem.quantity, OrderItem.price,
+            Address.pincode, Address.city, Address.state,
+        )
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .join(Product, Product.id == OrderItem.product_id)
+        .join(Address, Address.id == Order.address_id)
+        .where(changed_at <= window.until)
+        .order_by(Order.id, OrderItem.id)
+    )
+    if window.since is not None:
+        query = query.where(changed_at > window.since)
+    return query
+
+
+def iter_batches(db: Session, window: ExportWindow, batch_rows: int = None) -> Iterator[List[tuple]]:
+    """Export rows (in COLUMNS order) in lists of at most `batch_rows`."""
+    batch_rows = batch_rows or EXPORT_BATCH_ROWS
+    result = db.execute(_query(window).execution_options(yield_per=batch_rows))
+    for partition in result.partitions():
+        batch = []
+        for (tenant_id, order_id, created_at, changed_at, user_id, status, payment_status, payment_id, total,
+             item_id, product_id, product_name, size, quantity, price, pincode, city, state) in partition:
+            unit_paise = to_paise(price)
+            batch.append((
+                tenant_id, order_id, _utc(created_at), _utc(changed_at), user_id, status, payment_status, payment_id,
+                to_paise(total), item_id, product_id, product_name, size, quantity, unit_paise,
+                unit_paise * quantity, pincode, city, state,
+            ))
+        yield batch
+
+
+class _Chunks(io.RawIOBase):
+    """Write-only sink whose contents are taken after each write, so nothing accumulates."""
+
+    def __init__(self):
+        self._pending: List[bytes] = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        # Parquet records file offsets in its footer
+        return self._position
+
+    def write(self, data):
+        self._pending.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def take(self) -> bytes:
+        data, self._pending = b"".join(self._pending), []
+        return data
+
+
+def _arrow_schema():
+    types = {"int64": pa.int64(), "string": pa.string(), "timestamp": pa.timestamp("us")}
+    return pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+
+
+def _parquet_chunks(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    schema = _arrow_schema()
+    sink = _Chunks()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for batch in batches:
+            if batch:
+                columns = list(zip(*batch))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema,
+                ))
+                yield sink.take()
+    yield sink.take()  # footer
+
+
+def _csv_chunks(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMN_NAMES)
+    for batch in batches:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row] for row in batch
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()  # header only, if there were no rows
+
+
+def _chunks(window: ExportWindow, fmt: str, batch_rows: Optional[int]) -> Iterator[bytes]:
+    # Its own session: a streamed response outlives the request's dependencies
+    with SessionLocal() as db:
+        batches = iter_batches(db, window, batch_rows)
+        for chunk in _parquet_chunks(batches) if fmt == "parquet" else _csv_chunks(batches):
+            if chunk:
+                yield chunk
+
+
+def stream_export(window: ExportWindow, fmt: str, batch_rows: int = None) -> Iterator[bytes]:
+    """
+    The export file as a sequence of byte chunks, one per batch. Raises
+    ValueError straight away for a format that is not available.
+    """
+    if fmt not in available_formats():
+        raise ValueError(f"Unsupported export format: {fmt} (available: {', '.join(available_formats())})")
+    return _chunks(window, fmt, batch_rows)
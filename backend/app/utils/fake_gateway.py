@@ -0,0 +1,55 @@
+"""
+Local stand-in for the payment gateway.
+
+Used in-process when PAYMENT_GATEWAY_URL=fake, or run as a server:
+
+    uvicorn app.utils.fake_gateway:app --port 8090
+
+Payments start PENDING and settle after FAKE_GATEWAY_SETTLE_SECONDS.
+Amounts ending in 13 paise fail, everything else succeeds.
+"""
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, HTTPException
+
+SETTLE_SECONDS = float(os.getenv("FAKE_GATEWAY_SETTLE_SECONDS", "2"))
+
+app = FastAPI(title="Fake payment gateway")
+_payments = {}
+
+
+@app.post("/pg/v1/pay")
+def pay(payload: dict):
+    transaction_id = payload.get("merchantTransactionId") or uuid.uuid4().hex
+    _payments[transaction_id] = {
+        "amount": int(payload.get("amount", 0)),
+        "created": time.monotonic(),
+    }
+    return {
+        "success": True,
+        "code": "PAYMENT_INITIATED",
+        "data": {
+            "merchantTransactionId": transaction_id,
+            "instrumentResponse": {
+                "redirectInfo": {"url": f"https://fake-gateway.local/pay/{transaction_id}"}
+            },
+        },
+    }
+
+
+@app.get("/pg/v1/status/{merchant_id}/{transaction_id}")
+def status(merchant_id: str, transaction_id: str):
+    payment = _payments.get(transaction_id)
+    if not payment:
+        raise HTTPException(status_code=404, detail="Unknown transaction")
+
+    if time.monotonic() - payment["created"] < SETTLE_SECONDS:
+        code = "PAYMENT_PENDING"
+    elif payment["amount"] % 100 == 13:
+        code = "PAYMENT_ERROR"
+    else:
+        code = "PAYMENT_SUCCESS"
+    return {"success": code == "PAYMENT_SUCCESS", "code": code,
+            "data": {"merchantTransactionId": transaction_id}}
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models import IdempotencyKey
+
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+# A claim older than this is assumed to belong to a crashed request.
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+CacheKey = Tuple[int, str, str]
+
+
+class _ResponseCache:
+    """LRU of completed responses in front of the idempotency_keys table, filled on first replay."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[CacheKey, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: CacheKey):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            if entry[3] < datetime.utcnow():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return entry
+
+    def put(self, key: CacheKey, entry: tuple):
+        with self._lock:
+            self._items[key] = entry
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
+_cache = _ResponseCache(IDEMPOTENCY_CACHE_SIZE)
+
+
+def _hash_request(payload: Any) -> str:
+    body = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _replay(status_code: int, body: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content=json.loads(body),
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+class IdempotentRequest:
+    """
+    Claim on an Idempotency-Key for one user and route.
+
+    `replay` is set when the key was already used for a completed request;
+    return it as-is. Otherwise run the handler, call `complete()` before its
+    commit, or `abandon()` on failure so the client can retry.
+    """
+
+    def __init__(self, db: Session, user_id: int, scope: str, key: Optional[str], request_hash: str):
+        self.db = db
+        self.user_id = user_id
+        self.scope = scope
+        self.key = key
+        self.request_hash = request_hash
+        self.replay: Optional[JSONResponse] = None
+
+    def complete(self, result: Any, status_code: int = 200) -> Any:
+        """
+        Stage the response for replays; returns it encoded, ready to send.
+
+        Call it before the handler's commit so the stored response commits
+        (or rolls back) together with the change it describes.
+        """
+        # Encode now: the commit that follows expires any ORM objects in `result`
+        content = jsonable_encoder(result)
+        if not self.key:
+            return content
+
+        self.db.query(IdempotencyKey).filter(
+            IdempotencyKey.user_id == self.user_id,
+            IdempotencyKey.scope == self.scope,
+            IdempotencyKey.key == self.key,
+        ).update({
+            "status_code": status_code,
+            "response_body": json.dumps(content),
+            "locked_at": None,
+            "expires_at": datetime.utcnow() + timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+        }, synchronize_session=False)
+        return content
+
+    def abandon(self):
+        """Roll back the session and release the claim."""
+        self.db.rollback()
+        if not self.key:
+            return
+        self.db.query(IdempotencyKey).filter(
+            IdempotencyKey.user_id == self.user_id,
+            IdempotencyKey.scope == self.scope,
+            IdempotencyKey.key == self.key,
+            IdempotencyKey.status_code.is_(None),
+        ).delete(synchronize_session=False)
+        self.db.commit()
+
+
+def begin_idempotent(
+    db: Session, user_id: int, scope: str, key: Optional[str], payload: Any = None
+) -> IdempotentRequest:
+    """Look up or claim `key`. Without a key this is a no-op claim."""
+    key = (key or "").strip() or None
+    request_hash = _hash_request(payload)
+    request = IdempotentRequest(db, user_id, scope, key, request_hash)
+    if not key:
+        return request
+    if len(key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key too long")
+
+    cached = _cache.get((user_id, scope, key))
+    if cached:
+        if cached[0] != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key reused with a different request")
+        request.replay = _replay(cached[1], cached[2])
+        return request
+
+    now = datetime.utcnow()
+    row = db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.scope == scope,
+        IdempotencyKey.key == key,
+    ).first()
+
+    if row and row.expires_at < now:
+        db.delete(row)
+        db.commit()
+        row = None
+
+    if row:
+        if row.request_hash != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key reused with a different request")
+        if row.status_code is not None:
+            _cache.put((user_id, scope, key), (row.request_hash, row.status_code, row.response_body, row.expires_at))
+            request.replay = _replay(row.status_code, row.response_body)
+            return request
+
+        # In progress elsewhere; take it over only if that request looks dead
+        stale_before = now - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+        taken = db.query(IdempotencyKey).filter(
+            IdempotencyKey.id == row.id,
+            IdempotencyKey.status_code.is_(None),
+            IdempotencyKey.locked_at < stale_before,
+        ).update({"locked_at": now}, synchronize_session=False)
+        db.commit()
+        if not taken:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
+        return request
+
+    db.add(IdempotencyKey(
+        user_id=user_id,
+        scope=scope,
+        key=key,
+        request_hash=request_hash,
+        locked_at=now,
+        expires_at=now + timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
+    return request
+
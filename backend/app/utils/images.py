@@ -0,0 +1,175 @@
+"""
+Responsive product images.
+
+`build_images` renders every source image to AVIF and WebP at a few widths
+ahead of time, in a process pool. Output files are named by a hash of the
+source bytes and the encoder settings, so a URL never changes meaning and
+can be cached forever. A manifest maps each source filename (the value
+stored in Product.image) to its variants; `image_manifest.image_set` turns
+that into the `src`/`srcset` block returned with products.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+IMAGE_SOURCE_DIR = os.getenv("IMAGE_SOURCE_DIR", os.path.join(_BACKEND_DIR, "..", "frontend", "public"))
+IMAGE_OUTPUT_DIR = os.getenv("IMAGE_OUTPUT_DIR", os.path.join(_BACKEND_DIR, "media", "images"))
+IMAGE_URL_PREFIX = os.getenv("IMAGE_URL_PREFIX", "/static/images")
+IMAGE_WIDTHS = tuple(sorted(int(w) for w in os.getenv("IMAGE_WIDTHS", "160,320,640,960").split(",")))
+
+# Preferred first; quality settings are part of the output hash
+FORMATS = {
+    "avif": {"quality": 50},
+    "webp": {"quality": 78, "method": 6},
+}
+MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+MANIFEST_NAME = "manifest.json"
+PIPELINE_VERSION = "1"
+
+# How often a running server checks the manifest for a rebuild
+MANIFEST_CHECK_SECONDS = 5
+
+
+def _digest(data: bytes) -> str:
+    h = hashlib.sha256(data)
+    h.update(f"{PIPELINE_VERSION}:{IMAGE_WIDTHS}:{sorted(FORMATS.items())}".encode())
+    return h.hexdigest()[:16]
+
+
+def _render(source_path: str, output_dir: str) -> dict:
+    """Render one source image to every width/format. Runs in a worker process."""
+    from PIL import Image, ImageOps, features
+
+    with open(source_path, "rb") as f:
+        digest = _digest(f.read())
+
+    with Image.open(source_path) as img:
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+        width, height = img.size
+
+        # Never upscale; a narrow source also gets a variant at its own width
+        widths = sorted({w for w in IMAGE_WIDTHS if w < width} | {min(width, IMAGE_WIDTHS[-1])})
+        variants: Dict[str, list] = {}
+        for fmt, options in FORMATS.items():
+            if not features.check(fmt):
+                continue
+            for w in widths:
+                target = os.path.join(output_dir, f"{digest}-{w}.{fmt}")
+                if not os.path.exists(target):
+                    resized = img.resize((w, round(height * w / width)), Image.LANCZOS)
+                    tmp = f"{target}.{os.getpid()}.tmp"
+                    resized.save(tmp, fmt.upper(), **options)
+                    os.replace(tmp, target)
+            variants[fmt] = widths
+
+    return {"digest": digest, "width": width, "height": height, "variants": variants}
+
+
+def _read_manifest(output_dir: str) -> Dict[str, dict]:
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def build_images(
+    source_dir: str = IMAGE_SOURCE_DIR,
+    output_dir: str = IMAGE_OUTPUT_DIR,
+    names: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
+    prune: bool = False,
+) -> dict:
+    """
+    Render source images (all of them, or just `names`) and write the manifest.
+    Existing outputs are reused, so reruns only encode new or changed images.
+    Building `names` updates their entries and keeps the rest of the manifest;
+    `prune` needs a full build, since it deletes every variant not listed.
+    """
+    if prune and names is not None:
+        raise ValueError("prune needs a full build: the manifest must list every image")
+    os.makedirs(output_dir, exist_ok=True)
+    full = names is None
+    if full:
+        names = [n for n in os.listdir(source_dir) if n.lower().endswith(SOURCE_EXTENSIONS)]
+    names = sorted({n for n in names if os.path.isfile(os.path.join(source_dir, n))})
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_render, [os.path.join(source_dir, n) for n in names], [output_dir] * len(names))
+        manifest = {} if full else _read_manifest(output_dir)
+        manifest.update(zip(names, results))
+
+    tmp = os.path.join(output_dir, f"{MANIFEST_NAME}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(output_dir, MANIFEST_NAME))
+
+    if prune:
+        live = {
+            f"{entry['digest']}-{w}.{fmt}"
+            for entry in manifest.values()
+            for fmt, widths in entry["variants"].items()
+            for w in widths
+        }
+        for filename in os.listdir(output_dir):
+            if filename != MANIFEST_NAME and filename not in live:
+                os.remove(os.path.join(output_dir, filename))
+    return manifest
+
+
+class ImageManifest:
+    """The generated manifest, reloaded when a rebuild replaces it on disk."""
+
+    def __init__(self, output_dir: str = IMAGE_OUTPUT_DIR):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self._entries: Dict[str, dict] = {}
+        self._mtime: Optional[float] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def entries(self) -> Dict[str, dict]:
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < MANIFEST_CHECK_SECONDS:
+            return self._entries
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                self._entries, self._mtime = {}, None
+                return self._entries
+            if mtime != self._mtime:
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+                self._mtime = mtime
+        return self._entries
+
+    def image_set(self, name: Optional[str]) -> Optional[dict]:
+        entry = self.entries().get(name) if name else None
+        if not entry or not entry["variants"]:
+            return None
+
+        digest = entry["digest"]
+        srcset = {
+            MEDIA_TYPES[fmt]: ", ".join(f"{IMAGE_URL_PREFIX}/{digest}-{w}.{fmt} {w}w" for w in widths)
+            for fmt, widths in entry["variants"].items()
+        }
+        fallback_fmt = "webp" if "webp" in entry["variants"] else next(iter(entry["variants"]))
+        fallback_width = entry["variants"][fallback_fmt][-1]
+        return {
+            "src": f"{IMAGE_URL_PREFIX}/{digest}-{fallback_width}.{fallback_fmt}",
+            "width": entry["width"],
+            "height": entry["height"],
+            "srcset": srcset,
+        }
+
+
+image_manifest = ImageManifest()
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import case, update
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import Order, Product, StockReservation
+from .order_status import bulk_transition
+
+logger = logging.getLogger(__name__)
+
+# How long stock stays held for an order whose payment has not completed.
+RESERVATION_TTL_MINUTES = int(os.getenv("STOCK_RESERVATION_TTL_MINUTES", "30"))
+RELEASE_BATCH_SIZE = int(os.getenv("STOCK_RELEASE_BATCH_SIZE", "500"))
+SWEEP_INTERVAL_SECONDS = int(os.getenv("STOCK_SWEEP_INTERVAL_SECONDS", "60"))
+
+
+class OutOfStockError(Exception):
+    def __init__(self, product_names: List[str]):
+        self.product_names = product_names
+        super().__init__(f"Insufficient stock for: {', '.join(product_names)}")
+
+
+def _by_product(lines: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+    totals: Dict[int, int] = defaultdict(int)
+    for product_id, quantity in lines:
+        totals[product_id] += quantity
+    return dict(totals)
+
+
+def _adjust_stock(db: Session, deltas: Dict[int, int], guarded: bool) -> int:
+    """
+    Apply stock_grams -= delta for every product in one UPDATE.
+    With `guarded`, rows without enough stock are left untouched.
+    """
+    delta = case(deltas, value=Product.id)
+    stmt = update(Product).where(Product.id.in_(list(deltas)))
+    if guarded:
+        stmt = stmt.where(Product.stock_grams >= delta)
+    stmt = stmt.values(stock_grams=Product.stock_grams - delta)
+    return db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
+
+def reserve_stock(db: Session, order: Order, lines: Iterable[Tuple[int, int]]):
+    """
+    Atomically take stock for (product_id, grams) lines and record a
+    held reservation against the order. Raises OutOfStockError without
+    touching stock if any product is short; the caller rolls back.
+
+    Run this as the last statement before commit so row locks on hot
+    products are held for as short a time as possible.
+    """
+    wanted = _by_product(lines)
+    if not wanted:
+        return
+
+    updated = _adjust_stock(db, wanted, guarded=True)
+    if updated != len(wanted):
+        short = (
+            db.query(Product.name)
+            .filter(Product.id.in_(list(wanted)))
+            .filter(Product.stock_grams < case(wanted, value=Product.id))
+            .all()
+        )
+        raise OutOfStockError([name for (name,) in short])
+
+    expires_at = datetime.utcnow() + timedelta(minutes=RESERVATION_TTL_MINUTES)
+    db.add_all([
+        StockReservation(
+            order_id=order.id,
+            product_id=product_id,
+            quantity=quantity,
+            status="held",
+            expires_at=expires_at,
+        )
+        for product_id, quantity in wanted.items()
+    ])
+
+
+def commit_reservations(db: Session, order_id: int) -> int:
+    """Mark an order's held stock as sold once payment completes."""
+    return (
+        db.query(StockReservation)
+        .filter(StockReservation.order_id == order_id, StockReservation.status == "held")
+        .update({"status": "committed"}, synchronize_session=False)
+    )
+
+
+def release_reservations(db: Session, reservations: List[StockReservation]) -> int:
+    """Return held stock to the shelf. Does not commit."""
+    held = [r for r in reservations if r.status == "held"]
+    if not held:
+        return 0
+    returned = _by_product((r.product_id, r.quantity) for r in held)
+    _adjust_stock(db, {pid: -qty for pid, qty in returned.items()}, guarded=False)
+    for reservation in held:
+        reservation.status = "released"
+    return len(held)
+
+
+def release_expired_reservations(db: Session, now: datetime = None) -> int:
+    """
+    Cancel orders still pending whose payment never completed, and release
+    their expired reservations. Orders that moved on (confirmed, shipped)
+    keep their stock whatever their payment status. Safe to run from
+    several workers at once: rows are claimed with SKIP LOCKED on Postgres
+    and writes are serialized on SQLite.
+    """
+    now = now or datetime.utcnow()
+    expired = (
+        db.query(StockReservation)
+        .join(Order, StockReservation.order_id == Order.id)
+        .filter(
+            StockReservation.status == "held",
+            StockReservation.expires_at < now,
+            Order.status == "pending",
+            Order.payment_status != "completed",
+        )
+        .order_by(StockReservation.id)
+        .limit(RELEASE_BATCH_SIZE)
+        .with_for_update(skip_locked=True, of=StockReservation)
+        .all()
+    )
+    if not expired:
+        return 0
+
+    # Guarded again, since an order may have been paid or confirmed since the claim
+    cancelled, _ = bulk_transition(
+        db, {r.order_id for r in expired}, "cancelled", source="reservation_expiry",
+        note="Payment not completed in time", values={"payment_status": "failed"},
+        where=(Order.status == "pending", Order.payment_status != "completed"),
+    )
+    cancelled = set(cancelled)
+    released = release_reservations(db, [r for r in expired if r.order_id in cancelled])
+    db.commit()
+    return released
+
+
+def _sweep_once() -> int:
+    with SessionLocal() as db:
+        released = 0
+        while True:
+            batch = release_expired_reservations(db)
+            released += batch
+            if batch < RELEASE_BATCH_SIZE:
+                return released
+
+
+async def run_reservation_sweeper():
+    """Background loop releasing expired reservations."""
+    while True:
+        try:
+            released = await asyncio.to_thread(_sweep_once)
+            if released:
+                logger.info("Released expired stock reservations", extra={"released": released})
+        except Exception as e:
+            logger.exception("Reservation sweep failed")
+        await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
@@ -0,0 +1,161 @@
+"""
+Schema changes for databases created by an older release.
+
+create_all (run at startup) creates missing tables but never alters an
+existing one. Each step here checks whether it is needed and, if so,
+makes its change in its own transaction. Run them once per deploy from a
+single process (`python -m app.seed.migrate`), not from every worker;
+workers only log the steps still pending.
+"""
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from ..core.tenancy import DEFAULT_TENANT_ID, TenantScoped
+from ..models import Address, CartItem, LeadActivity, User
+from .pricing import DEFAULT_SIZE, SIZE_GRAMS, gst_breakdown, to_paise
+
+# name -> step(conn, apply); a step returns whether it is (or was) needed
+Step = Callable[[Connection, bool], bool]
+STEPS: List[Tuple[str, Step]] = []
+
+
+def step(name: str):
+    def register(fn: Step) -> Step:
+        STEPS.append((name, fn))
+        return fn
+    return register
+
+
+def _columns(conn: Connection, table: str) -> set:
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+
+def _indexes(conn: Connection, table: str) -> set:
+    return {index["name"] for index in inspect(conn).get_indexes(table)}
+
+
+@step("products.stock_grams")
+def _stock_grams(conn: Connection, apply: bool) -> bool:
+    # Stock used to be a count of packs of any size; take them as default-size packs
+    if "stock_grams" in _columns(conn, "products"):
+        return False
+    if apply:
+        grams = SIZE_GRAMS[DEFAULT_SIZE]
+        conn.execute(text("ALTER TABLE products ADD COLUMN stock_grams INTEGER"))
+        conn.execute(text("UPDATE products SET stock_grams = COALESCE(stock_quantity, 0) * :grams"), {"grams": grams})
+        if inspect(conn).has_table("stock_reservations"):
+            conn.execute(text("UPDATE stock_reservations SET quantity = quantity * :grams"), {"grams": grams})
+    return True
+
+
+@step("addresses.uq_addresses_user_default")
+def _one_default_address(conn: Connection, apply: bool) -> bool:
+    if not inspect(conn).has_table("addresses") or "uq_addresses_user_default" in _indexes(conn, "addresses"):
+        return False
+    if apply:
+        # Users with several defaults keep the newest, or the index cannot be built
+        conn.execute(text(
+            "UPDATE addresses SET is_default = :no WHERE is_default AND id NOT IN "
+            "(SELECT MAX(id) FROM addresses WHERE is_default GROUP BY user_id)"
+        ), {"no": False})
+        index = next(i for i in Address.__table__.indexes if i.name == "uq_addresses_user_default")
+        index.create(conn)
+    return True
+
+
+@step("orders.shipping_paise")
+def _order_shipping(conn: Connection, apply: bool) -> bool:
+    if not inspect(conn).has_table("orders") or "shipping_paise" in _columns(conn, "orders"):
+        return False
+    if apply:
+        conn.execute(text("ALTER TABLE orders ADD COLUMN shipping_paise INTEGER NOT NULL DEFAULT 0"))
+        # Earlier orders stored only the total: shipping is what it adds to items and GST
+        totals, subtotals = {}, {}
+        for order_id, total, price, quantity in conn.execute(text(
+            "SELECT o.id, o.total_amount, i.price, i.quantity FROM orders o JOIN order_items i ON i.order_id = o.id"
+        )):
+            totals[order_id] = to_paise(total)
+            subtotals[order_id] = subtotals.get(order_id, 0) + to_paise(price) * quantity
+        charged = []
+        for order_id, subtotal in subtotals.items():
+            shipping = totals[order_id] - subtotal - sum(gst_breakdown(subtotal))
+            if shipping > 0:
+                charged.append({"id": order_id, "shipping": shipping})
+        if charged:
+            conn.execute(text("UPDATE orders SET shipping_paise = :shipping WHERE id = :id"), charged)
+    return True
+
+
+def _index_step(model, name: str):
+    """Register a step creating the model's index `name` on a table that predates it."""
+    table = model.__table__
+
+    @step(f"{table.name}.{name}")
+    def _create_index(conn: Connection, apply: bool) -> bool:
+        if not inspect(conn).has_table(table.name) or name in _indexes(conn, table.name):
+            return False
+        if apply:
+            next(i for i in table.indexes if i.name == name).create(conn)
+        return True
+    return _create_index
+
+
+# Used by the retention claims (app.utils.retention)
+_index_step(CartItem, "ix_cart_items_user_id_created_at")
+_index_step(User, "ix_users_reset_expiry")
+_index_step(LeadActivity, "ix_lead_activities_at")
+
+
+def _tenant_step(model):
+    """Register a step giving a table from before tenants its tenant_id, handing its rows to the default tenant."""
+    table = model.__table__
+
+    @step(f"{table.name}.tenant_id")
+    def _tenant_id(conn: Connection, apply: bool) -> bool:
+        if not inspect(conn).has_table(table.name) or "tenant_id" in _columns(conn, table.name):
+            return False
+        if apply:
+            # The default tenant exists by now: app.seed.migrate creates it first
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN tenant_id INTEGER REFERENCES tenants (id)"))
+            conn.execute(text(f"UPDATE {table.name} SET tenant_id = :id"), {"id": DEFAULT_TENANT_ID})
+            if conn.dialect.name == "postgresql":
+                # SQLite cannot add NOT NULL after the fact; every insert sets it anyway
+                conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN tenant_id SET NOT NULL"))
+            conn.execute(text(f"CREATE INDEX ix_{table.name}_tenant_id ON {table.name} (tenant_id)"))
+        return True
+    return _tenant_id
+
+
+for _model in TenantScoped.__subclasses__():
+    _tenant_step(_model)
+
+
+@step("users.uq_users_tenant_email")
+def _email_per_tenant(conn: Connection, apply: bool) -> bool:
+    # Emails were unique store-wide; now per tenant
+    if not inspect(conn).has_table("users"):
+        return False
+    email_index = next((i for i in inspect(conn).get_indexes("users") if i["name"] == "ix_users_email"), None)
+    if email_index is None or not email_index["unique"]:
+        return False
+    if apply:
+        conn.execute(text("DROP INDEX ix_users_email"))
+        conn.execute(text("CREATE INDEX ix_users_email ON users (email)"))
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_users_tenant_email ON users (tenant_id, email)"))
+    return True
+
+
+def migrate(bind, apply: bool = True) -> List[str]:
+    """Names of the steps that were needed (and, with `apply`, have been applied)."""
+    needed = []
+    for name, fn in STEPS:
+        with bind.begin() if apply else bind.connect() as conn:
+            if fn(conn, apply):
+                needed.append(name)
+    return needed
+
+
+def pending_migrations(bind) -> List[str]:
+    return migrate(bind, apply=False)
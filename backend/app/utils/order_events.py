@@ -0,0 +1,157 @@
+"""
+In-process fanout of committed order events to live trackers.
+
+Sessions that write order events publish them to `order_hub` right after
+commit (see app.utils.order_status). Events committed by other worker
+processes are picked up by `run_order_event_relay`, one query per
+interval per worker, and only while someone is subscribed, so the cost
+does not grow with the number of open streams.
+"""
+import asyncio
+import logging
+import os
+import threading
+from collections import defaultdict, deque
+from typing import Deque, Dict, Iterable, Optional, Set, Tuple
+
+from ..database import SessionLocal
+from ..models import OrderEvent
+from .serializers import order_event_to_dict
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 64
+ORDER_EVENT_RELAY_SECONDS = float(os.getenv("ORDER_EVENT_RELAY_SECONDS", "2"))
+# Ids are allocated before commit, so a late commit can land below the cursor
+RELAY_LOOKBACK_IDS = 200
+RECENT_IDS = 10_000
+
+
+class Subscription:
+    def __init__(self, order_id: int, loop: asyncio.AbstractEventLoop):
+        self.order_id = order_id
+        self.loop = loop
+        # None is queued when the subscriber fell behind; the stream then
+        # closes and the client resumes from its Last-Event-ID
+        self.queue: "asyncio.Queue[Optional[dict]]" = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def _put(self, event: dict):
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= SUBSCRIBER_QUEUE_SIZE - 1:
+            self.overflowed = True
+            self.queue.put_nowait(None)
+        else:
+            self.queue.put_nowait(event)
+
+
+class OrderEventHub:
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._recent: Deque[int] = deque()
+        self._recent_set: Set[int] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, order_id: int) -> Subscription:
+        subscription = Subscription(order_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[order_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.order_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.order_id]
+
+    def publish(self, events: Iterable[dict]):
+        """Fan events out to subscribers of their orders. Thread-safe; drops repeats."""
+        with self._lock:
+            fresh, deliveries = False, []
+            for event in events:
+                if event["id"] in self._recent_set:
+                    continue
+                fresh = True
+                self._recent.append(event["id"])
+                self._recent_set.add(event["id"])
+                if len(self._recent) > RECENT_IDS:
+                    self._recent_set.discard(self._recent.popleft())
+                for subscription in self._subscribers.get(event["order_id"], ()):
+                    deliveries.append((subscription, event))
+        for subscription, event in deliveries:
+            subscription.loop.call_soon_threadsafe(subscription._put, event)
+        if fresh:
+            order_feed.notify()
+
+
+class FeedNotifier:
+    """
+    Wakes change-feed requests in this process when order events commit.
+    Waiters also re-check on a short timeout, which picks up events
+    committed by other worker processes.
+    """
+
+    def __init__(self):
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._lock = threading.Lock()
+
+    def notify(self):
+        with self._lock:
+            waiters = list(self._waiters)
+        for loop, ready in waiters:
+            loop.call_soon_threadsafe(ready.set)
+
+    async def wait(self, timeout: float):
+        ready = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), ready)
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+order_hub = OrderEventHub()
+order_feed = FeedNotifier()
+
+
+def _relay_once(cursor: Optional[int]) -> int:
+    with SessionLocal() as db:
+        if cursor is None:
+            cursor = (db.query(OrderEvent.id).order_by(OrderEvent.id.desc()).limit(1).scalar() or 0)
+        rows = (
+            db.query(OrderEvent)
+            .filter(OrderEvent.id > cursor - RELAY_LOOKBACK_IDS)
+            .order_by(OrderEvent.id)
+            .all()
+        )
+        events = [order_event_to_dict(row) for row in rows]
+    if events:
+        order_hub.publish(events)
+        cursor = max(cursor, events[-1]["id"])
+    return cursor
+
+
+async def run_order_event_relay():
+    """Background loop relaying other workers' order events to local subscribers."""
+    cursor = None
+    while True:
+        await asyncio.sleep(ORDER_EVENT_RELAY_SECONDS)
+        if not order_hub.active:
+            cursor = None
+            continue
+        try:
+            cursor = await asyncio.to_thread(_relay_once, cursor)
+        except Exception as e:
+            logger.exception("Order event relay failed")
@@ -0,0 +1,143 @@
+"""
+Order status state machine.
+
+Every status change goes through `transition` (one loaded order) or
+`bulk_transition` (many ids, set-based) so that it is validated against
+TRANSITIONS and recorded in the append-only order_events table. Neither
+commits; once the session commits, its events are published to live
+trackers and change-feed waiters.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import Session
+
+from ..models import Order, OrderEvent
+from .order_events import order_hub
+from .serializers import order_event_to_dict
+
+ORDER_STATUSES = ("pending", "confirmed", "shipped", "delivered", "cancelled")
+
+TRANSITIONS: Dict[str, Set[str]] = {
+    "pending": {"confirmed", "cancelled"},
+    "confirmed": {"shipped", "cancelled"},
+    "shipped": {"delivered"},
+    "delivered": set(),
+    "cancelled": set(),
+}
+
+# Rows per UPDATE ... WHERE id IN (...), under every backend's bind-parameter limit
+BULK_CHUNK_SIZE = 1000
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def sources_for(to_status: str) -> Set[str]:
+    """Statuses an order may move to `to_status` from."""
+    if to_status not in TRANSITIONS:
+        raise InvalidTransition(f"Unknown order status: {to_status}")
+    return {src for src, targets in TRANSITIONS.items() if to_status in targets}
+
+
+def record_created(db: Session, order: Order, source: str = "checkout"):
+    """Log the initial status of a newly flushed order."""
+    db.add(OrderEvent(order_id=order.id, user_id=order.user_id, from_status=None,
+                      to_status=order.status, payment_status=order.payment_status, source=source))
+
+
+def transition(db: Session, order: Order, to_status: str, source: str, note: Optional[str] = None):
+    """Move one loaded (ideally row-locked) order, raising InvalidTransition if not allowed."""
+    if order.status not in sources_for(to_status):
+        raise InvalidTransition(f"Order {order.id} cannot go from {order.status} to {to_status}")
+    db.add(OrderEvent(order_id=order.id, user_id=order.user_id, from_status=order.status,
+                      to_status=to_status, payment_status=order.payment_status, source=source, note=note))
+    order.status = to_status
+
+
+def bulk_transition(
+    db: Session,
+    order_ids: Iterable[int],
+    to_status: str,
+    source: str,
+    note: Optional[str] = None,
+    values: Optional[dict] = None,
+    where: Tuple = (),
+) -> Tuple[List[int], Dict[int, str]]:
+    """
+    Move many orders to `to_status` with one UPDATE ... RETURNING per
+    source status (and chunk), plus one multi-row INSERT of events.
+    `values` sets extra columns; `where` adds extra guards. Orders that
+    cannot move, or changed concurrently, are skipped with a reason.
+    Returns (moved_ids, {skipped_id: reason}).
+    """
+    allowed = sources_for(to_status)
+    ids = list(dict.fromkeys(order_ids))
+    skipped: Dict[int, str] = {}
+    by_source: Dict[str, List[int]] = defaultdict(list)
+
+    for start in range(0, len(ids), BULK_CHUNK_SIZE):
+        chunk = ids[start:start + BULK_CHUNK_SIZE]
+        current = dict(db.query(Order.id, Order.status).filter(Order.id.in_(chunk)).all())
+        for order_id in chunk:
+            status = current.get(order_id)
+            if status is None:
+                skipped[order_id] = "not found"
+            elif status not in allowed:
+                skipped[order_id] = f"cannot go from {status} to {to_status}"
+            else:
+                by_source[status].append(order_id)
+
+    moved: List[int] = []
+    events: List[dict] = []
+    for from_status, source_ids in by_source.items():
+        for start in range(0, len(source_ids), BULK_CHUNK_SIZE):
+            chunk = source_ids[start:start + BULK_CHUNK_SIZE]
+            # The status guard makes the move atomic per row even without row locks
+            rows = db.execute(
+                update(Order)
+                .where(Order.id.in_(chunk), Order.status == from_status, *where)
+                .values(status=to_status, **(values or {}))
+                .returning(Order.id, Order.user_id, Order.payment_status)
+                .execution_options(synchronize_session=False)
+            ).all()
+            for order_id, user_id, payment_status in rows:
+                moved.append(order_id)
+                events.append({"order_id": order_id, "user_id": user_id, "from_status": from_status,
+                               "to_status": to_status, "payment_status": payment_status,
+                               "source": source, "note": note})
+            returned = {row[0] for row in rows}
+            for order_id in chunk:
+                if order_id not in returned:
+                    skipped[order_id] = "changed concurrently"
+
+    if events:
+        inserted = db.execute(
+            insert(OrderEvent).returning(OrderEvent.id, OrderEvent.created_at, sort_by_parameter_order=True),
+            events,
+        ).all()
+        for payload, (event_id, created_at) in zip(events, inserted):
+            payload.update(id=event_id, created_at=created_at)
+        db.info.setdefault("order_events", []).extend(events)
+    return moved, skipped
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_order_events(session, flush_context):
+    flushed = [order_event_to_dict(obj) for obj in session.new if isinstance(obj, OrderEvent)]
+    if flushed:
+        session.info.setdefault("order_events", []).extend(flushed)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_order_events(session):
+    events = session.info.pop("order_events", None)
+    if events:
+        order_hub.publish(sorted(events, key=lambda e: e["id"]))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_order_events(session):
+    session.info.pop("order_events", None)
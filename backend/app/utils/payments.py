@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy.orm import Session
+
+from ..core.tenancy import all_tenants
+from ..database import SessionLocal
+from ..models import Order, StockReservation
+from .inventory import commit_reservations, release_reservations
+from .order_status import transition
+
+logger = logging.getLogger(__name__)
+
+# Unset disables payments. "fake" runs the local stand-in gateway in-process
+# (see fake_gateway.py), which approves everything: local development only.
+PAYMENT_GATEWAY_URL = os.getenv("PAYMENT_GATEWAY_URL", "")
+PAYMENT_MERCHANT_ID = os.getenv("PAYMENT_MERCHANT_ID", "NUTRIEVE")
+PAYMENT_WEBHOOK_SECRET = os.getenv("PAYMENT_WEBHOOK_SECRET", "")
+PAYMENT_TIMEOUT_SECONDS = float(os.getenv("PAYMENT_TIMEOUT_SECONDS", "10"))
+
+RECONCILE_INTERVAL_SECONDS = int(os.getenv("PAYMENT_RECONCILE_INTERVAL_SECONDS", "30"))
+RECONCILE_BATCH_SIZE = int(os.getenv("PAYMENT_RECONCILE_BATCH_SIZE", "200"))
+RECONCILE_CONCURRENCY = int(os.getenv("PAYMENT_RECONCILE_CONCURRENCY", "10"))
+RECONCILE_MAX_BACKOFF_SECONDS = int(os.getenv("PAYMENT_RECONCILE_MAX_BACKOFF_SECONDS", "900"))
+
+# Gateway response codes -> Order.payment_status
+GATEWAY_STATUS = {
+    "PAYMENT_SUCCESS": "completed",
+    "PAYMENT_PENDING": "pending",
+    "PAYMENT_ERROR": "failed",
+    "PAYMENT_DECLINED": "failed",
+    "TIMED_OUT": "failed",
+}
+
+
+class PaymentGatewayError(Exception):
+    pass
+
+
+class PaymentGatewayNotConfigured(PaymentGatewayError):
+    pass
+
+
+def gateway_client() -> httpx.AsyncClient:
+    if not PAYMENT_GATEWAY_URL:
+        raise PaymentGatewayNotConfigured("Payments are not available")
+    if PAYMENT_GATEWAY_URL == "fake":
+        from .fake_gateway import app as fake_app
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=fake_app),
+            base_url="http://fake-gateway",
+            timeout=PAYMENT_TIMEOUT_SECONDS,
+        )
+    return httpx.AsyncClient(base_url=PAYMENT_GATEWAY_URL, timeout=PAYMENT_TIMEOUT_SECONDS)
+
+
+async def initiate_payment(order_id: int, amount_paise: int, phone: str) -> Tuple[str, str]:
+    """Start a payment with the gateway; returns (payment_url, transaction_id)."""
+    transaction_id = f"NUT{order_id}-{uuid.uuid4().hex[:12]}"
+    payload = {
+        "merchantId": PAYMENT_MERCHANT_ID,
+        "merchantTransactionId": transaction_id,
+        "amount": amount_paise,
+        "mobileNumber": phone,
+    }
+    try:
+        async with gateway_client() as client:
+            response = await client.post("/pg/v1/pay", json=payload)
+            response.raise_for_status()
+            data = response.json()["data"]
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        raise PaymentGatewayError(f"Payment initiation failed: {e}")
+
+    return data["instrumentResponse"]["redirectInfo"]["url"], transaction_id
+
+
+async def fetch_payment_status(client: httpx.AsyncClient, transaction_id: str) -> str:
+    response = await client.get(f"/pg/v1/status/{PAYMENT_MERCHANT_ID}/{transaction_id}")
+    response.raise_for_status()
+    return GATEWAY_STATUS.get(response.json().get("code"), "pending")
+
+
+def verify_webhook_signature(body: bytes, signature: Optional[str]) -> bool:
+    if not PAYMENT_WEBHOOK_SECRET or not signature:
+        return False
+    expected = hmac.new(PAYMENT_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def apply_payment_status(db: Session, transaction_id: str, payment_status: str) -> bool:
+    """
+    Settle an order awaiting payment from a gateway result. Only orders whose
+    payment is pending change, so webhook and reconciler can both report the
+    same payment safely. A pending order is confirmed or cancelled; one that
+    already moved on (e.g. confirmed or cancelled by an admin) keeps its
+    status. Stock held for a cancelled order goes back on the shelf and a
+    paid, live order's stock is sold. Unscoped: the transaction
+    id identifies the order whatever storefront the webhook arrived on.
+    Does not commit.
+    """
+    if payment_status not in ("completed", "failed"):
+        return False
+
+    with all_tenants():
+        order = db.query(Order).filter(
+            Order.payment_id == transaction_id,
+            Order.payment_status == "pending",
+        ).with_for_update().first()
+        if not order:
+            return False
+
+        order.payment_status = payment_status
+        if order.status == "pending":
+            if payment_status == "completed":
+                transition(db, order, "confirmed", source="payment")
+            else:
+                transition(db, order, "cancelled", source="payment", note="Payment failed")
+
+        if order.status == "cancelled":
+            if payment_status == "completed":
+                logger.warning("Payment completed for a cancelled order", extra={"order_id": order.id})
+            release_reservations(db, db.query(StockReservation).filter(
+                StockReservation.order_id == order.id
+            ).all())
+        elif payment_status == "completed":
+            commit_reservations(db, order.id)
+    return True
+
+
+# order_id -> (attempts, next check time); kept per worker
+_backoff: Dict[int, Tuple[int, float]] = {}
+
+
+def _due_payments() -> List[Tuple[int, str]]:
+    with SessionLocal() as db:
+        rows = (
+            db.query(Order.id, Order.payment_id)
+            .filter(Order.payment_status == "pending", Order.payment_id.isnot(None))
+            .order_by(Order.id)
+            .all()
+        )
+    now = time.monotonic()
+    pending_ids = {order_id for order_id, _ in rows}
+    for order_id in list(_backoff):
+        if order_id not in pending_ids:
+            del _backoff[order_id]
+    return [(oid, txn) for oid, txn in rows if _backoff.get(oid, (0, 0.0))[1] <= now]
+
+
+def _apply_results(results: List[Tuple[int, str, str]]) -> int:
+    # One transaction per payment, so one that fails does not hold back the batch
+    settled = 0
+    with SessionLocal() as db:
+        for order_id, transaction_id, payment_status in results:
+            try:
+                if apply_payment_status(db, transaction_id, payment_status):
+                    db.commit()
+                    settled += 1
+                else:
+                    db.rollback()
+            except Exception:
+                db.rollback()
+                logger.exception("Could not settle payment", extra={"order_id": order_id})
+    return settled
+
+
+async def reconcile_pending_payments() -> int:
+    """Poll the gateway for every due pending payment; returns orders settled."""
+    settled = 0
+    semaphore = asyncio.Semaphore(RECONCILE_CONCURRENCY)
+
+    async def check(client, order_id, transaction_id):
+        async with semaphore:
+            try:
+                return order_id, transaction_id, await fetch_payment_status(client, transaction_id)
+            except httpx.HTTPError:
+                return order_id, transaction_id, None
+
+    due = await asyncio.to_thread(_due_payments)
+    async with gateway_client() as client:
+        for start in range(0, len(due), RECONCILE_BATCH_SIZE):
+            batch = due[start:start + RECONCILE_BATCH_SIZE]
+            results = await asyncio.gather(*(check(client, oid, txn) for oid, txn in batch))
+
+            now = time.monotonic()
+            for order_id, _, payment_status in results:
+                if payment_status in (None, "pending"):
+                    attempts = _backoff.get(order_id, (0, 0.0))[0] + 1
+                    delay = min(RECONCILE_INTERVAL_SECONDS * 2 ** attempts, RECONCILE_MAX_BACKOFF_SECONDS)
+                    _backoff[order_id] = (attempts, now + delay)
+            settled += await asyncio.to_thread(
+                _apply_results, [r for r in results if r[2] in ("completed", "failed")]
+            )
+    return settled
+
+
+async def run_payment_reconciler():
+    """Background loop settling payments the webhook never reported."""
+    while True:
+        await asyncio.sleep(RECONCILE_INTERVAL_SECONDS)
+        try:
+            settled = await reconcile_pending_payments()
+            if settled:
+                logger.info("Reconciled payments", extra={"settled": settled})
+        except Exception as e:
+            logger.exception("Payment reconciliation failed")
@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..cache import get_cache
+from ..models import Product, ProductVariant
+
+# Bounds staleness of the price index when the cache backend is per process
+# and prices were changed elsewhere (another worker, a CLI)
+PRICE_INDEX_TTL_SECONDS = int(os.getenv("PRICE_INDEX_TTL_SECONDS", "60"))
+
+# Pack sizes we sell, in grams. Product.base_price is the price per kg.
+SIZE_GRAMS: Dict[str, int] = {
+    "200gm": 200,
+    "500gm": 500,
+    "1kg": 1000,
+    "2kg": 2000,
+    "10kg": 10000,
+}
+DEFAULT_SIZE = "200gm"
+
+# GST on food powders, split evenly between centre and state (per mille).
+CGST_PER_MILLE = 25
+SGST_PER_MILLE = 25
+
+
+def to_paise(amount) -> int:
+    """Convert a rupee amount to integer paise (half-up)."""
+    return int((Decimal(str(amount or 0)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def to_rupees(paise: int) -> float:
+    return paise / 100
+
+
+def variant_price_paise(base_price, size: str) -> int:
+    """Unit price of a pack of `size`, given the per-kg base price."""
+    grams = SIZE_GRAMS[size]
+    return (to_paise(base_price) * grams + 500) // 1000
+
+
+def gst_breakdown(subtotal_paise: int) -> Tuple[int, int]:
+    """(cgst, sgst) in paise for a subtotal in paise."""
+    cgst = (subtotal_paise * CGST_PER_MILLE + 500) // 1000
+    sgst = (subtotal_paise * SGST_PER_MILLE + 500) // 1000
+    return cgst, sgst
+
+
+def sync_product_variants(db: Session, products: Iterable[Product]) -> int:
+    """
+    Upsert the product_variants rows for the given products.
+    Does not commit; callers commit together with their own changes and
+    then call `price_index.invalidate()`.
+    """
+    products = [p for p in products if p.id is not None]
+    if not products:
+        return 0
+
+    existing = {
+        (v.product_id, v.size): v
+        for v in db.query(ProductVariant).filter(
+            ProductVariant.product_id.in_([p.id for p in products])
+        )
+    }
+
+    changed = 0
+    for product in products:
+        for size in SIZE_GRAMS:
+            price = variant_price_paise(product.base_price, size)
+            variant = existing.get((product.id, size))
+            if variant is None:
+                db.add(ProductVariant(product_id=product.id, size=size, price_paise=price))
+                changed += 1
+            elif variant.price_paise != price:
+                variant.price_paise = price
+                changed += 1
+
+    return changed
+
+
+class PriceIndex:
+    """
+    In-memory (product_id, size) -> price_paise map over product_variants.
+
+    Loaded copies are tagged with the version of the "prices" cache
+    namespace, which `invalidate()` bumps in every worker sharing the cache
+    backend; a copy older than PRICE_INDEX_TTL_SECONDS is reloaded too.
+    The version is read once per session, since on a shared backend each
+    read is a round trip.
+    """
+
+    def __init__(self, ttl: float = PRICE_INDEX_TTL_SECONDS):
+        self.ttl = ttl
+        self._prices: Dict[Tuple[int, str], int] = {}
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._versions = get_cache("prices")
+
+    def invalidate(self):
+        """Call after committing price changes."""
+        with self._lock:
+            self._version = None
+        self._versions.invalidate()
+
+    def _fresh(self, db: Session) -> bool:
+        if self._version is None or time.monotonic() - self._loaded_at >= self.ttl:
+            return False
+        version = db.info.get("price_version")
+        if version is None:
+            version = db.info["price_version"] = self._versions.version()
+        return self._version == version
+
+    def load(self, db: Session):
+        # Version first: an invalidation during the load leaves this copy stale
+        version = db.info["price_version"] = self._versions.version()
+        rows = db.query(
+            ProductVariant.product_id, ProductVariant.size, ProductVariant.price_paise
+        ).all()
+        with self._lock:
+            self._prices = {(pid, size): price for pid, size, price in rows}
+            self._version, self._loaded_at = version, time.monotonic()
+
+    def version(self, db: Session) -> int:
+        """Version of the prices in use, reloading them first if stale."""
+        if not self._fresh(db):
+            self.load(db)
+        return self._version
+
+    def price(self, db: Session, product_id: int, size: str) -> Optional[int]:
+        """Unit price in paise, or None if the product does not exist."""
+        if size not in SIZE_GRAMS:
+            raise ValueError(f"Invalid size: {size}")
+
+        self.version(db)
+
+        price = self._prices.get((product_id, size))
+        if price is not None:
+            return price
+
+        # Product added without variants (e.g. inserted by hand); backfill it.
+        product = db.query(Product).filter(Product.id == product_id).first()
+        if not product:
+            return None
+        if db.info.get("read_only"):
+            return variant_price_paise(product.base_price, size)
+        sync_product_variants(db, [product])
+        db.flush()
+        self.load(db)
+        return self._prices.get((product_id, size))
+
+
+price_index = PriceIndex()
@@ -0,0 +1,253 @@
+"""
+Data retention for rows that would otherwise live forever in hot tables.
+
+Each policy claims a small batch of rows past its cutoff, deletes,
+clears or archives them, and commits before claiming the next batch,
+so locks are held for one short transaction at a time. Between
+batches the job sleeps RETENTION_BATCH_PAUSE_SECONDS, which leaves room
+for request traffic (and, on SQLite, for other writers). A run stops
+after RETENTION_MAX_BATCHES per policy and picks up the rest next time.
+
+Nothing runs on a timer inside the app, where every worker would run
+the same batches. Schedule `python -m app.seed.apply_retention` (e.g.
+hourly from cron) on one host instead; admins can also trigger a run
+from POST /api/admin/retention/run.
+
+Policies (days are configurable, 0 disables a policy):
+- abandoned_carts: carts whose newest item is older than
+  RETENTION_CART_DAYS are emptied;
+- reset_codes: password-reset OTPs that expired more than
+  RETENTION_RESET_CODE_DAYS ago are cleared from users;
+- lead_activities: activities older than RETENTION_LEAD_ACTIVITY_DAYS
+  move to lead_activities_archive;
+- idempotency_keys: keys past their expiry are deleted.
+"""
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import CartItem, IdempotencyKey, LeadActivity, LeadActivityArchive, User
+from .cart_snapshot import invalidate_cart_snapshot
+
+logger = logging.getLogger(__name__)
+
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+RETENTION_BATCH_PAUSE_SECONDS = float(os.getenv("RETENTION_BATCH_PAUSE_SECONDS", "0.1"))
+RETENTION_MAX_BATCHES = int(os.getenv("RETENTION_MAX_BATCHES", "200"))
+
+RETENTION_CART_DAYS = int(os.getenv("RETENTION_CART_DAYS", "30"))
+RETENTION_RESET_CODE_DAYS = int(os.getenv("RETENTION_RESET_CODE_DAYS", "1"))
+RETENTION_LEAD_ACTIVITY_DAYS = int(os.getenv("RETENTION_LEAD_ACTIVITY_DAYS", "365"))
+
+
+class RetentionPolicy(ABC):
+    """
+    One kind of expiring row. `claim` returns the keys of up to `limit`
+    rows past `cutoff`, ordered and greater than `after`; `apply` acts on
+    those still past it (a row may have been renewed since the claim)
+    inside the caller's transaction and returns the rows touched.
+    """
+
+    name = ""
+    action = "delete"
+
+    def __init__(self, days: Optional[int]):
+        self.days = days  # None: expiry is stored on the row itself
+
+    @property
+    def enabled(self) -> bool:
+        return self.days is None or self.days > 0
+
+    def cutoff(self, now: datetime) -> datetime:
+        return now - timedelta(days=self.days or 0)
+
+    @abstractmethod
+    def claim(self, db: Session, cutoff: datetime, after, limit: int) -> list:
+        ...
+
+    @abstractmethod
+    def apply(self, db: Session, keys: list, cutoff: datetime) -> int:
+        ...
+
+    @abstractmethod
+    def count(self, db: Session, cutoff: datetime) -> int:
+        ...
+
+
+class AbandonedCarts(RetentionPolicy):
+    name = "abandoned_carts"
+
+    def _abandoned(self, cutoff: datetime):
+        return (
+            select(CartItem.user_id)
+            .group_by(CartItem.user_id)
+            .having(func.max(CartItem.created_at) < cutoff)
+        )
+
+    def claim(self, db, cutoff, after, limit):
+        # Keyset over users, so each batch starts where the last one ended
+        query = self._abandoned(cutoff).order_by(CartItem.user_id).limit(limit)
+        if after is not None:
+            query = query.where(CartItem.user_id > after)
+        return db.execute(query).scalars().all()
+
+    def apply(self, db, keys, cutoff):
+        deleted = db.execute(
+            delete(CartItem).where(CartItem.user_id.in_(keys), CartItem.user_id.in_(self._abandoned(cutoff)))
+        ).rowcount
+        for user_id in keys:
+            invalidate_cart_snapshot(user_id)
+        return deleted
+
+    def count(self, db, cutoff):
+        return db.execute(
+            select(func.count()).select_from(CartItem).where(CartItem.user_id.in_(self._abandoned(cutoff)))
+        ).scalar()
+
+
+class _ById(RetentionPolicy):
+    """Policies whose rows stop matching once handled, so no cursor is needed."""
+
+    model = None
+
+    @abstractmethod
+    def expired(self, cutoff: datetime):
+        ...
+
+    def claim(self, db, cutoff, after, limit):
+        query = (
+            select(self.model.id)
+            .where(self.expired(cutoff))
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return db.execute(query).scalars().all()
+
+    def count(self, db, cutoff):
+        return db.execute(select(func.count()).select_from(self.model).where(self.expired(cutoff))).scalar()
+
+
+class ResetCodes(_ById):
+    name = "reset_codes"
+    action = "clear"
+    model = User
+
+    def expired(self, cutoff):
+        return User.reset_expiry < cutoff
+
+    def apply(self, db, keys, cutoff):
+        return db.execute(
+            update(User).where(User.id.in_(keys), self.expired(cutoff)).values(reset_code=None, reset_expiry=None)
+        ).rowcount
+
+
+class LeadActivities(_ById):
+    name = "lead_activities"
+    action = "archive"
+    model = LeadActivity
+
+    def expired(self, cutoff):
+        return LeadActivity.at < cutoff
+
+    def apply(self, db, keys, cutoff):
+        columns = ["id", "lead_id", "actor_id", "kind", "body", "at", "meta"]
+        db.execute(
+            insert(LeadActivityArchive).from_select(
+                columns,
+                select(*(getattr(LeadActivity, c) for c in columns)).where(LeadActivity.id.in_(keys)),
+            )
+        )
+        return db.execute(delete(LeadActivity).where(LeadActivity.id.in_(keys))).rowcount
+
+
+class IdempotencyKeys(_ById):
+    name = "idempotency_keys"
+    model = IdempotencyKey
+
+    def expired(self, cutoff):
+        return IdempotencyKey.expires_at < cutoff
+
+    def apply(self, db, keys, cutoff):
+        return db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(keys), self.expired(cutoff))).rowcount
+
+
+POLICIES: Dict[str, RetentionPolicy] = {
+    policy.name: policy
+    for policy in (
+        AbandonedCarts(RETENTION_CART_DAYS),
+        ResetCodes(RETENTION_RESET_CODE_DAYS),
+        LeadActivities(RETENTION_LEAD_ACTIVITY_DAYS),
+        IdempotencyKeys(None),
+    )
+}
+
+# Result of the most recent run in this process, for the admin stats endpoint
+last_run: dict = {}
+
+
+def apply_policy(db: Session, policy: RetentionPolicy, now: datetime = None, dry_run: bool = False,
+                 batch_size: int = None, max_batches: int = None, pause: float = None) -> dict:
+    """Run one policy to completion (or max_batches). Returns its report."""
+    now = now or datetime.utcnow()
+    cutoff = policy.cutoff(now)
+    report = {"action": policy.action, "cutoff": cutoff.isoformat(), "rows": 0, "batches": 0}
+    if dry_run:
+        report["rows"] = policy.count(db, cutoff)
+        db.rollback()
+        return report
+
+    batch_size = batch_size or RETENTION_BATCH_SIZE
+    max_batches = RETENTION_MAX_BATCHES if max_batches is None else max_batches
+    pause = RETENTION_BATCH_PAUSE_SECONDS if pause is None else pause
+    started = time.perf_counter()
+    after = None
+    while report["batches"] < max_batches:
+        keys = policy.claim(db, cutoff, after, batch_size)
+        if not keys:
+            db.rollback()
+            break
+        report["rows"] += policy.apply(db, keys, cutoff)
+        db.commit()
+        report["batches"] += 1
+        after = keys[-1]
+        if len(keys) < batch_size:
+            break
+        time.sleep(pause)
+    else:
+        report["more"] = True  # stopped at max_batches; the next run continues
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def run_retention(names: Sequence[str] = None, dry_run: bool = False, now: datetime = None) -> Dict[str, dict]:
+    """Apply the named (default: all enabled) policies, each in its own session."""
+    reports = {}
+    for name in names or [name for name, policy in POLICIES.items() if policy.enabled]:
+        policy = POLICIES[name]
+        with SessionLocal() as db:
+            try:
+                reports[name] = apply_policy(db, policy, now=now, dry_run=dry_run)
+            except Exception:
+                db.rollback()
+                logger.exception("Retention policy failed", extra={"policy": name})
+                reports[name] = {"action": policy.action, "error": True}
+    if not dry_run:
+        last_run.clear()
+        last_run.update(finished_at=datetime.utcnow().isoformat(), policies=reports)
+    return reports
+
+
+def retention_stats() -> dict:
+    return {
+        "policies": {name: {"action": p.action, "days": p.days, "enabled": p.enabled} for name, p in POLICIES.items()},
+        "last_run": last_run or None,
+    }
+
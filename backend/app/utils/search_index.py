@@ -0,0 +1,186 @@
+import bisect
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from ..core.tenancy import TenantLocal
+from ..models import Product
+from .serializers import product_card_to_dict
+
+# Full rebuild interval, bounding staleness when another worker changed products
+SEARCH_INDEX_TTL_SECONDS = int(os.getenv("SEARCH_INDEX_TTL_SECONDS", "300"))
+
+# Facet buckets over Product.base_price (per kg): (label, min, max)
+PRICE_BUCKETS = [
+    ("Under ₹250", 0, 250),
+    ("₹250 - ₹500", 250, 500),
+    ("₹500 - ₹1000", 500, 1000),
+    ("₹1000 & above", 1000, None),
+]
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Per-field weights for ranking
+_WEIGHTS = {"name": 3, "category": 2, "description": 1}
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall((text or "").lower())
+
+
+def _price_bucket(price: float) -> int:
+    for i, (_, low, high) in enumerate(PRICE_BUCKETS):
+        if price >= low and (high is None or price < high):
+            return i
+    return 0
+
+
+class SearchIndex:
+    """
+    Inverted index over active products' name, description and category.
+    Tokens are kept sorted so a prefix resolves with two bisects. One per
+    tenant: see `search_indexes`.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, int]] = {}  # token -> {product_id: score}
+        self._tokens: List[str] = []
+        self._docs: Dict[int, dict] = {}
+        self._doc_tokens: Dict[int, Set[str]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.RLock()
+
+    def ensure_loaded(self, db: Session):
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < SEARCH_INDEX_TTL_SECONDS:
+            return
+        self.rebuild(db.query(Product).filter(Product.is_active == True).all())
+
+    def rebuild(self, products: Iterable[Product]):
+        with self._lock:
+            self._postings, self._docs, self._doc_tokens = {}, {}, {}
+            self._tokens, self._loaded_at = [], None
+            for product in products:
+                self._add(product)
+            self._tokens = sorted(self._postings)
+            self._loaded_at = time.monotonic()
+
+    def upsert(self, products: Iterable[Product]):
+        """Apply product inserts/updates/deactivations without a full rebuild."""
+        with self._lock:
+            if self._loaded_at is None:
+                return  # first search loads everything from the DB
+            for product in products:
+                self._remove(product.id)
+                if product.is_active:
+                    self._add(product)
+
+    def remove(self, product_ids: Iterable[int]):
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for product_id in product_ids:
+                self._remove(product_id)
+
+    def _add(self, product: Product):
+        scores: Dict[str, int] = Counter()
+        for field, weight in _WEIGHTS.items():
+            for token in tokenize(getattr(product, field)):
+                scores[token] += weight
+        for token, score in scores.items():
+            if token not in self._postings:
+                self._postings[token] = {}
+                if self._loaded_at is not None:
+                    bisect.insort(self._tokens, token)
+            self._postings[token][product.id] = score
+        self._docs[product.id] = product_card_to_dict(product)
+        self._doc_tokens[product.id] = set(scores)
+
+    def _remove(self, product_id: int):
+        for token in self._doc_tokens.pop(product_id, ()):
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(product_id, None)
+                if not posting:
+                    del self._postings[token]
+                    if self._loaded_at is not None:
+                        self._tokens.pop(bisect.bisect_left(self._tokens, token))
+        self._docs.pop(product_id, None)
+
+    def _match_prefix(self, prefix: str) -> Dict[int, int]:
+        start = bisect.bisect_left(self._tokens, prefix)
+        end = bisect.bisect_left(self._tokens, prefix + "\uffff")
+        matched: Dict[int, int] = {}
+        for token in self._tokens[start:end]:
+            exact_bonus = 1 if token == prefix else 0
+            for product_id, score in self._postings[token].items():
+                matched[product_id] = max(matched.get(product_id, 0), score + exact_bonus)
+        return matched
+
+    def search(
+        self,
+        q: str = "",
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> dict:
+        with self._lock:
+            terms = tokenize(q)
+            if terms:
+                # Every term must match; each is treated as a prefix for typeahead
+                scores: Dict[int, int] = {}
+                for i, term in enumerate(terms):
+                    matched = self._match_prefix(term)
+                    if i == 0:
+                        scores = matched
+                    else:
+                        scores = {pid: s + matched[pid] for pid, s in scores.items() if pid in matched}
+                    if not scores:
+                        break
+            else:
+                scores = {pid: 0 for pid in self._docs}
+
+            docs = self._docs
+            wanted_category = category.lower() if category else None
+
+            def in_category(pid):
+                return wanted_category is None or (docs[pid]["category"] or "").lower() == wanted_category
+
+            def in_price(pid):
+                price = docs[pid]["base_price"]
+                return (min_price is None or price >= min_price) and (max_price is None or price <= max_price)
+
+            # Each facet counts the matches under the *other* filter, so picking
+            # a category still shows what the other categories would hold
+            category_counts = Counter(docs[pid]["category"] for pid in scores if in_price(pid))
+            price_counts = Counter(_price_bucket(docs[pid]["base_price"]) for pid in scores if in_category(pid))
+
+            hits = [pid for pid in scores if in_category(pid) and in_price(pid)]
+            hits.sort(key=lambda pid: (-scores[pid], docs[pid]["name"]))
+
+            return {
+                "query": q,
+                "total": len(hits),
+                "items": [docs[pid] for pid in hits[offset:offset + limit]],
+                "facets": {
+                    "category": [
+                        {"value": value, "count": count}
+                        for value, count in sorted(category_counts.items(), key=lambda kv: (-kv[1], kv[0] or ""))
+                    ],
+                    "price": [
+                        {"label": label, "min": low, "max": high, "count": price_counts.get(i, 0)}
+                        for i, (label, low, high) in enumerate(PRICE_BUCKETS)
+                    ],
+                },
+            }
+
+
+# Per tenant, built on the tenant's first search; idle tenants' indexes are evicted
+search_indexes = TenantLocal(lambda tenant_id: SearchIndex())
@@ -1,7 +1,5 @@
 from app.database import SessionLocal
-from app.models import Product
-
-db = SessionLocal()
+from app.utils.catalog_sync import sync_catalog
 
 products = [
     # Fruits
@@ -33,18 +31,31 @@ products = [
     ("Amla Powder", 899, "Amla_Powder.jpg", "Veggies"),
 ]
 
-for name, price, img, category in products:
-    p = Product(
-        name=name,
-        base_price=price,      # PRICE PER KG
-        image=img,
-        category=category,
-        description=f"Premium quality {name.lower()}",
-        stock_quantity=100
+
+def main():
+    # Upserts by name in one transaction. Stock is only set on new products
+    # and products added since (by admins or manifests) stay on sale.
+    rows = [
+        {
+            "name": name,
+            "base_price": price,      # PRICE PER KG
+            "image": img,
+            "category": category,
+            "description": f"Premium quality {name.lower()}",
+            "stock_grams": 100_000,
+        }
+        for name, price, img, category in products
+    ]
+    db = SessionLocal()
+    try:
+        report = sync_catalog(db, rows, deactivate_missing=False, insert_only=("stock_grams",))
+    finally:
+        db.close()
+
+    print(
+        f"✅ Catalog synced: {len(report['inserted'])} added, {len(report['updated'])} updated"
     )
-    db.add(p)
 
-db.commit()
-db.close()
 
-print("✅ Products seeded successfully with updated prices & categories!")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Column-to-dict serializers for hot list endpoints.
+
+Each serializer is built once from the model's mapped columns and the
+response schema's fields, so rows are turned into plain dicts with one
+attrgetter call and no per-row Pydantic validation. Output matches what
+the route's response_model would produce; render it with ORJSONResponse
+(or `dumps`) from this module.
+"""
+from operator import attrgetter
+from typing import Any, Callable, Type
+
+import orjson
+from fastapi import responses
+from pydantic import BaseModel
+from sqlalchemy import inspect
+
+from .. import schema
+from ..models import Address, CartItem, Order, OrderEvent, OrderItem, Product
+from .images import image_manifest
+
+# UTC datetimes end in "Z", as Pydantic writes them on the response_model path
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(responses.ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def column_serializer(model, response_schema: Type[BaseModel] = None) -> Callable[[object], dict]:
+    """Build `row -> dict` over the model's columns (limited to the schema's fields)."""
+    columns = [attr.key for attr in inspect(model).column_attrs]
+    if response_schema is not None:
+        columns = [name for name in columns if name in response_schema.model_fields]
+    getter = attrgetter(*columns)
+
+    if len(columns) == 1:
+        return lambda row: {columns[0]: getter(row)}
+    return lambda row: dict(zip(columns, getter(row)))
+
+
+product_to_dict = column_serializer(Product, schema.Product)
+address_to_dict = column_serializer(Address, schema.Address)
+_cart_item_columns = column_serializer(CartItem, schema.CartItem)
+_order_item_columns = column_serializer(OrderItem, schema.OrderItem)
+_order_columns = column_serializer(Order, schema.Order)
+order_event_to_dict = column_serializer(OrderEvent, schema.OrderEvent)
+
+
+def product_card_to_dict(product: Product) -> dict:
+    """Product plus its responsive image set, for catalog, search and detail pages."""
+    data = product_to_dict(product)
+    data["images"] = image_manifest.image_set(product.image)
+    return data
+
+
+def cart_item_to_dict(item: CartItem) -> dict:
+    data = _cart_item_columns(item)
+    data["product"] = product_to_dict(item.product)
+    return data
+
+
+def order_item_to_dict(item: OrderItem) -> dict:
+    data = _order_item_columns(item)
+    data["product"] = product_to_dict(item.product)
+    return data
+
+
+def order_to_dict(order: Order) -> dict:
+    data = _order_columns(order)
+    data["address"] = address_to_dict(order.address)
+    data["order_items"] = [order_item_to_dict(item) for item in order.order_items]
+    return data
@@ -0,0 +1,223 @@
+"""
+Pincode serviceability and shipping cost.
+
+The logistics partner's table (pincode -> zone, ETA) arrives as a CSV. It
+is compiled once into an index file: Indian pincodes are six digits
+without a leading zero, so a fixed-depth digit trie over them flattens
+into one byte per possible pincode (900 KB). Each byte is a code into a
+small table of distinct (zone, eta_days) pairs; 0 means not serviceable.
+Workers mmap the file read-only, so they share one copy in the page cache
+and a lookup is a single byte read.
+
+The index is rebuilt whenever the CSV's size or mtime no longer matches
+the one recorded in its header. If the CSV is missing or cannot be
+loaded, quotes fail with ShippingUnavailable (checkout answers 503)
+rather than accepting every pincode; loading is retried every
+SHIPPING_RETRY_SECONDS. SHIPPING_ENABLED=false turns the check off for
+local development: every pincode is accepted and no shipping is charged.
+data/pincodes.csv is a small sample table, enough for local checkouts.
+
+A storefront may override the charges through its tenant settings
+("shipping_zone_rates", "free_shipping_above_paise"); serviceability is
+the same for all of them.
+"""
+import csv
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ..core.tenancy import tenant_setting
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SHIPPING_PINCODES_CSV = os.getenv("SHIPPING_PINCODES_CSV", os.path.join(_BACKEND_DIR, "data", "pincodes.csv"))
+SHIPPING_INDEX_PATH = os.getenv("SHIPPING_INDEX_PATH", os.path.join(_BACKEND_DIR, "media", "shipping", "pincodes.idx"))
+
+SHIPPING_ENABLED = os.getenv("SHIPPING_ENABLED", "true").lower() != "false"
+SHIPPING_RETRY_SECONDS = 60
+
+# Shipping charge per zone, in paise; "zone:paise,..."
+SHIPPING_ZONE_RATES: Dict[str, int] = {
+    zone: int(paise)
+    for zone, paise in (
+        item.split(":") for item in os.getenv("SHIPPING_ZONE_RATES", "A:4900,B:6900,C:8900,D:9900,E:14900").split(",")
+    )
+}
+# Orders whose item subtotal reaches this ship free; 0 disables
+FREE_SHIPPING_ABOVE_PAISE = int(os.getenv("FREE_SHIPPING_ABOVE_PAISE", "99900"))
+
+PIN_MIN = 100000
+PIN_SLOTS = 900000
+MAGIC = b"PIN1"
+_HEADER = struct.Struct("<4sI")  # magic, JSON header length
+
+
+class ShippingUnavailable(Exception):
+    """The pincode table is not loaded, so serviceability cannot be checked."""
+
+
+class ShippingQuote(NamedTuple):
+    pincode: str
+    zone: str
+    eta_days: int
+    shipping_paise: int
+
+
+def _pin_slot(pincode: str) -> int:
+    pincode = pincode.strip()
+    if len(pincode) != 6 or not pincode.isdigit() or pincode[0] == "0":
+        raise ValueError(f"Invalid pincode: {pincode!r}")
+    return int(pincode) - PIN_MIN
+
+
+def build_index(csv_path: str, index_path: str) -> int:
+    """Compile the pincode CSV (pincode, zone, eta_days) into an index file. Returns rows read."""
+    codes = bytearray(PIN_SLOTS)
+    table: List[Tuple[str, int]] = []
+    code_for: Dict[Tuple[str, int], int] = {}
+    rows = 0
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                slot = _pin_slot(row["pincode"])
+                key = (row["zone"].strip(), int(row["eta_days"]))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{csv_path}:{line}: {e}") from None
+            code = code_for.get(key)
+            if code is None:
+                if len(table) == 255:
+                    raise ValueError(f"{csv_path}: more than 255 distinct (zone, eta_days) pairs")
+                table.append(key)
+                code = code_for[key] = len(table)
+            codes[slot] = code
+            rows += 1
+
+    stat = os.stat(csv_path)
+    header = json.dumps({
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "rows": rows,
+        "table": table,
+    }).encode()
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    # Several workers may build at once; each writes its own file and the last rename wins
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(header)))
+        f.write(header)
+        f.write(codes)
+    os.replace(tmp_path, index_path)
+    return rows
+
+
+def _read_header(index_path: str) -> Tuple[Optional[dict], int]:
+    """The index file's JSON header and the offset of its code array."""
+    try:
+        with open(index_path, "rb") as f:
+            magic, length = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC:
+                return None, 0
+            return json.loads(f.read(length)), _HEADER.size + length
+    except (OSError, ValueError, struct.error):
+        return None, 0
+
+
+class ShippingIndex:
+    def __init__(self, csv_path: str, index_path: str):
+        self.csv_path = csv_path
+        self.index_path = index_path
+        self._map: Optional[mmap.mmap] = None
+        self._offset = 0
+        self._table: List[Tuple[str, int]] = []
+        self.rows = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._retry_at = 0.0
+
+    @property
+    def available(self) -> bool:
+        self.ensure_loaded()
+        return self._map is not None
+
+    def ensure_loaded(self):
+        if not self._loaded or (self._map is None and time.monotonic() >= self._retry_at):
+            with self._lock:
+                if not self._loaded or (self._map is None and time.monotonic() >= self._retry_at):
+                    self._try_load()
+
+    def _try_load(self):
+        self._loaded = True
+        try:
+            self.load()
+        except Exception:
+            self._retry_at = time.monotonic() + SHIPPING_RETRY_SECONDS
+            logger.exception("Shipping index failed to load", extra={"csv": self.csv_path})
+
+    def load(self):
+        """(Re)build the index if the CSV changed, then map it."""
+        stat = os.stat(self.csv_path)
+        header, offset = _read_header(self.index_path)
+        if (header is None or header["source_size"] != stat.st_size
+                or header["source_mtime_ns"] != stat.st_mtime_ns):
+            build_index(self.csv_path, self.index_path)
+            header, offset = _read_header(self.index_path)
+
+        with open(self.index_path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        old, self._map = self._map, mapped
+        self._offset = offset
+        self._table = [tuple(entry) for entry in header["table"]]
+        self.rows = header["rows"]
+        if old is not None:
+            old.close()
+        logger.info("Shipping index loaded", extra={"pincodes": self.rows})
+
+    def lookup(self, pincode: str) -> Optional[Tuple[str, int]]:
+        """
+        (zone, eta_days) for a serviceable pincode, else None. Raises
+        ValueError if malformed, ShippingUnavailable if the index is not loaded.
+        """
+        slot = _pin_slot(pincode)
+        if not self.available:
+            raise ShippingUnavailable(self.csv_path)
+        code = self._map[self._offset + slot]
+        return self._table[code - 1] if code else None
+
+
+def free_shipping_above_paise() -> int:
+    """The current storefront's free-shipping threshold; 0 if it has none."""
+    return tenant_setting("free_shipping_above_paise", FREE_SHIPPING_ABOVE_PAISE)
+
+
+def shipping_for(zone: str, subtotal_paise: int) -> int:
+    free_above = free_shipping_above_paise()
+    if free_above and subtotal_paise >= free_above:
+        return 0
+    rates = tenant_setting("shipping_zone_rates", SHIPPING_ZONE_RATES)
+    return rates.get(zone, max(rates.values()))
+
+
+def quote(pincode: str, subtotal_paise: int = 0) -> Optional[ShippingQuote]:
+    """
+    Shipping quote for a pincode, or None if we do not deliver there.
+    Raises ValueError for a malformed pincode and ShippingUnavailable if
+    the pincode table is not loaded. With SHIPPING_ENABLED=false every
+    pincode gets a free quote in zone "-", unchecked.
+    """
+    if not SHIPPING_ENABLED:
+        return ShippingQuote(pincode.strip(), "-", 0, 0)
+    found = shipping_index.lookup(pincode)
+    if found is None:
+        return None
+    zone, eta_days = found
+    return ShippingQuote(pincode.strip(), zone, eta_days, shipping_for(zone, subtotal_paise))
+
+
+shipping_index = ShippingIndex(SHIPPING_PINCODES_CSV, SHIPPING_INDEX_PATH)
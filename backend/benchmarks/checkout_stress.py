@@ -0,0 +1,106 @@
+"""
+Concurrent checkout stress test for stock reservation.
+
+Many users race to buy the same scarce product; the run fails if more
+packs are sold than were in stock.
+
+    cd backend
+    python benchmarks/checkout_stress.py --users 200 --stock 50 --workers 32
+
+Uses a throwaway SQLite file unless DATABASE_URL is set.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--users", type=int, default=200)
+parser.add_argument("--stock", type=int, default=50)
+parser.add_argument("--qty", type=int, default=1)
+parser.add_argument("--workers", type=int, default=32)
+args = parser.parse_args()
+
+# Every simulated shopper signs up from the same test client address
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("SHIPPING_ENABLED", "false")  # no pincode table in a scratch setup
+
+if "DATABASE_URL" not in os.environ:
+    db_file = os.path.join(tempfile.mkdtemp(), "stress.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Order, Product, StockReservation  # noqa: E402
+from app.utils.pricing import SIZE_GRAMS, sync_product_variants  # noqa: E402
+
+PACK_GRAMS = SIZE_GRAMS["200gm"]  # --stock and --qty count packs of this size
+
+client = TestClient(app)
+
+with SessionLocal() as db:
+    product = Product(name=f"Stress Powder {time.time()}", base_price=500, stock_grams=args.stock * PACK_GRAMS)
+    db.add(product)
+    db.flush()
+    sync_product_variants(db, [product])
+    db.commit()
+    product_id = product.id
+
+
+def prepare(i):
+    email = f"stress{i}-{product_id}@example.com"
+    token = client.post(
+        "/api/auth/signup",
+        json={"name": "Stress", "email": email, "password": "password123"},
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    address = client.post("/api/orders/addresses", headers=headers, json={
+        "full_name": "Stress", "phone": "9999999999", "flat_no": "1",
+        "street": "Main", "city": "Pune", "state": "MH", "pincode": "411001",
+    }).json()
+    client.post("/api/cart/add", headers=headers, json={
+        "product_id": product_id, "quantity": args.qty, "size": "200gm",
+    })
+    return headers, address["id"]
+
+
+def checkout(prepared):
+    headers, address_id = prepared
+    return client.post("/api/orders/create", headers=headers, json={
+        "address_id": address_id, "total_amount": 0, "items": [],
+    }).status_code
+
+
+with ThreadPoolExecutor(args.workers) as pool:
+    shoppers = list(pool.map(prepare, range(args.users)))
+    started = time.perf_counter()
+    statuses = list(pool.map(checkout, shoppers))
+    elapsed = time.perf_counter() - started
+
+with SessionLocal() as db:
+    remaining = db.query(Product.stock_grams).filter(Product.id == product_id).scalar() // PACK_GRAMS
+    reserved = sum(
+        r.quantity for r in db.query(StockReservation).filter(StockReservation.product_id == product_id)
+    ) // PACK_GRAMS
+    orders = (
+        db.query(Order)
+        .join(StockReservation, StockReservation.order_id == Order.id)
+        .filter(StockReservation.product_id == product_id)
+        .count()
+    )
+
+counts = {code: statuses.count(code) for code in sorted(set(statuses))}
+print(f"checkouts: {len(statuses)} in {elapsed:.2f}s ({len(statuses) / elapsed:.0f}/s)")
+print(f"status codes: {counts}")
+print(f"stock: start={args.stock} reserved={reserved} remaining={remaining} orders={orders}")
+
+expected_orders = min(args.users, args.stock // args.qty)
+ok = remaining >= 0 and reserved + remaining == args.stock and orders == expected_orders
+print("OK" if ok else "OVERSOLD / LOST STOCK")
+sys.exit(0 if ok else 1)
@@ -0,0 +1,85 @@
+"""
+Logging overhead benchmark: cost per log call on the request thread for
+print(), a plain synchronous StreamHandler, and app/core/logs.py's queue
+handler (kept and sampled out), writing to a fast sink and to a slow one
+(a stalled stdout pipe or log shipper).
+
+    cd backend
+    python benchmarks/logging_overhead.py --calls 20000 --sink-delay-ms 0.2
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--calls", type=int, default=20_000)
+parser.add_argument("--sink-delay-ms", type=float, default=0.2)
+args = parser.parse_args()
+
+
+class Sink(io.TextIOBase):
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def write(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        return len(text)
+
+
+real_stdout = sys.stdout
+results = []
+
+
+def measure(label, call):
+    start = time.perf_counter()
+    for i in range(args.calls):
+        call(i)
+    results.append((label, (time.perf_counter() - start) / args.calls * 1e6))
+
+
+for sink_label, delay in (("fast sink", 0.0), ("slow sink", args.sink_delay_ms / 1000)):
+    sys.stdout = Sink(delay)
+    measure(f"print, {sink_label}", lambda i: print(f"order {i} confirmed"))
+
+    sync_logger = logging.getLogger(f"bench.sync.{delay}")
+    sync_logger.propagate = False
+    sync_logger.setLevel(logging.INFO)
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    sync_logger.addHandler(handler)
+    measure(f"StreamHandler, {sink_label}", lambda i: sync_logger.info("order %d confirmed", i))
+
+# The queue handler writes to the slow sink; its listener thread absorbs the delay
+os.environ["LOG_SAMPLE_RATES"] = "bench.hot=0.01"
+sink = sys.stdout = Sink(0.0)
+from app.core import logs  # noqa: E402
+
+logs.configure_logging()
+kept = logging.getLogger("bench.kept")
+hot = logging.getLogger("bench.hot")
+
+
+def drain():
+    while logs.logging_stats()["queue_depth"]:
+        time.sleep(0.01)
+
+
+measure("queue handler, fast sink", lambda i: kept.info("order %d confirmed", i, extra={"order_id": i}))
+drain()
+measure("queue handler, sampled 1%", lambda i: hot.info("order %d confirmed", i, extra={"order_id": i}))
+drain()
+sink.delay = args.sink_delay_ms / 1000
+measure("queue handler, slow sink", lambda i: kept.info("order %d confirmed", i, extra={"order_id": i}))
+stats = logs.logging_stats()
+
+sys.stdout = real_stdout
+print(f"calls={args.calls} slow sink delay={args.sink_delay_ms} ms per write")
+for label, micros in results:
+    print(f"{label:32}{micros:10.2f} us/call")
+print(f"queue handler stats: {stats}")
@@ -0,0 +1,152 @@
+"""
+Overload test for admission control (app/core/admission.py).
+
+Starts the API under uvicorn on a throwaway SQLite file, then floods it
+with catalog searches and bcrypt logins while a few shoppers check out.
+Runs once with admission control off and once with it on, and reports
+per route class how many requests succeeded, were shed (503) or hit the
+client timeout, with latency percentiles of the successful ones.
+
+    cd backend
+    python benchmarks/overload.py --browsers 150 --logins 40 --shoppers 20 --seconds 15
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--browsers", type=int, default=150, help="concurrent catalog search loops")
+parser.add_argument("--logins", type=int, default=40, help="concurrent login loops (bcrypt)")
+parser.add_argument("--shoppers", type=int, default=20, help="users checking out during the flood")
+parser.add_argument("--seconds", type=float, default=15)
+parser.add_argument("--client-timeout", type=float, default=5.0)
+args = parser.parse_args()
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADDRESS = {"full_name": "Load Test", "phone": "9999999999", "flat_no": "1", "street": "MG Road",
+           "city": "Bengaluru", "state": "KA", "pincode": "560001", "is_default": True}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(admission: bool):
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'overload.db')}",
+        RATE_LIMIT_ENABLED="false",
+        LOG_LEVEL="WARNING",
+        ADMISSION_ENABLED="true" if admission else "false",
+        SHIPPING_ENABLED="false",  # no pincode table in a scratch setup
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(base + "/health", timeout=1)
+            return server, base
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+async def setup(client: httpx.AsyncClient):
+    await client.post("/api/admin/seed-products")
+    shoppers = []
+    for i in range(args.shoppers):
+        r = await client.post("/api/auth/signup", json={"name": f"S{i}", "email": f"s{i}@loadtest.example.com",
+                                                         "password": "password1"})
+        r.raise_for_status()
+        headers = {"Authorization": "Bearer " + r.json()["access_token"]}
+        address = (await client.post("/api/orders/addresses", json=ADDRESS, headers=headers)).json()
+        await client.post("/api/cart/add", json={"product_id": 1 + i % 5, "quantity": 1, "size": "200gm"},
+                          headers=headers)
+        shoppers.append((headers, address["id"]))
+    return shoppers
+
+
+async def run_flood(base: str):
+    results = defaultdict(list)  # class -> [(outcome, seconds)]
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base, timeout=60) as setup_client:
+        shoppers = await setup(setup_client)
+
+    async with httpx.AsyncClient(base_url=base, timeout=args.client_timeout, limits=limits) as client:
+        deadline = time.monotonic() + args.seconds
+
+        async def call(kind, method, url, **kwargs):
+            started = time.monotonic()
+            try:
+                r = await client.request(method, url, **kwargs)
+                outcome = "ok" if r.status_code < 400 else ("shed" if r.status_code == 503 else f"http {r.status_code}")
+            except httpx.TimeoutException:
+                outcome = "timeout"
+            except httpx.HTTPError:
+                outcome = "error"
+            results[kind].append((outcome, time.monotonic() - started))
+            return outcome
+
+        async def browse(i):
+            while time.monotonic() < deadline:
+                await call("catalog", "GET", f"/api/products/search?q={'abcdefgh'[i % 8]}")
+
+        async def login(i):
+            while time.monotonic() < deadline:
+                await call("auth", "POST", "/api/auth/login", json={"email": f"s{i % args.shoppers}@loadtest.example.com",
+                                                                    "password": "password1"})
+
+        async def checkout(i, headers, address_id):
+            # Arrive once the flood is under way, spread over its middle half
+            await asyncio.sleep(args.seconds * (0.25 + 0.5 * i / max(1, args.shoppers)))
+            body = {"address_id": address_id, "total_amount": 0, "items": []}
+            while await call("checkout", "POST", "/api/orders/create", json=body, headers=headers) == "shed":
+                await asyncio.sleep(2)  # what a client honouring Retry-After would do
+
+        await asyncio.gather(
+            *(browse(i) for i in range(args.browsers)),
+            *(login(i) for i in range(args.logins)),
+            *(checkout(i, h, a) for i, (h, a) in enumerate(shoppers)),
+        )
+    return results
+
+
+def report(label, results):
+    print(f"\n== {label}")
+    print(f"{'class':10}{'requests':>9}{'ok':>7}{'shed':>7}{'timeout':>9}{'other':>7}{'p50 ok':>9}{'p95 ok':>9}")
+    for kind in ("checkout", "auth", "catalog"):
+        rows = results.get(kind, [])
+        counts = defaultdict(int)
+        for outcome, _ in rows:
+            counts[outcome] += 1
+        ok = sorted(t for outcome, t in rows if outcome == "ok")
+        p50 = f"{statistics.median(ok):.2f}s" if ok else "-"
+        p95 = f"{ok[int(len(ok) * 0.95) - 1 if len(ok) > 1 else 0]:.2f}s" if ok else "-"
+        other = len(rows) - counts["ok"] - counts["shed"] - counts["timeout"]
+        print(f"{kind:10}{len(rows):9}{counts['ok']:7}{counts['shed']:7}{counts['timeout']:9}{other:7}{p50:>9}{p95:>9}")
+
+
+for admission in (False, True):
+    server, base = start_server(admission)
+    try:
+        results = asyncio.run(run_flood(base))
+    finally:
+        server.terminate()
+        server.wait()
+    report(f"admission control {'on' if admission else 'off'}", results)
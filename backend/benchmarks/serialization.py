@@ -0,0 +1,103 @@
+"""
+Response encoding benchmark: FastAPI's default path (response_model
+validation / jsonable_encoder + json.dumps) against the column serializers
+in app/utils/serializers.py rendered with orjson.
+
+    cd backend
+    python benchmarks/serialization.py --rows 1000 10000
+
+Builds detached ORM objects in memory, so no database is needed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app import schema  # noqa: E402
+from app.models import Address, Order, OrderItem, Product  # noqa: E402
+from app.utils.serializers import dumps, order_to_dict, product_to_dict  # noqa: E402
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+parser.add_argument("--repeat", type=int, default=5)
+args = parser.parse_args()
+
+now = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def make_products(n):
+    return [
+        Product(
+            id=i, name=f"Product {i}", description=f"Premium quality product {i}.",
+            base_price=100 + i % 900, image=f"Product_{i}.jpg", category="Spices & Herbs",
+            stock_grams=100_000, is_active=True, created_at=now,
+        )
+        for i in range(n)
+    ]
+
+
+def make_orders(n, products):
+    orders = []
+    for i in range(n):
+        address = Address(
+            id=i, user_id=1, full_name="Customer", phone="9999999999", flat_no="12",
+            street="MG Road", landmark=None, city="Pune", state="MH", pincode="411001",
+            is_default=False, created_at=now,
+        )
+        items = [
+            OrderItem(id=i * 3 + j, order_id=i, product_id=products[j].id, quantity=2,
+                      size="500gm", price=92.5, product=products[j])
+            for j in range(3)
+        ]
+        orders.append(Order(
+            id=i, user_id=1, address_id=i, total_amount=582.75, status="pending",
+            payment_status="pending", payment_id=None, created_at=now, updated_at=None,
+            address=address, order_items=items,
+        ))
+    return orders
+
+
+orders_adapter = TypeAdapter(List[schema.Order])
+
+baselines = {
+    # list_products returned ORM rows straight to jsonable_encoder
+    "products": lambda rows: json.dumps(jsonable_encoder(rows)).encode(),
+    # get_orders validated every row against response_model=List[schema.Order]
+    "orders": lambda rows: json.dumps(orders_adapter.dump_python(
+        orders_adapter.validate_python(rows, from_attributes=True), mode="json"
+    )).encode(),
+}
+fast = {
+    "products": lambda rows: dumps([product_to_dict(p) for p in rows]),
+    "orders": lambda rows: dumps([order_to_dict(o) for o in rows]),
+}
+
+
+def best_of(fn, rows):
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        fn(rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+print(f"{'payload':<10}{'rows':>7}{'before ms':>12}{'after ms':>11}{'speedup':>9}{'rows/s after':>15}")
+for n in args.rows:
+    # Separate product objects for orders: back-populated order_items would
+    # otherwise leak into the plain product list
+    datasets = {"products": make_products(n), "orders": make_orders(n, make_products(3))}
+    for name, rows in datasets.items():
+        before = best_of(baselines[name], rows)
+        after = best_of(fast[name], rows)
+        assert json.loads(baselines[name](rows)) == json.loads(fast[name](rows))
+        print(f"{name:<10}{n:>7}{before * 1000:>12.1f}{after * 1000:>11.1f}"
+              f"{before / after:>8.1f}x{n / after:>15,.0f}")
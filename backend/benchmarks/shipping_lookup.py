@@ -0,0 +1,83 @@
+"""
+Pincode lookup benchmark for app/utils/shipping.py: index build time,
+per-lookup latency, and resident memory added by loading the index,
+against a plain dict of the same table.
+
+    cd backend
+    python benchmarks/shipping_lookup.py --rows 150000
+
+Generates a synthetic partner CSV in a temporary directory.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.shipping import ShippingIndex  # noqa: E402
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=int, default=150_000)
+parser.add_argument("--lookups", type=int, default=1_000_000)
+args = parser.parse_args()
+
+
+def rss_kb() -> int:
+    # Current, not peak, resident size where /proc is available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+random.seed(42)
+workdir = tempfile.mkdtemp()
+csv_path = os.path.join(workdir, "pincodes.csv")
+pincodes = random.sample(range(110001, 999999), args.rows)
+with open(csv_path, "w") as f:
+    f.write("pincode,zone,eta_days\n")
+    for pin in pincodes:
+        f.write(f"{pin},{random.choice('ABCDE')},{random.randint(1, 9)}\n")
+
+probes = [str(random.choice(pincodes) if i % 4 else random.randint(100000, 999999)) for i in range(args.lookups)]
+
+before = rss_kb()
+index = ShippingIndex(csv_path, os.path.join(workdir, "pincodes.idx"))
+start = time.perf_counter()
+index.load()
+build = time.perf_counter() - start
+for probe in probes[:200_000]:  # touch the pages once
+    index.lookup(probe)
+index_kb = rss_kb() - before
+
+start = time.perf_counter()
+index.load()
+reload = time.perf_counter() - start
+
+lookup = index.lookup
+start = time.perf_counter()
+for probe in probes:
+    lookup(probe)
+index_ns = (time.perf_counter() - start) / len(probes) * 1e9
+
+before = rss_kb()
+import csv  # noqa: E402
+with open(csv_path) as f:
+    table = {row["pincode"]: (row["zone"], int(row["eta_days"])) for row in csv.DictReader(f)}
+dict_kb = rss_kb() - before
+get = table.get
+start = time.perf_counter()
+for probe in probes:
+    get(probe)
+dict_ns = (time.perf_counter() - start) / len(probes) * 1e9
+
+print(f"rows={args.rows} lookups={args.lookups}")
+print(f"index build {build * 1000:.0f} ms, reopen {reload * 1000:.1f} ms, file {os.path.getsize(index.index_path) / 1024:.0f} KB")
+print(f"{'':12}{'ns/lookup':>12}{'RSS KB':>10}")
+print(f"{'mmap index':12}{index_ns:12.0f}{index_kb:10d}  (file-backed pages, shared by workers)")
+print(f"{'dict':12}{dict_ns:12.0f}{dict_kb:10d}  (private to each worker)")
@@ -0,0 +1,227 @@
+"""
+Concurrent checkout throughput on SQLite, plain engine vs tuned mode.
+
+Starts the API under uvicorn on a fresh SQLite file, signs up shoppers,
+then has each of them loop add-to-cart -> view cart -> place order ->
+list orders for a fixed time. Runs once with SQLITE_TUNING=false (the
+driver's defaults: rollback journal, deferred transactions, every
+connection may write) and once with it on (WAL, pragmas, one writer
+connection per worker). Reports completed checkouts per second and the
+failures seen, e.g. 500s from "database is locked".
+
+With --db-only the HTTP layer is skipped: --workers processes each run
+--shoppers threads doing the checkout transaction (read the product,
+insert an order, take stock) straight through SessionLocal, which
+isolates the database from the Python request path.
+
+    cd backend
+    python benchmarks/sqlite_checkout.py --shoppers 32 --seconds 20 [--workers 2] [--db-only]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import threading
+from multiprocessing import Process, Queue
+
+import httpx
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--shoppers", type=int, default=32)
+parser.add_argument("--seconds", type=float, default=20)
+parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+parser.add_argument("--db-only", action="store_true", help="checkout transactions without HTTP")
+args = parser.parse_args()
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADDRESS = {"full_name": "Bench", "phone": "9999999999", "flat_no": "1", "street": "MG Road",
+           "city": "Bengaluru", "state": "KA", "pincode": "560001", "is_default": True}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(tuned: bool, db_path: str):
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        SQLITE_TUNING="true" if tuned else "false",
+        RATE_LIMIT_ENABLED="false",
+        ADMISSION_ENABLED="false",  # measure the database, not load shedding
+        LOG_LEVEL="WARNING",
+        CACHE_BACKEND="memory",
+        SHIPPING_ENABLED="false",  # no pincode table in a scratch setup
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(args.workers)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(150):
+        try:
+            httpx.get(base + "/health", timeout=1)
+            return server, base
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+async def signup(client: httpx.AsyncClient, i: int):
+    r = await client.post("/api/auth/signup", json={"name": f"B{i}", "email": f"b{i}@bench.example.com",
+                                                     "password": "password1"})
+    r.raise_for_status()
+    headers = {"Authorization": "Bearer " + r.json()["access_token"]}
+    r = await client.post("/api/orders/addresses", json=ADDRESS, headers=headers)
+    r.raise_for_status()
+    return headers, r.json()["id"]
+
+
+async def run(base: str, db_path: str):
+    async with httpx.AsyncClient(base_url=base, timeout=60) as client:
+        (await client.post("/api/admin/seed-products")).raise_for_status()
+        shoppers = [await signup(client, i) for i in range(args.shoppers)]
+    # Enough stock that no checkout fails for lack of it
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        conn.execute("UPDATE products SET stock_grams = 10000000")
+
+    failures: Counter = Counter()
+    latencies = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base, timeout=60, limits=limits) as client:
+        deadline = time.monotonic() + args.seconds
+
+        async def step(label, method, url, **kwargs) -> bool:
+            try:
+                r = await client.request(method, url, **kwargs)
+            except httpx.HTTPError as e:
+                failures[f"{label}: {type(e).__name__}"] += 1
+                return False
+            if r.status_code >= 400:
+                failures[f"{label}: {r.status_code}"] += 1
+                return False
+            return True
+
+        async def shopper(i, headers, address_id):
+            done = 0
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                if not await step("cart add", "POST", "/api/cart/add", headers=headers,
+                                  json={"product_id": 1 + i % 5, "quantity": 1, "size": "200gm"}):
+                    continue
+                await step("cart view", "GET", "/api/cart", headers=headers)
+                if await step("checkout", "POST", "/api/orders/create", headers=headers,
+                              json={"address_id": address_id, "total_amount": 0, "items": []}):
+                    done += 1
+                    latencies.append(time.monotonic() - started)
+                await step("orders", "GET", "/api/orders", headers=headers)
+            return done
+
+        started = time.monotonic()
+        done = await asyncio.gather(*(shopper(i, h, a) for i, (h, a) in enumerate(shoppers)))
+        elapsed = time.monotonic() - started
+    return sum(done), elapsed, latencies, failures
+
+
+def report(label, checkouts, elapsed, latencies, failures):
+    latencies.sort()
+    p50 = statistics.median(latencies) if latencies else 0
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+    print(f"\n== {label}")
+    print(f"checkouts: {checkouts} in {elapsed:.1f}s = {checkouts / elapsed:.1f}/s, "
+          f"cycle p50 {p50 * 1000:.0f}ms p95 {p95 * 1000:.0f}ms")
+    for failure, count in failures.most_common():
+        print(f"  failed {failure}: {count}")
+
+
+def db_worker(tuned: bool, db_path: str, results: Queue):
+    os.environ.update(DATABASE_URL=f"sqlite:///{db_path}", SQLITE_TUNING="true" if tuned else "false",
+                      LOG_LEVEL="WARNING")
+    sys.path.insert(0, BACKEND_DIR)
+    from sqlalchemy import update
+    from sqlalchemy.exc import OperationalError
+    from app.database import SessionLocal
+    from app.models import Order, Product
+
+    failures: Counter = Counter()
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.seconds
+
+    def shopper(i):
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                with SessionLocal() as db:
+                    product = db.get(Product, 1 + i % 5)
+                    db.add(Order(user_id=1, address_id=1, total_amount=product.base_price, status="pending",
+                                 payment_status="pending"))
+                    db.execute(update(Product).where(Product.id == product.id, Product.stock_grams > 0)
+                               .values(stock_grams=Product.stock_grams - 1))
+                    db.commit()
+            except OperationalError as e:
+                with lock:
+                    failures[str(e.orig)] += 1
+                continue
+            with lock:
+                latencies.append(time.monotonic() - started)
+
+    threads = [threading.Thread(target=shopper, args=(i,)) for i in range(args.shoppers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((latencies, failures))
+
+
+def run_db_only(tuned: bool, db_path: str):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", SQLITE_TUNING="true" if tuned else "false")
+    setup = (
+        "from app.database import Base, SessionLocal, engine\n"
+        "from app.models import Product\n"
+        "Base.metadata.create_all(engine)\n"
+        "with SessionLocal() as db:\n"
+        "    db.add_all(Product(name=f'P{i}', base_price=100, stock_grams=10000000) for i in range(5))\n"
+        "    db.commit()\n"
+    )
+    subprocess.run([sys.executable, "-c", setup], cwd=BACKEND_DIR, env=env, check=True)
+    results: Queue = Queue()
+    workers = [Process(target=db_worker, args=(tuned, db_path, results)) for _ in range(args.workers)]
+    started = time.monotonic()
+    for worker in workers:
+        worker.start()
+    latencies, failures = [], Counter()
+    for _ in workers:
+        worker_latencies, worker_failures = results.get()
+        latencies += worker_latencies
+        failures += worker_failures
+    for worker in workers:
+        worker.join()
+    return len(latencies), time.monotonic() - started, latencies, failures
+
+
+for tuned in (False, True):
+    db_path = os.path.join(tempfile.mkdtemp(), "checkout.db")
+    label = f"SQLITE_TUNING={'true' if tuned else 'false'}, {args.workers} worker(s)"
+    if args.db_only:
+        report(label + ", database only", *run_db_only(tuned, db_path))
+        continue
+    server, base = start_server(tuned, db_path)
+    try:
+        results = asyncio.run(run(base, db_path))
+    finally:
+        server.terminate()
+        server.wait()
+    report(label, *results)
@@ -0,0 +1,101 @@
+"""
+Shared fixtures. The app reads its configuration from the environment
+when imported, so it is set here first: a throwaway SQLite database, no
+rate limits or pincode table, and the in-process fake payment gateway.
+
+    cd backend
+    python -m pytest -q
+"""
+import os
+import tempfile
+import uuid
+
+_tmp = tempfile.mkdtemp(prefix="nutrieve-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["SHIPPING_ENABLED"] = "false"
+os.environ["PAYMENT_GATEWAY_URL"] = "fake"
+os.environ["PAYMENT_WEBHOOK_SECRET"] = "test-secret"
+os.environ["IMAGE_OUTPUT_DIR"] = os.path.join(_tmp, "images")
+os.environ["ALLOWED_ORIGINS"] = "http://localhost:5173"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.main import app
+from app.models import Product
+from app.utils.pricing import price_index, sync_product_variants
+
+ADDRESS = {
+    "full_name": "Test Shopper",
+    "phone": "9999999999",
+    "flat_no": "1",
+    "street": "MG Road",
+    "city": "Bengaluru",
+    "state": "KA",
+    "pincode": "560001",
+    "is_default": True,
+}
+
+
+@pytest.fixture(scope="session")
+def client():
+    # Not entered as a context manager: the startup background jobs stay off
+    return TestClient(app)
+
+
+@pytest.fixture
+def db():
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Authorization headers of a newly signed-up customer."""
+    email = f"{uuid.uuid4().hex[:12]}@example.com"
+    response = client.post("/api/auth/signup", json={"name": "Test", "email": email, "password": "password1"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def make_product(db):
+    """Factory for an active product with `stock` grams on hand."""
+
+    def make(stock=10_000, base_price=500.0, name=None):
+        product = Product(
+            name=name or f"Product {uuid.uuid4().hex[:8]}",
+            base_price=base_price,
+            category="test",
+            stock_grams=stock,
+            is_active=True,
+        )
+        db.add(product)
+        db.flush()
+        sync_product_variants(db, [product])
+        product_id = product.id  # read before commit expires it
+        db.commit()
+        price_index.invalidate()
+        return product_id
+
+    return make
+
+
+@pytest.fixture
+def place_order(client):
+    """Cart `quantity` packs of a product and check out; returns the response."""
+
+    def place(headers, product_id, quantity=1, idempotency_key=None, size="200gm"):
+        response = client.post("/api/cart/add", headers=headers,
+                               json={"product_id": product_id, "quantity": quantity, "size": size})
+        assert response.status_code == 200, response.text
+        address = client.post("/api/orders/addresses", headers=headers, json=ADDRESS).json()
+        order_headers = dict(headers)
+        if idempotency_key:
+            order_headers["Idempotency-Key"] = idempotency_key
+        return client.post("/api/orders/create", headers=order_headers,
+                           json={"address_id": address["id"], "total_amount": 0, "items": []})
+
+    return place
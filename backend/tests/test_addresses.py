@@ -0,0 +1,55 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.cache import SQLiteBackend
+from app.database import Base, SessionLocal
+from app.models import Address
+from app.utils import addresses
+from app.utils.migrations import migrate
+
+from conftest import ADDRESS
+
+
+def _add_elsewhere(user_id, **fields):
+    # As another worker would: straight to the table, without touching this process's cache
+    with SessionLocal() as db:
+        address = Address(user_id=user_id, **{**ADDRESS, "is_default": False, **fields})
+        db.add(address)
+        db.commit()
+        return address.id
+
+
+def test_per_process_cache_backend_never_serves_a_stale_list(client, auth_headers):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    client.post("/api/orders/addresses", headers=auth_headers, json=ADDRESS)
+    assert len(client.get("/api/orders/addresses", headers=auth_headers).json()) == 1
+
+    added = _add_elsewhere(user_id, street="Brigade Road")
+    assert added in [a["id"] for a in client.get("/api/orders/addresses", headers=auth_headers).json()]
+
+
+def test_shared_cache_backend_caches_until_the_next_write(client, auth_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(addresses.address_cache, "backend", SQLiteBackend(str(tmp_path / "cache.db")))
+    client.post("/api/orders/addresses", headers=auth_headers, json=ADDRESS)
+    first = client.get("/api/orders/addresses", headers=auth_headers).json()
+    hits = addresses.address_cache.stats["hits"]
+    assert client.get("/api/orders/addresses", headers=auth_headers).json() == first
+    assert addresses.address_cache.stats["hits"] == hits + 1
+
+    client.post("/api/orders/addresses", headers=auth_headers, json={**ADDRESS, "street": "Church Street"})
+    assert len(client.get("/api/orders/addresses", headers=auth_headers).json()) == len(first) + 1
+
+
+def test_default_address_index_is_added_to_existing_databases(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_addresses_user_default"))
+        for street in ("Old Street", "New Street"):
+            conn.execute(Address.__table__.insert().values(user_id=1, **{**ADDRESS, "street": street}))
+
+    assert "addresses.uq_addresses_user_default" in migrate(engine)
+    assert "uq_addresses_user_default" in {i["name"] for i in inspect(engine).get_indexes("addresses")}
+    with engine.connect() as conn:
+        defaults = conn.execute(text("SELECT street FROM addresses WHERE is_default")).scalars().all()
+    assert defaults == ["New Street"]
+    assert migrate(engine) == []
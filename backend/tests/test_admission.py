@@ -0,0 +1,50 @@
+import asyncio
+
+from app.core import tenancy
+from app.core.admission import AdmissionController, RouteClass, admission
+
+ORIGIN = {"Origin": "http://localhost:5173"}
+
+
+def test_shed_requests_get_503_with_retry_after_and_cors_headers(client, monkeypatch):
+    catalog = admission.classes["catalog"]
+    monkeypatch.setattr(catalog, "limit", 0)
+    monkeypatch.setattr(catalog, "queue_size", 0)
+
+    response = client.get("/api/products", headers=ORIGIN)
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.headers["Access-Control-Allow-Origin"] == ORIGIN["Origin"]
+    # Other classes are unaffected
+    assert client.get("/api/cart", headers=ORIGIN).status_code == 403
+
+
+def test_unknown_storefront_404_carries_cors_headers(client, monkeypatch):
+    monkeypatch.setattr(tenancy, "TENANT_STRICT_HOSTS", True)
+    response = client.get("/api/products", headers={**ORIGIN, "Host": "unknown.example.test"})
+    assert response.status_code == 404
+    assert response.headers["Access-Control-Allow-Origin"] == ORIGIN["Origin"]
+
+
+def test_freed_slots_go_to_checkout_before_browsing():
+    async def scenario():
+        classes = {
+            "checkout": RouteClass("checkout", 4, 4, 1.0, 0),
+            "catalog": RouteClass("catalog", 4, 4, 1.0, 2),
+        }
+        controller = AdmissionController(classes, max_concurrency=1)
+        await controller.acquire(classes["catalog"])
+        admitted = []
+
+        async def request(name):
+            await controller.acquire(classes[name])
+            admitted.append(name)
+            controller.release(classes[name])
+
+        waiters = [asyncio.create_task(request(name)) for name in ("catalog", "checkout")]
+        await asyncio.sleep(0)
+        controller.release(classes["catalog"])
+        await asyncio.gather(*waiters)
+        return admitted
+
+    assert asyncio.run(scenario()) == ["checkout", "catalog"]
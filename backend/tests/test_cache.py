@@ -0,0 +1,57 @@
+import asyncio
+import pickle
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from app.cache import RedisBackend, SQLiteBackend, codec, fake_redis
+from app.core.compression import PrecompressedBody
+
+
+@pytest.fixture(scope="module")
+def redis_url():
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(asyncio.start_server(fake_redis._handle, "127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{server.sockets[0].getsockname()[1]}/0"
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "cache.db"))
+    return RedisBackend(request.getfixturevalue("redis_url"), prefix=f"test-{tmp_path.name}:")
+
+
+def test_json_values_round_trip(backend):
+    value = {"id": 1, "price": 49.5, "tags": ["a", "b"], "created_at": datetime(2026, 1, 2, tzinfo=timezone.utc)}
+    backend.set("k", value, 60)
+    assert backend.get("k") == {**value, "created_at": "2026-01-02T00:00:00Z"}
+    assert not backend.add("k", 1, 60)
+
+
+def test_registered_types_are_rebuilt(backend):
+    body = PrecompressedBody(b'[{"name": "Ragi Malt"}]' * 100)
+    backend.set("catalog", body, 60)
+    cached = backend.get("catalog")
+    assert isinstance(cached, PrecompressedBody)
+    assert cached.bodies == body.bodies
+    assert cached.response("gzip").body == body.bodies["gzip"]
+
+
+def test_unregistered_types_are_refused():
+    with pytest.raises(codec.CodecError):
+        codec.dumps({"value": object()})
+    with pytest.raises(codec.CodecError):
+        codec.loads(b'{"__cached__": "os.system", "data": "id"}')
+
+
+def test_pickled_entries_are_never_unpickled(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.db"))
+    backend._connect().execute("INSERT INTO cache VALUES ('old', ?, 1e12)", (pickle.dumps({"a": 1}),))
+    with pytest.raises(ValueError):
+        backend.get("old")
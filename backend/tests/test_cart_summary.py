@@ -0,0 +1,112 @@
+from app.database import SessionLocal
+from app.models import CartItem, Product
+from app.utils import cart_snapshot
+from app.utils.cart_snapshot import get_cart_snapshot, invalidate_cart_snapshot
+
+from conftest import ADDRESS
+
+
+def _add(client, headers, product_id, quantity=1, size="200gm"):
+    response = client.post("/api/cart/add", headers=headers,
+                           json={"product_id": product_id, "quantity": quantity, "size": size})
+    assert response.status_code == 200, response.text
+
+
+def _summary(client, headers):
+    return client.get("/api/cart/summary", headers=headers).json()
+
+
+def _user_id(client, headers):
+    return client.get("/api/auth/me", headers=headers).json()["id"]
+
+
+def test_summary_totals_add_up_and_name_products_taken_off_sale(client, auth_headers, make_product):
+    _add(client, auth_headers, make_product(base_price=500.0), quantity=2, size="500gm")
+    retired = make_product(name="Retired Almonds")
+    _add(client, auth_headers, retired)
+    with SessionLocal() as db:
+        db.query(Product).filter(Product.id == retired).update({"is_active": False}, synchronize_session=False)
+        db.commit()
+    invalidate_cart_snapshot(_user_id(client, auth_headers))
+
+    summary = _summary(client, auth_headers)
+    assert [line["quantity"] for line in summary["items"]] == [2]
+    assert summary["item_count"] == 2
+    assert summary["subtotal"] == 500.0
+    tax = summary["tax"]
+    assert summary["grand_total"] == round(summary["subtotal"] + tax["cgst"] + tax["sgst"], 2)
+    assert summary["unavailable"] == ["Retired Almonds"]
+
+
+def test_cart_writes_in_this_worker_refresh_the_summary(client, auth_headers, make_product):
+    product_id = make_product()
+    _add(client, auth_headers, product_id)
+    first = _summary(client, auth_headers)
+    _add(client, auth_headers, product_id)
+    assert _summary(client, auth_headers)["item_count"] == first["item_count"] + 1
+
+    item_id = first["items"][0]["item_id"]
+    client.put(f"/api/cart/{item_id}", headers=auth_headers, json={"quantity": 5})
+    assert _summary(client, auth_headers)["item_count"] == 5
+    client.delete("/api/cart/clear", headers=auth_headers)
+    assert _summary(client, auth_headers)["items"] == []
+
+
+def test_snapshot_built_during_a_cart_write_is_not_cached(client, auth_headers, make_product, monkeypatch):
+    user_id = _user_id(client, auth_headers)
+    _add(client, auth_headers, make_product())
+    build = cart_snapshot.build_cart_snapshot
+
+    def build_racing_a_write(db, user):
+        snapshot = build(db, user)
+        invalidate_cart_snapshot(user)  # a cart write lands while this build runs
+        return snapshot
+
+    monkeypatch.setattr(cart_snapshot, "build_cart_snapshot", build_racing_a_write)
+    with SessionLocal() as db:
+        get_cart_snapshot(db, user_id)
+    assert user_id not in cart_snapshot._snapshots
+
+
+def test_generations_are_bounded_and_evicted_users_still_refuse_stale_builds(
+    client, auth_headers, make_product, monkeypatch
+):
+    user_id = _user_id(client, auth_headers)
+    _add(client, auth_headers, make_product())
+    monkeypatch.setattr(cart_snapshot, "CART_SNAPSHOT_MAX_USERS", 2)
+    monkeypatch.setattr(cart_snapshot, "_generations", cart_snapshot.OrderedDict())
+    monkeypatch.setattr(cart_snapshot, "_evicted_generation", 0)
+    invalidate_cart_snapshot(user_id)
+    build = cart_snapshot.build_cart_snapshot
+
+    def build_racing_a_write_and_eviction(db, user):
+        snapshot = build(db, user)
+        invalidate_cart_snapshot(user)
+        for other in (-1, -2):  # pushes the user out of the generation map
+            invalidate_cart_snapshot(other)
+        return snapshot
+
+    monkeypatch.setattr(cart_snapshot, "build_cart_snapshot", build_racing_a_write_and_eviction)
+    with SessionLocal() as db:
+        get_cart_snapshot(db, user_id)
+    assert list(cart_snapshot._generations) == [-1, -2]
+    assert user_id not in cart_snapshot._snapshots
+
+
+def test_checkout_prices_the_cart_from_the_database_not_the_snapshot(client, auth_headers, make_product):
+    product_id = make_product(base_price=500.0)
+    _add(client, auth_headers, product_id)
+    assert _summary(client, auth_headers)["item_count"] == 1  # cached at one pack
+    # Another worker raises the quantity; this worker's snapshot does not know
+    with SessionLocal() as db:
+        db.query(CartItem).filter(CartItem.product_id == product_id).update(
+            {"quantity": 3}, synchronize_session=False
+        )
+        db.commit()
+
+    address = client.post("/api/orders/addresses", headers=auth_headers, json=ADDRESS).json()
+    response = client.post("/api/orders/create", headers=auth_headers,
+                           json={"address_id": address["id"], "total_amount": 0, "items": []})
+    assert response.status_code == 200, response.text
+    assert [item["quantity"] for item in response.json()["order_items"]] == [3]
+    assert _summary(client, auth_headers)["items"] == []
@@ -0,0 +1,29 @@
+from app.database import SessionLocal
+from app.models import Product
+from app.utils import seed_products
+
+
+def _product(name):
+    with SessionLocal() as db:
+        product = db.query(Product).filter(Product.name == name).one()
+        return product.stock_grams, product.is_active, product.base_price
+
+
+def test_reseeding_keeps_stock_and_other_products(make_product, monkeypatch):
+    other_id = make_product(name="Moringa Powder")
+    seed_products.main()
+    assert _product("Amla Powder") == (100_000, True, 899)
+
+    with SessionLocal() as db:
+        db.query(Product).filter(Product.name == "Amla Powder").update({"stock_grams": 250})
+        db.commit()
+    monkeypatch.setattr(seed_products, "products", [
+        (name, 999 if name == "Amla Powder" else price, img, category)
+        for name, price, img, category in seed_products.products
+    ])
+    seed_products.main()
+
+    # Prices follow the seed list; stock sold since the first seed is not reset
+    assert _product("Amla Powder") == (250, True, 999)
+    with SessionLocal() as db:
+        assert db.get(Product, other_id).is_active
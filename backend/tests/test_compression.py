@@ -0,0 +1,80 @@
+import gzip
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app.core.compression import CompressionMiddleware, PrecompressedBody, choose_encoding
+from app.routes.products import catalog_cache
+
+BIG = {"items": ["almonds"] * 500}
+
+
+def _app():
+    routes = [
+        Route("/big", lambda request: JSONResponse(BIG)),
+        Route("/small", lambda request: JSONResponse({"ok": True})),
+        Route("/binary", lambda request: Response(b"x" * 5000, media_type="application/octet-stream")),
+        Route("/encoded", lambda request: Response(gzip.compress(b"x" * 5000), media_type="text/plain",
+                                                   headers={"Content-Encoding": "gzip"})),
+        Route("/stream", lambda request: StreamingResponse(iter([b"x" * 5000, b"y" * 5000]), media_type="text/plain")),
+    ]
+    app = Starlette(routes=routes)
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0, identity", None),
+    ("*", "gzip"),
+    ("*, gzip;q=0", None),
+    ("", None),
+])
+def test_choose_encoding_honours_q_values(header, expected, monkeypatch):
+    monkeypatch.setattr("app.core.compression.brotli", None)
+    assert choose_encoding(header) == expected
+
+
+def test_large_json_is_gzipped_for_clients_that_accept_it():
+    client = _app()
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == BIG
+
+    plain = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+
+@pytest.mark.parametrize("path", ["/small", "/binary", "/stream"])
+def test_small_binary_and_streamed_bodies_pass_through(path):
+    response = _app().get(path, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+
+def test_bodies_the_route_already_encoded_are_not_compressed_again():
+    response = _app().get("/encoded", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == b"x" * 5000
+
+
+def test_precompressed_body_serves_the_stored_variant():
+    body = PrecompressedBody(b'{"products": []}' * 200)
+    response = body.response("gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body) == body.bodies[None]
+    assert "content-encoding" not in body.response("identity").headers
+
+
+def test_catalog_is_served_precompressed(client, make_product):
+    make_product(name="Cashews")
+    catalog_cache.invalidate()
+    response = client.get("/api/products", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Cashews" in [product["name"] for product in response.json()]
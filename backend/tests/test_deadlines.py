@@ -0,0 +1,68 @@
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.database import DeadlineExceeded, SessionLocal, set_deadline
+from app.deps.db import request_deadline
+
+
+def _request(path="/api/products", headers=None):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+    })
+
+
+def test_request_timeout_header_can_only_shorten_the_budget():
+    budget = settings.request_timeout_seconds
+    start = time.monotonic()
+    assert request_deadline(_request(headers={"X-Request-Timeout": "2"})) - start == pytest.approx(2, abs=0.5)
+    longer = request_deadline(_request(headers={"X-Request-Timeout": str(budget * 10)}))
+    assert longer - start == pytest.approx(budget, abs=0.5)
+
+
+def test_no_budget_means_no_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "request_timeout_seconds", 0)
+    assert request_deadline(_request()) is None
+
+
+def test_running_statement_is_interrupted_at_the_deadline():
+    slow = text(
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000) "
+        "SELECT count(*) FROM n"
+    )
+    with SessionLocal() as db:
+        set_deadline(db, time.monotonic() + 0.05)
+        start = time.monotonic()
+        with pytest.raises(OperationalError):
+            db.execute(slow)
+    assert time.monotonic() - start < 5
+
+
+def test_no_new_transaction_starts_after_the_deadline():
+    with SessionLocal() as db:
+        set_deadline(db, time.monotonic() - 1)
+        with pytest.raises(DeadlineExceeded):
+            db.execute(text("SELECT 1"))
+
+
+def test_request_past_its_deadline_answers_504(client, auth_headers):
+    response = client.get("/api/orders", headers={**auth_headers, "X-Request-Timeout": "0.000001"})
+    assert response.status_code == 504
+    assert client.get("/api/orders", headers=auth_headers).status_code == 200
+
+
+def test_order_feed_long_poll_outlives_the_request_deadline(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "request_timeout_seconds", 0.2)
+    cursor = client.get("/api/orders/events", headers=auth_headers).json()["cursor"]
+    start = time.monotonic()
+    response = client.get(f"/api/orders/events?after={cursor}&wait=1", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["events"] == []
+    assert time.monotonic() - start >= 1
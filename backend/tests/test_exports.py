@@ -0,0 +1,81 @@
+import csv
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.database import SessionLocal
+from app.models import OrderItem, User
+from app.utils.exports import COLUMN_NAMES, export_window, stream_export
+
+SOON = timedelta(minutes=5)
+
+
+def _csv(chunks):
+    return list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+
+
+def _rows_for(rows, order_id):
+    return [row for row in rows if row["order_id"] == str(order_id)]
+
+
+def test_csv_export_has_a_row_per_item_with_money_in_paise(auth_headers, make_product, place_order):
+    order = place_order(auth_headers, make_product(base_price=500.0), quantity=3, size="500gm").json()
+    rows = _rows_for(_csv(stream_export(export_window(now=datetime.utcnow() + SOON), "csv")), order["id"])
+    assert len(rows) == 1
+    [row] = rows
+    assert list(row) == COLUMN_NAMES
+    assert (row["size"], row["quantity"], row["unit_price_paise"], row["line_total_paise"]) == ("500gm", "3", "25000", "75000")
+    assert row["order_total_paise"] == str(round(order["total_amount"] * 100))
+    assert (row["status"], row["pincode"]) == ("pending", "560001")
+
+
+def test_each_batch_is_written_out_as_its_own_chunk(auth_headers, make_product, place_order):
+    for _ in range(3):
+        place_order(auth_headers, make_product())
+    window = export_window(now=datetime.utcnow() + SOON)
+    with SessionLocal() as db:
+        total = db.query(OrderItem).count()
+    chunks = list(stream_export(window, "csv", batch_rows=1))
+    # One chunk per row; the header goes out with the first
+    assert len(chunks) == total
+    assert len(_csv(chunks)) == total
+
+
+def test_window_excludes_orders_outside_since_and_until(auth_headers, make_product, place_order):
+    order_id = place_order(auth_headers, make_product()).json()["id"]
+    now = datetime.utcnow()
+    settling = export_window(now=now)  # until trails the clock by EXPORT_SETTLE_SECONDS
+    assert not _rows_for(_csv(stream_export(settling, "csv")), order_id)
+    later = export_window(since=now + SOON, now=now + 2 * SOON)
+    assert not _rows_for(_csv(stream_export(later, "csv")), order_id)
+    covering = export_window(since=now - SOON, now=now + SOON)
+    assert _rows_for(_csv(stream_export(covering, "csv")), order_id)
+
+
+def test_unknown_formats_fail_before_streaming():
+    with pytest.raises(ValueError):
+        stream_export(export_window(), "xlsx")
+
+
+def test_parquet_export_reads_back_with_one_row_group_per_batch(auth_headers, make_product, place_order):
+    pq = pytest.importorskip("pyarrow.parquet")
+    place_order(auth_headers, make_product())
+    data = b"".join(stream_export(export_window(now=datetime.utcnow() + SOON), "parquet", batch_rows=1))
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    assert parquet.schema_arrow.names == COLUMN_NAMES
+    assert parquet.num_row_groups == parquet.metadata.num_rows
+
+
+def test_admin_export_endpoint_streams_csv_with_a_watermark(client, auth_headers):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    with SessionLocal() as db:
+        db.query(User).filter(User.id == user_id).update({"role": "admin"}, synchronize_session=False)
+        db.commit()
+    response = client.get("/api/admin/exports/orders?format=csv", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    watermark = datetime.fromisoformat(response.headers["x-export-watermark"])
+    assert watermark < datetime.utcnow()
+    assert response.text.splitlines()[0].split(",") == COLUMN_NAMES
+    assert client.get("/api/admin/exports/orders?format=xlsx", headers=auth_headers).status_code == 400
@@ -0,0 +1,78 @@
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Order
+
+from conftest import ADDRESS
+
+
+def test_order_create_replays_the_first_response(client, db, auth_headers, make_product, place_order):
+    product_id = make_product()
+    first = place_order(auth_headers, product_id, quantity=2, idempotency_key="order-1")
+    assert first.status_code == 200, first.text
+
+    # Retried after the cart is emptied: the stored response comes back, no second order
+    again = client.post("/api/orders/create", headers={**auth_headers, "Idempotency-Key": "order-1"},
+                        json={"address_id": first.json()["address_id"], "total_amount": 0, "items": []})
+    assert again.status_code == 200
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.json()["id"] == first.json()["id"]
+    assert db.query(Order).filter(Order.user_id == first.json()["user_id"]).count() == 1
+
+
+def test_key_reused_with_a_different_request_is_refused(client, auth_headers, make_product):
+    product_id = make_product()
+    headers = {**auth_headers, "Idempotency-Key": "cart-1"}
+    item = {"product_id": product_id, "quantity": 1, "size": "200gm"}
+    assert client.post("/api/cart/add", headers=headers, json=item).status_code == 200
+
+    replay = client.post("/api/cart/add", headers=headers, json=item)
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert client.post("/api/cart/add", headers=headers, json={**item, "quantity": 2}).status_code == 422
+    assert client.get("/api/cart/summary", headers=auth_headers).json()["item_count"] == 1
+
+
+def test_keys_are_per_user(client, auth_headers, make_product):
+    product_id = make_product()
+    other = client.post("/api/auth/signup", json={"name": "Other", "email": "idem-other@example.com",
+                                                  "password": "password1"}).json()["access_token"]
+    item = {"product_id": product_id, "quantity": 1, "size": "200gm"}
+    client.post("/api/cart/add", headers={**auth_headers, "Idempotency-Key": "shared"}, json=item)
+    response = client.post("/api/cart/add", headers={"Authorization": f"Bearer {other}", "Idempotency-Key": "shared"},
+                           json=item)
+    assert response.status_code == 200
+    assert "Idempotent-Replayed" not in response.headers
+
+
+def test_response_is_stored_in_the_same_commit_as_the_order(client, auth_headers, make_product, monkeypatch):
+    product_id = make_product()
+    client.post("/api/cart/add", headers=auth_headers, json={"product_id": product_id, "quantity": 1, "size": "200gm"})
+    address_id = client.post("/api/orders/addresses", headers=auth_headers, json=ADDRESS).json()["id"]
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    headers = {**auth_headers, "Idempotency-Key": "order-commit-lost"}
+    body = {"address_id": address_id, "total_amount": 0, "items": []}
+
+    def orders():
+        with SessionLocal() as db:
+            return db.query(Order).filter(Order.user_id == user_id).count()
+
+    # The connection drops right after the order commits: the handler fails,
+    # but the stored response went with the order, so the retry replays it
+    commit = Session.commit
+    dropped = []
+
+    def drop_after_order(session):
+        commit(session)
+        if not dropped and orders():
+            dropped.append(1)
+            raise OperationalError("COMMIT", {}, Exception("connection lost"))
+
+    monkeypatch.setattr(Session, "commit", drop_after_order)
+    assert client.post("/api/orders/create", headers=headers, json=body).status_code == 500
+    monkeypatch.setattr(Session, "commit", commit)
+
+    retry = client.post("/api/orders/create", headers=headers, json=body)
+    assert retry.status_code == 200, retry.text
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert orders() == 1
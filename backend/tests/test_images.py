@@ -0,0 +1,46 @@
+import json
+import os
+
+import pytest
+from PIL import Image
+
+from app.utils.images import MANIFEST_NAME, build_images
+
+
+@pytest.fixture
+def sources(tmp_path):
+    source_dir = tmp_path / "public"
+    source_dir.mkdir()
+    for name, color in (("a.png", "red"), ("b.png", "green")):
+        Image.new("RGB", (200, 100), color).save(source_dir / name)
+    return source_dir
+
+
+def _build(sources, output_dir, **kwargs):
+    return build_images(str(sources), str(output_dir), workers=1, **kwargs)
+
+
+def test_building_some_images_keeps_the_rest_of_the_manifest(sources, tmp_path):
+    output_dir = tmp_path / "images"
+    full = _build(sources, output_dir)
+    assert sorted(full) == ["a.png", "b.png"]
+
+    Image.new("RGB", (200, 100), "blue").save(sources / "a.png")
+    partial = _build(sources, output_dir, names=["a.png"])
+    assert partial["b.png"] == full["b.png"]
+    assert partial["a.png"]["digest"] != full["a.png"]["digest"]
+    with open(output_dir / MANIFEST_NAME) as f:
+        assert json.load(f) == partial
+
+
+def test_prune_drops_only_variants_the_full_manifest_no_longer_lists(sources, tmp_path):
+    output_dir = tmp_path / "images"
+    old = _build(sources, output_dir)["a.png"]["digest"]
+    Image.new("RGB", (200, 100), "blue").save(sources / "a.png")
+
+    with pytest.raises(ValueError):
+        _build(sources, output_dir, names=["a.png"], prune=True)
+    manifest = _build(sources, output_dir, prune=True)
+    files = os.listdir(output_dir)
+    assert not any(f.startswith(old) for f in files)
+    assert any(f.startswith(manifest["b.png"]["digest"]) for f in files)
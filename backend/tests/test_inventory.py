@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.database import SessionLocal
+from app.models import Order, Product, StockReservation
+from app.utils.inventory import OutOfStockError, release_expired_reservations, reserve_stock
+from app.utils.migrations import migrate
+
+
+def _stock(product_id):
+    with SessionLocal() as db:
+        return db.get(Product, product_id).stock_grams
+
+
+def _expire_reservations(order_id):
+    with SessionLocal() as db:
+        db.query(StockReservation).filter(StockReservation.order_id == order_id).update(
+            {"expires_at": datetime.utcnow() - timedelta(minutes=1)}, synchronize_session=False
+        )
+        db.commit()
+
+
+def test_checkout_takes_stock_and_holds_it(auth_headers, make_product, place_order):
+    product_id = make_product(stock=1000)
+    response = place_order(auth_headers, product_id, quantity=3)
+    assert response.status_code == 200, response.text
+    assert _stock(product_id) == 400
+
+    with SessionLocal() as db:
+        held = db.query(StockReservation).filter(StockReservation.order_id == response.json()["id"]).one()
+    assert (held.product_id, held.quantity, held.status) == (product_id, 600, "held")
+
+
+def test_pack_sizes_draw_stock_by_weight(client, auth_headers, make_product, place_order):
+    product_id = make_product(stock=1500)
+    assert place_order(auth_headers, product_id, quantity=1, size="1kg").status_code == 200
+    assert _stock(product_id) == 500
+    # 500g left: one more kilo is refused, a 500g pack is not
+    assert place_order(auth_headers, product_id, quantity=1, size="1kg").status_code == 409
+    client.delete("/api/cart/clear", headers=auth_headers)
+    assert place_order(auth_headers, product_id, quantity=1, size="500gm").status_code == 200
+    assert _stock(product_id) == 0
+
+
+def test_checkout_beyond_stock_is_refused_without_touching_it(auth_headers, make_product, place_order):
+    product_id = make_product(stock=400)
+    response = place_order(auth_headers, product_id, quantity=3)
+    assert response.status_code == 409
+    assert _stock(product_id) == 400
+
+
+def test_guarded_update_never_drives_stock_negative(db, make_product):
+    plenty, scarce = make_product(stock=10_000, name="Plenty"), make_product(stock=200, name="Scarce")
+    with pytest.raises(OutOfStockError) as raised:
+        # Raises before anything is recorded against the order
+        reserve_stock(db, Order(), [(plenty, 400), (scarce, 200), (scarce, 200)])
+    assert raised.value.product_names == ["Scarce"]
+    assert db.query(Product.stock_grams).filter(Product.id == scarce).scalar() == 200
+    db.rollback()  # as the caller does, returning the other products' stock
+    assert (_stock(plenty), _stock(scarce)) == (10_000, 200)
+
+
+def test_expired_unpaid_order_is_cancelled_and_restocked(auth_headers, make_product, place_order):
+    product_id = make_product(stock=1000)
+    order_id = place_order(auth_headers, product_id, quantity=2).json()["id"]
+    _expire_reservations(order_id)
+
+    with SessionLocal() as db:
+        assert release_expired_reservations(db) == 1
+    with SessionLocal() as db:
+        order = db.get(Order, order_id)
+        assert (order.status, order.payment_status) == ("cancelled", "failed")
+    assert _stock(product_id) == 1000
+
+
+def test_expired_reservation_of_confirmed_order_keeps_its_stock(auth_headers, make_product, place_order):
+    product_id = make_product(stock=1000)
+    order_id = place_order(auth_headers, product_id, quantity=2).json()["id"]
+    with SessionLocal() as db:
+        db.query(Order).filter(Order.id == order_id).update({"status": "confirmed"}, synchronize_session=False)
+        db.commit()
+    _expire_reservations(order_id)
+
+    with SessionLocal() as db:
+        assert release_expired_reservations(db) == 0
+        assert db.get(Order, order_id).status == "confirmed"
+    assert _stock(product_id) == 600
+
+
+def test_pack_counts_are_migrated_to_grams(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE products (id INTEGER PRIMARY KEY, stock_quantity INTEGER)"))
+        conn.execute(text("CREATE TABLE stock_reservations (id INTEGER PRIMARY KEY, quantity INTEGER)"))
+        conn.execute(text("INSERT INTO products (stock_quantity) VALUES (5), (NULL)"))
+        conn.execute(text("INSERT INTO stock_reservations (quantity) VALUES (2)"))
+
+    assert "products.stock_grams" in migrate(engine, apply=False)
+    assert "products.stock_grams" in migrate(engine)
+    assert "products.stock_grams" not in migrate(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT stock_grams FROM products ORDER BY id")).scalars().all() == [1000, 0]
+        assert conn.execute(text("SELECT quantity FROM stock_reservations")).scalar() == 400
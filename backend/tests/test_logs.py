@@ -0,0 +1,80 @@
+import json
+import logging
+import queue
+
+import pytest
+
+from app.core import logs
+from app.core.logs import JsonFormatter, QueueLogHandler, redact, request_id_var
+
+
+def _record(msg, level=logging.INFO, name="app.test", **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def _drain(handler):
+    records = []
+    while not handler.queue.empty():
+        records.append(handler.queue.get_nowait())
+    return records
+
+
+def _handler(max_size=100, sample_rates=None):
+    return QueueLogHandler(queue.SimpleQueue(), max_size, sample_rates or {})
+
+
+@pytest.mark.parametrize("message, secret", [
+    ("login failed password=hunter2 for user", "hunter2"),
+    ('payload {"otp": "482913"}', "482913"),
+    ("header Authorization: Bearer abc.def-ghi", "abc.def-ghi"),
+    ("token eyJhbGciOi.eyJzdWIiOiIx.sig", "eyJhbGciOi.eyJzdWIiOiIx.sig"),
+    ("connecting to postgresql://app:s3cret@db/shop", "s3cret"),
+])
+def test_secrets_in_messages_are_redacted(message, secret):
+    redacted = redact(message)
+    assert secret not in redacted
+    assert logs.REDACTED in redacted
+
+
+def test_messages_without_secrets_are_left_alone():
+    assert redact("Order 42 confirmed") == "Order 42 confirmed"
+
+
+def test_queued_records_carry_the_request_id_and_hide_secret_fields():
+    handler = _handler()
+    token = request_id_var.set("req-1")
+    try:
+        handler.handle(_record("Sent OTP to %s", otp="123456", email="a@example.com"))
+    finally:
+        request_id_var.reset(token)
+    queued = handler.queue.get_nowait()
+    assert (queued.request_id, queued.otp, queued.email) == ("req-1", logs.REDACTED, "a@example.com")
+
+    entry = json.loads(JsonFormatter().format(queued))
+    assert entry["request_id"] == "req-1"
+    assert entry["otp"] == logs.REDACTED
+
+
+def test_hot_loggers_are_sampled_below_warning_only():
+    handler = _handler(sample_rates={"app.access": 0.0})
+    handler.handle(_record("GET / 200", name="app.access"))
+    handler.handle(_record("GET /slow 200", level=logging.WARNING, name="app.access"))
+    handler.handle(_record("Order placed", name="app.orders"))
+    assert [r.message for r in _drain(handler)] == ["GET /slow 200", "Order placed"]
+
+
+def test_a_full_queue_drops_records_instead_of_blocking(monkeypatch):
+    monkeypatch.setattr(logs, "stats", logs.Counter())
+    handler = _handler(max_size=2)
+    for i in range(5):
+        handler.handle(_record(f"event {i}"))
+    assert handler.queue.qsize() == 2
+    assert (logs.stats["queued"], logs.stats["dropped"]) == (2, 3)
+
+
+def test_requests_echo_a_well_formed_request_id_and_replace_others(client):
+    assert client.get("/", headers={"X-Request-ID": "edge-7f3a"}).headers["x-request-id"] == "edge-7f3a"
+    replaced = client.get("/", headers={"X-Request-ID": "not a valid id"}).headers["x-request-id"]
+    assert replaced != "not a valid id" and len(replaced) == 32
@@ -0,0 +1,77 @@
+import pytest
+
+from app.database import SessionLocal
+from app.models import Order, OrderEvent, Product, User
+from app.utils.order_status import InvalidTransition, transition
+
+
+@pytest.fixture
+def admin_headers(client, auth_headers):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    with SessionLocal() as db:
+        db.query(User).filter(User.id == user_id).update({"role": "admin"}, synchronize_session=False)
+        db.commit()
+    return auth_headers
+
+
+def _events(order_id):
+    with SessionLocal() as db:
+        return [
+            (e.from_status, e.to_status, e.source)
+            for e in db.query(OrderEvent).filter(OrderEvent.order_id == order_id).order_by(OrderEvent.id)
+        ]
+
+
+def _status(order_id):
+    with SessionLocal() as db:
+        return db.get(Order, order_id).status
+
+
+def test_transition_moves_the_order_and_logs_it(auth_headers, make_product, place_order):
+    order_id = place_order(auth_headers, make_product()).json()["id"]
+    with SessionLocal() as db:
+        transition(db, db.get(Order, order_id), "confirmed", source="admin")
+        db.commit()
+    assert _status(order_id) == "confirmed"
+    assert _events(order_id) == [(None, "pending", "checkout"), ("pending", "confirmed", "admin")]
+
+
+@pytest.mark.parametrize("to_status", ["shipped", "delivered", "refunded"])
+def test_transition_refuses_moves_the_machine_does_not_allow(auth_headers, make_product, place_order, to_status):
+    order_id = place_order(auth_headers, make_product()).json()["id"]
+    with SessionLocal() as db:
+        with pytest.raises(InvalidTransition):
+            transition(db, db.get(Order, order_id), to_status, source="admin")
+    assert _status(order_id) == "pending"
+
+
+def test_bulk_transition_moves_what_it_can_and_reports_the_rest(client, admin_headers, make_product, place_order):
+    product_id = make_product()
+    first = place_order(admin_headers, product_id).json()["id"]
+    second = place_order(admin_headers, product_id).json()["id"]
+
+    response = client.post("/api/admin/orders/transitions", headers=admin_headers, json={"transitions": [
+        {"status": "confirmed", "order_ids": [first]},
+        {"status": "shipped", "order_ids": [first, second, 999999]},
+    ]})
+    assert response.status_code == 200, response.text
+    confirmed, shipped = response.json()["results"]
+    assert confirmed["moved"] == 1
+    assert shipped["moved"] == 1
+    assert shipped["skipped"] == {str(second): "cannot go from pending to shipped", "999999": "not found"}
+    assert (_status(first), _status(second)) == ("shipped", "pending")
+    assert _events(first)[-1] == ("confirmed", "shipped", "admin")
+
+
+def test_bulk_cancel_fails_pending_payment_and_restocks(client, admin_headers, make_product, place_order):
+    product_id = make_product(stock=1000)
+    order_id = place_order(admin_headers, product_id, quantity=2).json()["id"]
+
+    response = client.post("/api/admin/orders/transitions", headers=admin_headers, json={"transitions": [
+        {"status": "cancelled", "order_ids": [order_id], "note": "Customer request"},
+    ]})
+    assert response.json()["results"][0]["moved"] == 1
+    with SessionLocal() as db:
+        order = db.get(Order, order_id)
+        assert (order.status, order.payment_status) == ("cancelled", "failed")
+        assert db.get(Product, product_id).stock_grams == 1000
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import threading
+import time
+
+from app.database import SessionLocal
+from app.models import Order, OrderEvent
+from app.utils.order_events import SUBSCRIBER_QUEUE_SIZE, OrderEventHub
+from app.utils.order_status import transition
+
+
+def _token(headers):
+    return headers["Authorization"].split()[1]
+
+
+def _move(order_id, *statuses):
+    for status in statuses:
+        with SessionLocal() as db:
+            transition(db, db.get(Order, order_id), status, source="admin")
+            db.commit()
+
+
+def _events(body: str):
+    """(event, id, data) for each SSE event in a response body."""
+    parsed = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "event" in fields:
+            parsed.append((fields["event"], int(fields["id"]), json.loads(fields["data"])))
+    return parsed
+
+
+def _stream(client, headers, order_id, last_event_id=None):
+    extra = {"Last-Event-ID": str(last_event_id)} if last_event_id is not None else {}
+    return client.get(f"/api/orders/{order_id}/events?access_token={_token(headers)}", headers=extra)
+
+
+def test_stream_sends_a_snapshot_and_ends_at_a_terminal_status(client, auth_headers, make_product, place_order):
+    order_id = place_order(auth_headers, make_product()).json()["id"]
+    _move(order_id, "cancelled")
+    response = _stream(client, auth_headers, order_id)
+    assert response.headers["content-type"].startswith("text/event-stream")
+    [(event, _, data)] = _events(response.text)
+    assert event == "snapshot"
+    assert (data["order_id"], data["status"]) == (order_id, "cancelled")
+
+
+def test_reconnect_replays_missed_events_then_gets_204_once_done(client, auth_headers, make_product, place_order):
+    order_id = place_order(auth_headers, make_product()).json()["id"]
+    with SessionLocal() as db:
+        created = db.query(OrderEvent.id).filter(OrderEvent.order_id == order_id).scalar()
+    _move(order_id, "confirmed", "cancelled")
+
+    replayed = _events(_stream(client, auth_headers, order_id, last_event_id=created).text)
+    assert [(event, data["to_status"]) for event, _, data in replayed] == [("status", "confirmed"), ("status", "cancelled")]
+    assert _stream(client, auth_headers, order_id, last_event_id=replayed[-1][1]).status_code == 204
+
+
+def test_live_changes_reach_an_open_stream(client, auth_headers, make_product, place_order):
+    order_id = place_order(auth_headers, make_product()).json()["id"]
+
+    def change_later():
+        time.sleep(0.3)
+        _move(order_id, "confirmed", "cancelled")
+
+    mover = threading.Thread(target=change_later)
+    mover.start()
+    body = _stream(client, auth_headers, order_id).text
+    mover.join()
+    assert [(event, data.get("to_status", data.get("status"))) for event, _, data in _events(body)] == [
+        ("snapshot", "pending"), ("status", "confirmed"), ("status", "cancelled"),
+    ]
+
+
+def test_other_users_orders_are_not_streamed(client, auth_headers, make_product, place_order):
+    order_id = place_order(auth_headers, make_product()).json()["id"]
+    other = client.post("/api/auth/signup", json={
+        "name": "Other", "email": f"other-{order_id}@example.com", "password": "password1",
+    }).json()["access_token"]
+    assert _stream(client, {"Authorization": f"Bearer {other}"}, order_id).status_code == 404
+    assert client.get(f"/api/orders/{order_id}/events").status_code == 401
+
+
+def test_hub_fans_out_per_order_drops_repeats_and_closes_slow_subscribers():
+    async def run():
+        hub = OrderEventHub()
+        first, other = hub.subscribe(1), hub.subscribe(2)
+        hub.publish([{"id": 10, "order_id": 1}, {"id": 10, "order_id": 1}, {"id": 11, "order_id": 2}])
+        await asyncio.sleep(0)
+        assert [first.queue.get_nowait()["id"]] == [10] and first.queue.empty()
+        assert other.queue.get_nowait()["id"] == 11
+
+        hub.publish([{"id": 100 + i, "order_id": 1} for i in range(SUBSCRIBER_QUEUE_SIZE + 5)])
+        await asyncio.sleep(0)
+        queued = [first.queue.get_nowait() for _ in range(first.queue.qsize())]
+        assert queued[-1] is None  # fell behind: the stream closes and resumes
+        hub.unsubscribe(first)
+        hub.unsubscribe(other)
+        assert not hub.active
+
+    asyncio.run(run())
@@ -0,0 +1,93 @@
+import hashlib
+import hmac
+import json
+
+from app.database import SessionLocal
+from app.models import Order, Product, StockReservation
+from app.routes.payments import _save_transaction
+from app.utils import payments
+from app.utils.order_status import transition
+
+
+def _initiate(client, headers, order):
+    return client.post("/api/payments/initiate", headers=headers,
+                       json={"order_id": order["id"], "amount": order["total_amount"], "phone": "9999999999"})
+
+
+def _webhook(client, transaction_id, code="PAYMENT_SUCCESS"):
+    body = json.dumps({"code": code, "data": {"merchantTransactionId": transaction_id}}).encode()
+    signature = hmac.new(b"test-secret", body, hashlib.sha256).hexdigest()
+    return client.post("/api/payments/webhook", content=body, headers={"X-VERIFY": signature})
+
+
+def test_second_initiate_keeps_the_payment_in_flight(client, auth_headers, make_product, place_order):
+    order = place_order(auth_headers, make_product()).json()
+    first = _initiate(client, auth_headers, order)
+    assert first.status_code == 200, first.text
+
+    assert _initiate(client, auth_headers, order).status_code == 409
+    transaction_id = first.json()["transaction_id"]
+    assert client.get(f"/api/payments/{order['id']}/status", headers=auth_headers).json()["payment_id"] == transaction_id
+    assert _webhook(client, transaction_id).json() == {"received": True, "settled": True}
+
+
+def test_racing_initiates_save_only_the_first_transaction(auth_headers, make_product, place_order):
+    order_id = place_order(auth_headers, make_product()).json()["id"]
+    with SessionLocal() as db:
+        assert _save_transaction(db, order_id, "NUT-first")
+        assert not _save_transaction(db, order_id, "NUT-second")
+        assert db.get(Order, order_id).payment_id == "NUT-first"
+
+
+def _placed_and_initiated(client, headers, place_order, product_id):
+    order = place_order(headers, product_id).json()
+    return order["id"], _initiate(client, headers, order).json()["transaction_id"]
+
+
+def _move(order_id, status):
+    with SessionLocal() as db:
+        transition(db, db.get(Order, order_id), status, source="admin")
+        db.commit()
+
+
+def _state(order_id, product_id):
+    with SessionLocal() as db:
+        order = db.get(Order, order_id)
+        reservations = {r.status for r in db.query(StockReservation).filter(StockReservation.order_id == order_id)}
+        return order.status, order.payment_status, reservations, db.get(Product, product_id).stock_grams
+
+
+def test_payment_for_an_order_an_admin_confirmed_is_recorded(client, auth_headers, make_product, place_order):
+    product_id = make_product(stock=1000)
+    order_id, transaction_id = _placed_and_initiated(client, auth_headers, place_order, product_id)
+    _move(order_id, "confirmed")
+
+    assert _webhook(client, transaction_id).json() == {"received": True, "settled": True}
+    assert _state(order_id, product_id) == ("confirmed", "completed", {"committed"}, 800)
+
+
+def test_payment_for_an_order_an_admin_cancelled_returns_its_stock(client, auth_headers, make_product, place_order):
+    product_id = make_product(stock=1000)
+    order_id, transaction_id = _placed_and_initiated(client, auth_headers, place_order, product_id)
+    _move(order_id, "cancelled")
+
+    assert _webhook(client, transaction_id).json() == {"received": True, "settled": True}
+    assert _state(order_id, product_id) == ("cancelled", "completed", {"released"}, 1000)
+
+
+def test_one_failing_payment_does_not_hold_back_the_batch(client, auth_headers, make_product, place_order, monkeypatch):
+    product_id = make_product(stock=1000)
+    first, first_txn = _placed_and_initiated(client, auth_headers, place_order, product_id)
+    second, second_txn = _placed_and_initiated(client, auth_headers, place_order, product_id)
+
+    commit_reservations = payments.commit_reservations
+
+    def fail_first(db, order_id):
+        if order_id == first:
+            raise RuntimeError("lost connection")
+        return commit_reservations(db, order_id)
+
+    monkeypatch.setattr(payments, "commit_reservations", fail_first)
+    assert payments._apply_results([(first, first_txn, "completed"), (second, second_txn, "completed")]) == 1
+    assert _state(first, product_id)[:2] == ("pending", "pending")
+    assert _state(second, product_id)[:2] == ("confirmed", "completed")
@@ -0,0 +1,57 @@
+from app.database import SessionLocal
+from app.models import Product
+from app.utils.pricing import price_index, sync_product_variants, variant_price_paise
+
+
+def _reprice(product_id, base_price):
+    with SessionLocal() as db:
+        product = db.get(Product, product_id)
+        product.base_price = base_price
+        sync_product_variants(db, [product])
+        db.commit()
+    price_index.invalidate()
+
+
+def test_prices_come_from_the_variant_table(client, auth_headers, make_product):
+    product_id = make_product(base_price=500.0)
+    client.post("/api/cart/add", headers=auth_headers, json={"product_id": product_id, "quantity": 2, "size": "500gm"})
+    line = client.get("/api/cart/summary", headers=auth_headers).json()["items"][0]
+    assert line["unit_price"] == variant_price_paise(500.0, "500gm") / 100 == 250.0
+    assert line["line_total"] == 500.0
+
+
+def test_invalidate_after_a_price_change_reprices_carts(client, auth_headers, make_product):
+    product_id = make_product(base_price=500.0)
+    client.post("/api/cart/add", headers=auth_headers, json={"product_id": product_id, "quantity": 1, "size": "1kg"})
+    assert client.get("/api/cart/summary", headers=auth_headers).json()["items"][0]["unit_price"] == 500.0
+
+    _reprice(product_id, 800.0)
+    assert client.get("/api/cart/summary", headers=auth_headers).json()["items"][0]["unit_price"] == 800.0
+
+
+def test_invalidation_by_another_worker_is_seen_through_the_shared_version(make_product):
+    product_id = make_product(base_price=500.0)
+    with SessionLocal() as db:
+        assert price_index.price(db, product_id, "1kg") == 50000
+        product = db.get(Product, product_id)
+        product.base_price = 600.0
+        sync_product_variants(db, [product])
+        db.commit()
+    # What another worker's invalidate() does: bump the shared version only
+    price_index._versions.invalidate()
+    with SessionLocal() as db:
+        assert price_index.price(db, product_id, "1kg") == 60000
+
+
+def test_shared_version_is_read_once_per_session(make_product, monkeypatch):
+    product_ids = [make_product() for _ in range(3)]
+    with SessionLocal() as db:
+        price_index.price(db, product_ids[0], "200gm")
+    reads = []
+    version = price_index._versions.version
+    monkeypatch.setattr(price_index._versions, "version", lambda: reads.append(1) or version())
+    with SessionLocal() as db:
+        for product_id in product_ids:
+            for size in ("200gm", "1kg"):
+                price_index.price(db, product_id, size)
+    assert len(reads) == 1
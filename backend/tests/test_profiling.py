@@ -0,0 +1,74 @@
+import marshal
+import threading
+import time
+
+import pytest
+
+from app.core import profiling
+from app.core.profiling import SamplerBusy, sample_stacks
+from app.database import SessionLocal
+from app.models import User
+
+
+@pytest.fixture
+def admin_headers(client, auth_headers):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    with SessionLocal() as db:
+        db.query(User).filter(User.id == user_id).update({"role": "admin"}, synchronize_session=False)
+        db.commit()
+    return auth_headers
+
+
+def test_admin_gets_a_profile_that_covers_the_sync_endpoint(client, admin_headers):
+    response = client.get("/api/cart", headers={**admin_headers, "X-Profile": "text"})
+    assert response.status_code == 200
+    assert response.headers["x-profile-status"] == "200"
+    assert response.headers["content-type"].startswith("text/plain")
+    # get_cart runs on a threadpool thread; instrument_routes profiles it there
+    assert "get_cart" in response.text
+
+
+def test_prof_format_returns_a_pstats_dump(client, admin_headers):
+    response = client.get("/api/cart?profile=prof", headers=admin_headers)
+    stats = marshal.loads(response.content)
+    assert any(name == "get_cart" for (_, _, name) in stats)
+
+
+def test_flagged_requests_from_customers_are_served_normally(client, auth_headers):
+    response = client.get("/api/cart", headers={**auth_headers, "X-Profile": "text"})
+    assert response.json() == []
+    assert "x-profile-status" not in response.headers
+
+
+def _spin_until(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_reports_busy_threads_as_collapsed_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin_until, args=(stop,), name="spinner")
+    worker.start()
+    try:
+        stacks = sample_stacks(0.2, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+    spinner = [line for line in stacks.splitlines() if line.startswith("spinner;")]
+    assert spinner and all("_spin_until" in line for line in spinner)
+    assert int(spinner[0].rsplit(" ", 1)[1]) > 0
+
+
+def test_one_sampling_run_per_worker(client, admin_headers):
+    with profiling._sampling:
+        with pytest.raises(SamplerBusy):
+            sample_stacks(0.01)
+        assert client.get("/debug/profile?seconds=0.01", headers=admin_headers).status_code == 409
+    start = time.monotonic()
+    response = client.get("/debug/profile?seconds=0.05", headers=admin_headers)
+    assert response.status_code == 200
+    assert time.monotonic() - start < 5
+
+
+def test_worker_profile_is_admin_only(client, auth_headers):
+    assert client.get("/debug/profile?seconds=0.01", headers=auth_headers).status_code == 403
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from app.deps import rate_limit
+from app.deps.rate_limit import MemoryBackend, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / "ratelimit.db"))
+
+
+def test_bucket_allows_capacity_then_says_how_long_to_wait(backend):
+    assert [backend.take("k", 3, 1.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = backend.take("k", 3, 1.0)
+    assert 0 < wait <= 1.0
+
+
+def test_buckets_are_per_key(backend):
+    assert backend.take("a", 1, 0.01) == 0
+    assert backend.take("a", 1, 0.01) > 0
+    assert backend.take("b", 1, 0.01) == 0
+
+
+def test_bucket_refills_over_time(backend):
+    assert backend.take("k", 1, 20.0) == 0
+    assert backend.take("k", 1, 20.0) > 0
+    time.sleep(0.1)
+    assert backend.take("k", 1, 20.0) == 0
+
+
+def test_sqlite_prune_drops_only_idle_buckets(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "ratelimit.db"))
+    backend.take("old", 5, 1.0)
+    backend.take("new", 5, 1.0)
+    conn = backend._connect()
+    conn.execute("UPDATE buckets SET updated = updated - 7200 WHERE key = 'old'")
+    assert backend.prune(idle_seconds=3600) == 1
+    assert [key for (key,) in conn.execute("SELECT key FROM buckets")] == ["new"]
+
+
+def test_memory_prune_drops_only_idle_buckets():
+    backend = MemoryBackend()
+    backend.take("old", 5, 1.0)
+    backend.take("new", 5, 1.0)
+    tokens, updated = backend._buckets["old"]
+    backend._buckets["old"] = (tokens, updated - 7200)
+    backend._prune(time.monotonic(), idle_seconds=3600)
+    assert list(backend._buckets) == ["new"]
+
+
+def test_login_is_refused_with_retry_after_once_the_email_bucket_is_empty(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "backend", MemoryBackend())
+    credentials = {"email": "limited@example.com", "password": "wrong-password"}
+
+    statuses = [client.post("/api/auth/login", json=credentials).status_code for _ in range(10)]
+    assert 429 not in statuses
+    refused = client.post("/api/auth/login", json=credentials)
+    assert refused.status_code == 429
+    assert int(refused.headers["Retry-After"]) >= 1
+    # Another address from the same client still has its own bucket
+    other = client.post("/api/auth/login", json={**credentials, "email": "other-limited@example.com"})
+    assert other.status_code != 429
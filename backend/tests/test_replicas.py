@@ -0,0 +1,69 @@
+import pytest
+from jose import jwt
+from starlette.requests import Request
+
+from app.cache import Cache, SQLiteBackend
+from app.core.tenancy import DEFAULT_TENANT_ID
+from app.database import SessionLocal
+from app.deps import db as db_deps
+from app.routes.auth import create_access_token
+
+
+@pytest.fixture
+def replicas(monkeypatch, tmp_path):
+    """One fake replica, and the sticky marker on a backend shared by all workers."""
+    def replica():
+        session = SessionLocal()
+        session.info["replica"] = True
+        return session
+
+    monkeypatch.setattr(db_deps, "ReplicaSessionLocals", [replica])
+    monkeypatch.setattr(db_deps, "replica_session", replica)
+    path = str(tmp_path / "cache.db")
+    monkeypatch.setattr(db_deps, "sticky_writes", Cache("sticky-writes", SQLiteBackend(path), ttl=5))
+    return path
+
+
+def _request(method, token=None):
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return Request({"type": "http", "method": method, "path": "/api/cart", "headers": headers,
+                    "client": ("10.0.0.1", 1234)})
+
+
+def _on_replica(method, token=None):
+    dependency = db_deps.get_db(_request(method, token))
+    session = next(dependency)
+    dependency.close()
+    return session.info.get("replica", False)
+
+
+def test_a_users_reads_follow_their_writes_to_the_primary(replicas):
+    alice = create_access_token({"sub": "alice@example.com"})
+    bob = create_access_token({"sub": "bob@example.com"})
+    assert _on_replica("GET", alice)
+    assert not _on_replica("POST", alice)
+
+    assert not _on_replica("GET", alice)
+    # Other users, even behind the same address, and anonymous reads stay on replicas
+    assert _on_replica("GET", bob)
+    assert _on_replica("GET")
+
+
+def test_the_marker_is_seen_by_other_workers(replicas):
+    token = create_access_token({"sub": "carol@example.com"})
+    _on_replica("POST", token)
+    other_worker = Cache("sticky-writes", SQLiteBackend(replicas))
+    assert other_worker.get(db_deps.sticky_key(DEFAULT_TENANT_ID, "carol@example.com"))
+
+
+def test_forged_tokens_are_not_recognised(replicas):
+    forged = jwt.encode({"sub": "dave@example.com"}, "not-the-secret", algorithm="HS256")
+    assert not _on_replica("POST", forged)
+    assert _on_replica("GET", create_access_token({"sub": "dave@example.com"}))
+
+
+def test_signup_makes_the_new_accounts_reads_sticky(client, replicas):
+    response = client.post("/api/auth/signup", json={"name": "Erin", "email": "sticky-erin@example.com",
+                                                     "password": "password1"})
+    assert response.status_code == 200, response.text
+    assert not _on_replica("GET", response.json()["access_token"])
@@ -0,0 +1,133 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base, SessionLocal
+from app.models import CartItem, IdempotencyKey, Lead, LeadActivity, LeadActivityArchive, LeadType, User
+from app.utils.migrations import migrate
+from app.utils.retention import POLICIES, RetentionPolicy, apply_policy
+
+LONG_AGO = datetime.utcnow() - timedelta(days=400)
+
+
+def _user_id(client, headers):
+    return client.get("/api/auth/me", headers=headers).json()["id"]
+
+
+def _add_to_cart(client, headers, product_id, backdate=False):
+    client.post("/api/cart/add", headers=headers, json={"product_id": product_id, "quantity": 1, "size": "200gm"})
+    if backdate:
+        with SessionLocal() as db:
+            db.query(CartItem).filter(CartItem.user_id == _user_id(client, headers)).update(
+                {"created_at": LONG_AGO}, synchronize_session=False
+            )
+            db.commit()
+
+
+def _cart(user_id):
+    with SessionLocal() as db:
+        return db.query(CartItem).filter(CartItem.user_id == user_id).count()
+
+
+def test_policies_must_implement_claim_apply_and_count():
+    with pytest.raises(TypeError):
+        RetentionPolicy(1)
+
+
+def test_abandoned_carts_are_emptied_and_active_ones_kept(client, auth_headers, make_product):
+    other = client.post("/api/auth/signup", json={
+        "name": "Other", "email": f"{uuid.uuid4().hex[:12]}@example.com", "password": "password1",
+    }).json()["access_token"]
+    other_headers = {"Authorization": f"Bearer {other}"}
+    _add_to_cart(client, auth_headers, make_product(), backdate=True)
+    # One old item does not make a cart abandoned while a newer one is in it
+    _add_to_cart(client, other_headers, make_product(), backdate=True)
+    _add_to_cart(client, other_headers, make_product())
+
+    with SessionLocal() as db:
+        report = apply_policy(db, POLICIES["abandoned_carts"], pause=0)
+    assert report["rows"] >= 1
+    assert _cart(_user_id(client, auth_headers)) == 0
+    assert _cart(_user_id(client, other_headers)) == 2
+
+
+def test_cart_renewed_after_the_claim_is_left_alone(client, auth_headers, make_product):
+    user_id = _user_id(client, auth_headers)
+    _add_to_cart(client, auth_headers, make_product(), backdate=True)
+    policy = POLICIES["abandoned_carts"]
+    cutoff = policy.cutoff(datetime.utcnow())
+    with SessionLocal() as db:
+        assert user_id in policy.claim(db, cutoff, None, 10_000)
+        _add_to_cart(client, auth_headers, make_product())
+        assert policy.apply(db, [user_id], cutoff) == 0
+        db.commit()
+    assert _cart(user_id) == 2
+
+
+def test_expired_reset_codes_are_cleared(client, auth_headers):
+    user_id = _user_id(client, auth_headers)
+    with SessionLocal() as db:
+        db.query(User).filter(User.id == user_id).update(
+            {"reset_code": "123456", "reset_expiry": LONG_AGO}, synchronize_session=False
+        )
+        db.commit()
+        apply_policy(db, POLICIES["reset_codes"], pause=0)
+        user = db.get(User, user_id)
+        assert (user.reset_code, user.reset_expiry) == (None, None)
+
+
+def test_old_lead_activities_move_to_the_archive_with_their_ids():
+    with SessionLocal() as db:
+        lead = Lead(type=LeadType.sales, person_name="Buyer")
+        db.add(lead)
+        db.flush()
+        old = LeadActivity(lead_id=lead.id, kind="call", body="Asked for a quote", at=LONG_AGO)
+        recent = LeadActivity(lead_id=lead.id, kind="call", body="Followed up")
+        db.add_all([old, recent])
+        db.commit()
+        old_id, recent_id = old.id, recent.id
+
+        apply_policy(db, POLICIES["lead_activities"], pause=0)
+        assert db.get(LeadActivity, old_id) is None
+        assert db.get(LeadActivity, recent_id) is not None
+        assert db.get(LeadActivityArchive, old_id).body == "Asked for a quote"
+
+
+def test_dry_run_counts_without_deleting_and_batches_stop_at_the_limit(client, auth_headers):
+    user_id = _user_id(client, auth_headers)
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.add_all([
+            IdempotencyKey(user_id=user_id, scope="test", key=str(i), request_hash="x", expires_at=now - timedelta(hours=1))
+            for i in range(3)
+        ])
+        db.commit()
+        policy = POLICIES["idempotency_keys"]
+        expired = apply_policy(db, policy, dry_run=True)["rows"]
+        assert expired >= 3
+        assert policy.count(db, policy.cutoff(now)) == expired
+
+        report = apply_policy(db, policy, batch_size=1, max_batches=2, pause=0)
+        assert (report["rows"], report["batches"], report.get("more")) == (2, 2, True)
+        apply_policy(db, policy, pause=0)
+        assert db.query(IdempotencyKey).filter(IdempotencyKey.scope == "test").count() == 0
+
+
+def test_retention_indexes_are_added_to_existing_databases(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    Base.metadata.create_all(engine)
+    indexes = {
+        "cart_items": "ix_cart_items_user_id_created_at",
+        "users": "ix_users_reset_expiry",
+        "lead_activities": "ix_lead_activities_at",
+    }
+    with engine.begin() as conn:
+        for name in indexes.values():
+            conn.execute(text(f"DROP INDEX {name}"))
+
+    assert set(migrate(engine)) >= {f"{table}.{name}" for table, name in indexes.items()}
+    for table, name in indexes.items():
+        assert name in {i["name"] for i in inspect(engine).get_indexes(table)}
+    assert migrate(engine) == []
@@ -0,0 +1,68 @@
+import uuid
+
+from app.models import Product
+from app.utils.search_index import SearchIndex, search_indexes, tokenize
+
+
+def _product(product_id, name, category="nuts", base_price=800.0, description=None, is_active=True):
+    return Product(id=product_id, name=name, category=category, base_price=base_price,
+                   description=description, is_active=is_active)
+
+
+def _index():
+    index = SearchIndex()
+    index.rebuild([
+        _product(1, "California Almonds", description="Crunchy almonds"),
+        _product(2, "Almond Flour", category="flours", base_price=450.0),
+        _product(3, "Cashew W240", base_price=1100.0, description="Whole cashews"),
+        _product(4, "Green Raisins", category="dried fruit", base_price=300.0),
+    ])
+    return index
+
+
+def _names(result):
+    return [item["name"] for item in result["items"]]
+
+
+def test_tokenize_lowercases_and_splits_on_punctuation():
+    assert tokenize("Cashew W-240, Grade A") == ["cashew", "w", "240", "grade", "a"]
+
+
+def test_terms_match_as_prefixes_and_names_rank_first():
+    index = _index()
+    assert _names(index.search("alm")) == ["California Almonds", "Almond Flour"]
+    # Every term has to match
+    assert _names(index.search("almond flo")) == ["Almond Flour"]
+    assert index.search("pistachio")["total"] == 0
+
+
+def test_facets_count_matches_under_the_other_filter():
+    result = _index().search("", category="nuts")
+    assert _names(result) == ["California Almonds", "Cashew W240"]
+    categories = {facet["value"]: facet["count"] for facet in result["facets"]["category"]}
+    assert categories == {"nuts": 2, "flours": 1, "dried fruit": 1}
+    prices = {facet["label"]: facet["count"] for facet in result["facets"]["price"]}
+    assert prices["₹500 - ₹1000"] == 1 and prices["₹1000 & above"] == 1
+    assert _names(_index().search("", min_price=400, max_price=900)) == ["Almond Flour", "California Almonds"]
+
+
+def test_upsert_and_remove_update_the_index_in_place():
+    index = _index()
+    index.upsert([_product(4, "Golden Raisins", category="dried fruit", base_price=320.0)])
+    assert _names(index.search("gold")) == ["Golden Raisins"]
+    assert index.search("green")["total"] == 0
+    index.upsert([_product(1, "California Almonds", is_active=False)])
+    index.remove([3])
+    assert _names(index.search("")) == ["Almond Flour", "Golden Raisins"]
+
+
+def test_search_endpoint_pages_through_active_products(client, make_product, monkeypatch):
+    token = f"pistachio{uuid.uuid4().hex[:8]}"
+    for i in range(3):
+        make_product(name=f"{token} Lot {i}")
+    monkeypatch.setattr(search_indexes.get(), "_loaded_at", None)  # as after SEARCH_INDEX_TTL_SECONDS
+    response = client.get(f"/api/products/search?q={token}&limit=2&offset=1")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 3
+    assert [item["name"] for item in body["items"]] == [f"{token} Lot 1", f"{token} Lot 2"]
@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta, timezone
+
+import orjson
+
+from app import schema
+from app.models import Product
+from app.utils.serializers import ORJSONResponse, dumps, product_to_dict
+
+
+def _product(created_at):
+    return Product(id=1, name="Ragi Malt", description="", base_price=500.0, category="malt",
+                   image="ragi.jpg", stock_grams=1000, is_active=True, created_at=created_at)
+
+
+def test_serializer_output_matches_the_response_model():
+    # Postgres returns timestamptz columns as aware UTC datetimes
+    product = _product(datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc))
+    expected = schema.Product.model_validate(product).model_dump(mode="json")
+    assert orjson.loads(dumps(product_to_dict(product))) == expected
+    assert expected["created_at"] == "2026-01-02T03:04:05Z"
+
+
+def test_response_class_writes_utc_as_z_and_keeps_other_offsets():
+    body = ORJSONResponse({
+        "utc": datetime(2026, 1, 2, tzinfo=timezone.utc),
+        "ist": datetime(2026, 1, 2, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+    }).body
+    assert orjson.loads(body) == {"utc": "2026-01-02T00:00:00Z", "ist": "2026-01-02T00:00:00+05:30"}
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.database import Base, SessionLocal
+from app.models import Order
+from app.routes import orders
+from app.utils import shipping
+from app.utils.migrations import migrate
+from app.utils.shipping import SHIPPING_PINCODES_CSV, ShippingIndex
+
+
+@pytest.fixture
+def pincodes(monkeypatch, tmp_path):
+    """Shipping checks on, over the bundled sample table unless a test swaps it."""
+    monkeypatch.setattr(shipping, "SHIPPING_ENABLED", True)
+
+    def use(csv_path=SHIPPING_PINCODES_CSV):
+        monkeypatch.setattr(shipping, "shipping_index", ShippingIndex(csv_path, str(tmp_path / "pincodes.idx")))
+
+    use()
+    return use
+
+
+class FakeSMTP:
+    sent = []
+
+    def __init__(self, host, port):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def send_message(self, msg):
+        self.sent.append(msg)
+
+
+def test_bundled_sample_table_serves_quotes(client, pincodes):
+    assert os.path.exists(SHIPPING_PINCODES_CSV)
+    found = client.get("/api/shipping/quote?pincode=560001&subtotal=100").json()
+    assert (found["serviceable"], found["zone"], found["shipping"]) == (True, "A", 49.0)
+    assert client.get("/api/shipping/quote?pincode=999999").json()["serviceable"] is False
+
+
+def test_checkout_answers_503_without_the_pincode_table(client, auth_headers, make_product, place_order,
+                                                        pincodes, tmp_path):
+    pincodes(str(tmp_path / "missing.csv"))
+    assert client.get("/api/shipping/quote?pincode=560001").status_code == 503
+    assert place_order(auth_headers, make_product()).status_code == 503
+
+
+def test_confirmation_email_shows_the_shipping_charged_at_checkout(client, auth_headers, make_product,
+                                                                   place_order, pincodes, monkeypatch):
+    order = place_order(auth_headers, make_product(base_price=500.0)).json()
+    assert order["shipping_paise"] == 4900
+    # 200gm at ₹500/kg, 5% GST, zone A shipping
+    assert order["total_amount"] == 100 + 5 + 49
+
+    monkeypatch.setenv("SMTP_HOST", "smtp.test")
+    monkeypatch.setenv("SMTP_USER", "shop")
+    monkeypatch.setenv("SMTP_PASS", "secret")
+    monkeypatch.setattr(orders.smtplib, "SMTP", FakeSMTP)
+    response = client.post(f"/api/orders/{order['id']}/send-confirmation", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    html = FakeSMTP.sent[-1].get_body(("html",)).get_content()
+    assert "Shipping: ₹49" in html
+    assert "Grand Total: ₹154" in html
+
+
+def test_shipping_of_earlier_orders_is_recovered_from_their_totals(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for order_id, total in ((1, 154.0), (2, 1050.0)):
+            conn.execute(text(
+                "INSERT INTO orders (id, tenant_id, user_id, address_id, total_amount, shipping_paise) "
+                "VALUES (:id, 1, 1, 1, :total, 0)"
+            ), {"id": order_id, "total": total})
+        conn.execute(text(
+            "INSERT INTO order_items (order_id, product_id, quantity, size, price) "
+            "VALUES (1, 1, 1, '200gm', 100.0), (2, 1, 2, '1kg', 500.0)"
+        ))
+        conn.execute(text("ALTER TABLE orders DROP COLUMN shipping_paise"))
+
+    assert "orders.shipping_paise" in migrate(engine)
+    with engine.connect() as conn:
+        assert dict(conn.execute(text("SELECT id, shipping_paise FROM orders")).all()) == {1: 4900, 2: 0}
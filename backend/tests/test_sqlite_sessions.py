@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import select
+from starlette.requests import Request
+
+from app.database import SQLITE_TUNED, SessionLocal, engine, read_engine
+from app.deps.db import get_db
+from app.models import Product, User
+
+pytestmark = pytest.mark.skipif(not SQLITE_TUNED, reason="needs the SQLite writer and reader engines")
+
+
+def _request(method):
+    return Request({"type": "http", "method": method, "path": "/api/cart/add", "headers": []})
+
+
+def _request_session(method):
+    dependency = get_db(_request(method))
+    return dependency, next(dependency)
+
+
+@pytest.mark.parametrize("method, bind", [("POST", engine), ("DELETE", engine), ("GET", read_engine)])
+def test_only_read_requests_start_on_a_reader(method, bind):
+    dependency, db = _request_session(method)
+    assert db.get_bind(clause=select(Product.id)) is bind
+    dependency.close()
+
+
+def test_concurrent_read_modify_writes_keep_every_update(make_product):
+    product_id = make_product(stock=100)
+
+    def take_one():
+        dependency, db = _request_session("POST")
+        product = db.get(Product, product_id)
+        time.sleep(0.2)  # the other request reads meanwhile, unless it waits for the writer
+        product.stock_grams -= 1
+        db.commit()
+        dependency.close()
+
+    threads = [threading.Thread(target=take_one) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with SessionLocal() as db:
+        assert db.get(Product, product_id).stock_grams == 98
+
+
+def test_admin_retention_run_does_not_wait_for_its_own_writer(client, auth_headers):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    with SessionLocal() as db:
+        db.query(User).filter(User.id == user_id).update({"role": "admin"}, synchronize_session=False)
+        db.commit()
+    start = time.monotonic()
+    response = client.post("/api/admin/retention/run?dry_run=false&policy=reset_codes", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert "error" not in response.json()["reset_codes"]
+    assert time.monotonic() - start < 5
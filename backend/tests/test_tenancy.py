@@ -0,0 +1,124 @@
+import hashlib
+import hmac
+import json
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app.core.tenancy import ensure_default_tenant, tenant_registry
+from app.database import Base, SessionLocal
+from app.models import Order, Product, Tenant, TenantDomain
+from app.utils.migrations import migrate, pending_migrations
+from app.utils.pricing import price_index, sync_product_variants
+
+BRAND_HOST = "shop.brand.test"
+BRAND = {"Host": BRAND_HOST}
+
+
+@pytest.fixture(scope="module")
+def brand_id():
+    with SessionLocal() as db:
+        tenant = Tenant(slug="brand-test", name="Brand")
+        db.add(tenant)
+        db.flush()
+        db.add(TenantDomain(host=BRAND_HOST, tenant_id=tenant.id))
+        tenant_id = tenant.id
+        db.commit()
+    tenant_registry.invalidate()
+    return tenant_id
+
+
+@pytest.fixture
+def brand_product(brand_id):
+    with SessionLocal() as db:
+        product = Product(name="Brand Ghee", base_price=500.0, category="test", stock_grams=10_000,
+                          is_active=True, tenant_id=brand_id)
+        db.add(product)
+        db.flush()
+        sync_product_variants(db, [product])
+        product_id = product.id
+        db.commit()
+    price_index.invalidate()
+    return product_id
+
+
+def _signup(client, email, headers=None):
+    response = client.post("/api/auth/signup", headers=headers,
+                           json={"name": "T", "email": email, "password": "password1"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}", **(headers or {})}
+
+
+def test_products_are_only_served_on_their_storefront(client, brand_product):
+    assert client.get(f"/api/products/{brand_product}", headers=BRAND).status_code == 200
+    assert client.get(f"/api/products/{brand_product}").status_code == 404
+
+
+def test_same_email_signs_up_per_storefront_and_tokens_stay_there(client, brand_id):
+    default = _signup(client, "both@example.com")
+    brand = _signup(client, "both@example.com", BRAND)
+    assert client.get("/api/auth/me", headers=brand).status_code == 200
+    assert client.get("/api/auth/me", headers={**default, **BRAND}).status_code == 401
+    assert client.get("/api/auth/me", headers={"Authorization": brand["Authorization"]}).status_code == 401
+
+
+def test_carts_cannot_reach_another_storefronts_products(client, make_product, brand_product):
+    brand = _signup(client, "brand-cart@example.com", BRAND)
+    item = {"quantity": 1, "size": "200gm"}
+    assert client.post("/api/cart/add", headers=brand, json={**item, "product_id": make_product()}).status_code == 404
+    assert client.post("/api/cart/add", headers=brand, json={**item, "product_id": brand_product}).status_code == 200
+
+
+def test_webhook_settles_orders_of_any_storefront(client, brand_product, place_order):
+    brand = _signup(client, "brand-pay@example.com", BRAND)
+    order = place_order(brand, brand_product, quantity=2).json()
+    payment = client.post("/api/payments/initiate", headers=brand,
+                          json={"order_id": order["id"], "amount": order["total_amount"], "phone": "9999999999"})
+    assert payment.status_code == 200, payment.text
+
+    # The gateway calls back on the default host
+    body = json.dumps({"code": "PAYMENT_SUCCESS",
+                       "data": {"merchantTransactionId": payment.json()["transaction_id"]}}).encode()
+    signature = hmac.new(b"test-secret", body, hashlib.sha256).hexdigest()
+    response = client.post("/api/payments/webhook", content=body, headers={"X-VERIFY": signature})
+    assert response.json() == {"received": True, "settled": True}
+    with SessionLocal() as db:
+        settled = db.get(Order, order["id"])
+        assert (settled.status, settled.payment_status) == ("confirmed", "completed")
+
+
+def test_tables_from_before_tenants_are_migrated(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR NOT NULL, reset_expiry DATETIME)"))
+        conn.execute(text("CREATE UNIQUE INDEX ix_users_email ON users (email)"))
+        conn.execute(text("CREATE TABLE products (id INTEGER PRIMARY KEY, stock_grams INTEGER)"))
+        conn.execute(text("CREATE TABLE orders (id INTEGER PRIMARY KEY, shipping_paise INTEGER)"))
+        conn.execute(text("INSERT INTO users (email) VALUES ('old@example.com')"))
+        conn.execute(text("INSERT INTO products (id) VALUES (1), (2)"))
+    # What python -m app.seed.migrate does before the steps
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        ensure_default_tenant(db)
+
+    tenant_steps = ["users.tenant_id", "products.tenant_id", "orders.tenant_id", "users.uq_users_tenant_email"]
+    assert set(tenant_steps) <= set(pending_migrations(engine))
+    assert set(tenant_steps) <= set(migrate(engine))
+    assert migrate(engine) == []
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT tenant_id FROM products")).scalars().all() == [1, 1]
+        assert conn.execute(text("SELECT tenant_id FROM users")).scalar() == 1
+        # Email is now unique per tenant only
+        conn.execute(text("INSERT INTO users (email, tenant_id) VALUES ('old@example.com', 2)"))
+    indexes = {index["name"]: bool(index["unique"]) for index in inspect(engine).get_indexes("users")}
+    assert indexes["ix_users_email"] is False
+    assert indexes["uq_users_tenant_email"] is True
+
+
+def test_up_to_date_databases_need_no_tenant_steps(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/current.db")
+    Base.metadata.create_all(engine)
+    assert pending_migrations(engine) == []
+    assert "ix_orders_tenant_id" in {index["name"] for index in inspect(engine).get_indexes("orders")}